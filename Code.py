@@ -6,12 +6,29 @@
 # b. Propagate this state to other variables using the Pi relationship.
 # c. Detect and report contradictions if any.
 
+from collections import deque, namedtuple
+from time import perf_counter
+
+
 # --- 1. Defining qualitative variables ---
-# Use strings to represent states, because those are qualitative.
-INCREASE = "Increased"
-DECREASE = "Decreased"
-CONSTANT = "Constant"
-UNKNOWN = 'U'
+# Every qualitative state is coded as a small integer (2 bits), so the product and
+# division rules can be answered with a single table lookup instead of string comparisons.
+# The strings are only kept as a view for display (see STATUS_NAMES / format_variables).
+UNKNOWN = 0
+INCREASE = 1
+DECREASE = 2
+CONSTANT = 3
+
+# String view of every code, indexed by the code itself: STATUS_NAMES[INCREASE] == "Increased"
+STATUS_NAMES = ('U', "Increased", "Decreased", "Constant")
+
+
+def format_variables(variables):
+    """
+    Return a copy of the variables dictionary with the display strings instead of the codes.
+    Only used for printing, the propagation always works on the codes.
+    """
+    return {name: STATUS_NAMES[status] for name, status in variables.items()}
 
 
 # --- 2. Defining the Model: Variables and the Pi Rule ---
@@ -30,14 +47,113 @@ variabel_status = {
     'K': CONSTANT,
 }
 
+# Order of the variables in one scenario (the initial_state dictionaries in main()).
+# Used wherever a scenario is stored as a row of codes instead of a dictionary.
+STATE_VARIABLES = ('P_in', 'P_out', 'Q', 'A_open', 'x', 'P', 'Pi_A1', 'Pi_A2', 'Pi_B1', 'Pi_C1', 'Pi_C2')
+
+
 
+# One contradiction: the regime computed 'propagated' for a variable which already has another status.
+# Nothing is formatted while solving, see format_contradiction for the display text.
+Contradiction = namedtuple('Contradiction', ['regime', 'variable', 'status', 'propagated'])
 
-#Global variable to record if in 1 of the iteration found CONTRADITION (only cosmetic purpose)
-CONTRADICTION_FOUND = False
+# Why a variable has its status: the regime that set it and the variables that regime read which
+# were known at that moment (the other inputs were UNKNOWN, so the conclusion cannot depend on them).
+Justification = namedtuple('Justification', ['regime', 'antecedents'])
+
+
+class SolverContext:
+    """
+    Everything one solve owns: the variables, the contradictions found (in the order they were found)
+    and the number of regime evaluations. Every solve has its own context, so solves running on
+    different threads share no state.
+    If justifications is a dictionary, run_agenda records a Justification for every variable it derives.
+    """
+
+    def __init__(self, variables, justifications=None):
+        self.variables = variables
+        self.contradictions = []
+        self.iterations = 0
+        self.justifications = justifications
+        self._reported = set()
+
+    @property
+    def contradiction_found(self):
+        return bool(self.contradictions)
+
+    def report(self, regime, variable, status, propagated):
+        """
+        Record that the regime computed 'propagated' for a variable which already has another status.
+        A regime that runs again reports the same contradiction again, it is only recorded once.
+        """
+        contradiction = Contradiction(regime, variable, status, propagated)
+        if contradiction not in self._reported:
+            self._reported.add(contradiction)
+            self.contradictions.append(contradiction)
+
+    def result(self):
+        justifications = None if self.justifications is None else dict(self.justifications)
+        return SolveResult(self.variables, list(self.contradictions), self.iterations, justifications)
+
+
+def format_contradiction(contradiction):
+    """
+    Return the display text of one contradiction.
+    """
+    regime, variable, status, propagated = contradiction
+    return (f"CONTRADICTION FOUND IN {regime.upper()}: {variable} is '{STATUS_NAMES[status]}', "
+            f"but propagation says '{STATUS_NAMES[propagated]}'.")
 
 
 # --- 3. Assistive Functions for Qualitative Operations ---
 #DETERMINING MULTIPLICATION AND DIVISION FOR QUALITATIVE VARIABLES
+# Both operations are precomputed 4x4 tables, indexed as TABLE[status1][status2].
+# Row and column order follow the codes: UNKNOWN, INCREASE, DECREASE, CONSTANT.
+_U, _I, _D, _C = UNKNOWN, INCREASE, DECREASE, CONSTANT
+
+# Multiplication:
+# - If either variable is UNKNOWN, the result is UNKNOWN.
+# - If either variable is CONSTANT, the result is the other variable.
+# - (INCREASE * INCREASE) = INCREASE
+# - (DECREASE * DECREASE) = DECREASE. In this prototype, we always assume both variables are positive.
+#   In quantitative calculation, when both DECREASE and the number below 0, it will turn into positive
+#   Example: initially A=3, then minus 5. initially B=2, then minus 7. Then the result will be increase instead because (3-5)x(2-7) = (-2)x(-5) = 10
+# - (INCREASE * DECREASE) = UNKNOWN, we can't get the fix result without the quantitative number
+PRODUCT_TABLE = (
+    #  U   I   D   C
+    (_U, _U, _U, _U),  # U
+    (_U, _I, _U, _I),  # I
+    (_U, _U, _D, _D),  # D
+    (_U, _I, _D, _C),  # C
+)
+
+# Multiplication with signed changes, used by the physical link variant (see models/):
+# the same as PRODUCT_TABLE, except (DECREASE * DECREASE) = INCREASE, like the product of two negative numbers.
+# A model chooses its product with 'algebra' (pi_model.ALGEBRAS).
+SIGNED_PRODUCT_TABLE = (
+    #  U   I   D   C
+    (_U, _U, _U, _U),  # U
+    (_U, _I, _U, _I),  # I
+    (_U, _U, _I, _D),  # D
+    (_U, _I, _D, _C),  # C
+)
+
+# Division (row = numerator, column = denominator):
+# - If either variable is UNKNOWN, the result is UNKNOWN.
+# - If the denominator is constant, the result is the numerator's status.
+# - If the numerator and denominator have the same status, the result is CONSTANT.
+# - If the numerator is constant, the result is the opposite of the denominator.
+# - (I/D) and (D/I) are UNKNOWN - Because we can't determine increase or decrease without number, it was not always constant.
+#   Imagine top increase 100, bottom increase 20, it wont give constant.
+DIVISION_TABLE = (
+    #  U   I   D   C
+    (_U, _U, _U, _U),  # U
+    (_U, _C, _U, _I),  # I
+    (_U, _U, _C, _D),  # D
+    (_U, _D, _I, _C),  # C
+)
+
+
 def determine_product_status(status1, status2):
     """
     Determine multiplication result of 2 qualitative variables.
@@ -45,68 +161,23 @@ def determine_product_status(status1, status2):
     (DECREASE * DECREASE) = DECREASE, 
     (INCREASE * DECREASE) = UNKNOWN
     """
+    return PRODUCT_TABLE[status1][status2]
 
-    # If either variable is UNKNOWN, the result is UNKNOWN.
-    if UNKNOWN in (status1, status2):
-        return UNKNOWN
-    # If either variable is CONSTANT, the result is the other variable.
-    elif status1 == CONSTANT:
-        return status2
-    elif status2 == CONSTANT:
-        return status1
-    # If both are the same INCREASE, then INCREASE
-    elif ((status1 == INCREASE) and (status2 == INCREASE) ):
-        return INCREASE
-    # If both are the same DECREASE, then DECREASE
-    # In this prototype, we always assume both variables are positive. so it is DECREASE.
-    # in quantitative calculation, when both DECREASE and the number below 0, it will turn into positive
-    # Example: initially A=3, then minus 5. initially B=2, then minus 7. THen the result will be increase instead because (3-5)x(2-7) = (-2)x(-5) = 10
-    elif ((status1 == DECREASE) and (status2 == DECREASE) ):
-        return DECREASE
-    #If contradicting status given, then we can't get the fix result without the quantitative number (To determine it is increase or decrease)
-    elif (status1 == INCREASE and status2 == DECREASE) or (status1 == DECREASE and status2 == INCREASE):
-        return UNKNOWN
-    #Others unexpected conditions
-    else:
-        return UNKNOWN
 
 def determine_division_status(status_numerator, status_denominator):
     """
     Determine division result of 2 qualitative variables.
     """
-    # If either variable is UNKNOWN, the result is UNKNOWN.
-    if UNKNOWN in (status_numerator, status_denominator):
-        return UNKNOWN
-    
-    # If the denominator is constant, the result is the numerator's status.
-    elif status_denominator == CONSTANT:
-        return status_numerator
-    
-    # If the numerator and denominator have the same status, the result is CONSTANT.
-    elif status_numerator == status_denominator:
-        return CONSTANT
-    
-    # If the numerator is constant, the result is the opposite of the denominator.
-    elif status_numerator == CONSTANT:
-        if status_denominator == DECREASE:
-            return INCREASE
-        else:  # status_denominator == INCREASE
-            return DECREASE
-        
-    # For all other scenarios, the result is UNKNOWN because the changes are opposite
-    # This covers (I/D) and (D/I) - Because we can't determine increase or decrease without number, it was not always constant. Imagine top increase 100, bottom increase 20, it wont give constant.
-    else:
-        return UNKNOWN
-    
+    return DIVISION_TABLE[status_numerator][status_denominator]
+
 
 
 # --- 3. Propagation Function for Every regime ---
-def propagate_pi_a1(variables):
+def propagate_pi_a1(variables, context):
     """
     Logika untuk Pi_A1 = (Q * rho^1/2) / (A_open * Pin^3/2)
     Asumsi: Pi_A1 dan rho adalah KONSTAN.
     """
-    global CONTRADICTION_FOUND
     changes_made = False
 
     # NUMERATOR
@@ -122,94 +193,84 @@ def propagate_pi_a1(variables):
     new_pi_a1_status = determine_division_status(numerator_status, denominator_status)
 
     # If new_pi_a1_status not UNKNOWN
-    if new_pi_a1_status != 'U':
+    if new_pi_a1_status != UNKNOWN:
         # if initial status unkwnown then update Pi_A1
-        if variables['Pi_A1'] == 'U':
+        if variables['Pi_A1'] == UNKNOWN:
             variables['Pi_A1'] = new_pi_a1_status
             changes_made = True
         # If new_pi_a1_status not same with inputted Pi_A1, then CONTRADICTION
         else:
             #If initial Pi_A1 different than new Pi_A1
             if variables['Pi_A1'] != new_pi_a1_status:
-                CONTRADICTION_FOUND = True
-                print(f"CONTRADICTION FOUND ON PI_A1: User defined PI_A1 IS '{variables['Pi_A1']}'. It is CONTRADICTED the calculation result '{new_pi_a1_status}'.")
+                context.report('Pi_A1', 'Pi_A1', variables['Pi_A1'], new_pi_a1_status)
                 # In a more complete implementation, note this contradiction (FUTURE ENHANCEMENT)
                 return False # Stop propagation
             #else If: initial Pi_A1 same with new Pi_A1, you can just ignore it
     
     # If Pi_A1 is CONSTANT, Numerator and denomitor should be the same
-    elif variables['Pi_A1'] == 'C':
+    elif variables['Pi_A1'] == CONSTANT:
         # If denominator is known, the numerator should have same value. As numerator only Q, the Q have same value with Pi_A1
-        if denominator_status != 'U' and numerator_status == 'U':
+        if denominator_status != UNKNOWN and numerator_status == UNKNOWN:
             variables['Q'] = denominator_status
             changes_made = True
-        
-        elif denominator_status != 'U' and numerator_status == 'U':
-            if variables['Q'] == 'U':
-                variables['Q'] = denominator_status
-                changes_made = True
-            elif variables['Q'] != denominator_status:
-                CONTRADICTION_FOUND = True
-                print(f"CONTRADICTION FOUND: Q is '{variables['Q']}', but propagation says '{denominator_status}'.")
-                return False
-            
+
+        # If Q is known, Q / denominator was UNKNOWN (I/D or D/I), so Q contradicts the denominator
+        elif denominator_status != UNKNOWN:
+            context.report('Pi_A1', 'Q', variables['Q'], denominator_status)
+            return False
+
     return changes_made
 
 
-def propagate_pi_a2(variables):
+def propagate_pi_a2(variables, context):
     """
     Pi_A2 = P_out / P_in.
     """
-    global CONTRADICTION_FOUND
     changes_made = False
     
     # Determine Pi_A2 status from Pout and Pin
     new_pi_a2_status = determine_division_status(variables['P_out'], variables['P_in'])
     
-    if new_pi_a2_status != 'U':
+    if new_pi_a2_status != UNKNOWN:
         # If Pi_A2 UNKNOWN
-        if variables['Pi_A2'] == 'U':
+        if variables['Pi_A2'] == UNKNOWN:
             variables['Pi_A2'] = new_pi_a2_status
             changes_made = True
         # If PI_A2 is not UNKNOWN, then CONTRADICTION
         elif variables['Pi_A2'] != new_pi_a2_status:
-            CONTRADICTION_FOUND = True
-            print(f"CONTRADICTION FOUND IN PI_A2: Initial status '{variables['Pi_A2']}' contradicted with current calculation '{new_pi_a2_status}'.")
+            context.report('Pi_A2', 'Pi_A2', variables['Pi_A2'], new_pi_a2_status)
             return False # Hentikan propagasi
 
     # Determine POut or Pin
-    if variables['Pi_A2'] != 'U' and variables['P_out'] != 'U':
+    if variables['Pi_A2'] != UNKNOWN and variables['P_out'] != UNKNOWN:
         new_pin_status = determine_division_status(variables['P_out'], variables['Pi_A2'])
-        if new_pin_status != 'U':
-            if variables['P_in'] == 'U':
+        if new_pin_status != UNKNOWN:
+            if variables['P_in'] == UNKNOWN:
                 variables['P_in'] = new_pin_status
                 changes_made = True
             elif variables['P_in'] != new_pin_status:
-                CONTRADICTION_FOUND = True
-                print(f"CONTRADICTION FOUND: P_in is '{variables['P_in']}', but propagation says '{new_pin_status}'.")
+                context.report('Pi_A2', 'P_in', variables['P_in'], new_pin_status)
                 return False
 
-    elif variables['Pi_A2'] != 'U' and variables['P_in'] != 'U':
+    elif variables['Pi_A2'] != UNKNOWN and variables['P_in'] != UNKNOWN:
         new_pout_status = determine_product_status(variables['Pi_A2'], variables['P_in'])
-        if new_pout_status != 'U':
-            if variables['P_out'] == 'U':
+        if new_pout_status != UNKNOWN:
+            if variables['P_out'] == UNKNOWN:
                 variables['P_out'] = new_pout_status
                 changes_made = True
             elif variables['P_out'] != new_pout_status:
-                CONTRADICTION_FOUND = True
-                print(f"CONTRADICTION FOUND: P_out is '{variables['P_out']}', but propagation says '{new_pout_status}'.")
+                context.report('Pi_A2', 'P_out', variables['P_out'], new_pout_status)
                 return False
 
             
     return changes_made
 
 
-def propagate_pi_b1(variables):
+def propagate_pi_b1(variables, context):
     """
     Pi_B1 = (x * P) / K
     Assumption: K is CONSTANT.
     """
-    global CONTRADICTION_FOUND
     changes_made = False
 
     # Determine Pi_B1
@@ -217,129 +278,118 @@ def propagate_pi_b1(variables):
     new_pi_b1_status = determine_product_status(variables['x'], variables['P'])
     # As K assumed as constant, the propagate will only look the result of x.P, because anything divide by CONSTANT is same result with its numerator
     
-    if new_pi_b1_status != 'U':
+    if new_pi_b1_status != UNKNOWN:
         # IF initially no Pi_B1, we can just replaced it
-        if variables['Pi_B1'] == 'U':
+        if variables['Pi_B1'] == UNKNOWN:
             variables['Pi_B1'] = new_pi_b1_status
             changes_made = True
         elif variables['Pi_B1'] != new_pi_b1_status:
-            CONTRADICTION_FOUND = True
-            print(f"CONTRADICTION FOUND IN PI_B1: The initial state of '{variables['Pi_B1']}' contradicts the calculated result of '{new_pi_b1_status}'.")
+            context.report('Pi_B1', 'Pi_B1', variables['Pi_B1'], new_pi_b1_status)
             return False
 
-    if variables['Pi_B1'] != 'U':
-        if variables['x'] == 'U' and variables['P'] != 'U':
+    if variables['Pi_B1'] != UNKNOWN:
+        if variables['x'] == UNKNOWN and variables['P'] != UNKNOWN:
             new_x_status = determine_division_status(variables['Pi_B1'], variables['P'])
-            if new_x_status != 'U':
-                if variables['x'] == 'U':
+            if new_x_status != UNKNOWN:
+                if variables['x'] == UNKNOWN:
                     variables['x'] = new_x_status
                     changes_made = True
                 elif variables['x'] != new_x_status:
-                    CONTRADICTION_FOUND = True
-                    print(f"CONTRADICTION FOUND: x is '{variables['x']}', but propagation says '{new_x_status}'.")
+                    context.report('Pi_B1', 'x', variables['x'], new_x_status)
                     return False
 
-        elif variables['P'] == 'U' and variables['x'] != 'U':
+        elif variables['P'] == UNKNOWN and variables['x'] != UNKNOWN:
             new_p_status = determine_division_status(variables['Pi_B1'], variables['x'])
-            if new_p_status != 'U':
-                if variables['P'] == 'U':
+            if new_p_status != UNKNOWN:
+                if variables['P'] == UNKNOWN:
                     variables['P'] = new_p_status
                     changes_made = True
                 elif variables['P'] != new_p_status:
-                    CONTRADICTION_FOUND = True
-                    print(f"CONTRADICTION FOUND: P is '{variables['P']}', but propagation says '{new_p_status}'.")
+                    context.report('Pi_B1', 'P', variables['P'], new_p_status)
                     return False
 
 
     return changes_made
 
 
-def propagate_pi_c1(variables):
+def propagate_pi_c1(variables, context):
     """
     Pi_C1 = P / Pout.
     """
-    global CONTRADICTION_FOUND
     changes_made = False
 
     # Determine Pi_C1
     new_pi_c1_status = determine_division_status(variables['P'], variables['P_out'])
 
-    if new_pi_c1_status != 'U':
-        if variables['Pi_C1'] == 'U':
+    if new_pi_c1_status != UNKNOWN:
+        if variables['Pi_C1'] == UNKNOWN:
             variables['Pi_C1'] = new_pi_c1_status
             changes_made = True
         elif variables['Pi_C1'] != new_pi_c1_status:
-            CONTRADICTION_FOUND = True
-            print(f"CONTRADICTION FOUND IN PI_C1: The initial state of '{variables['Pi_C1']}' contradicts the calculated result of '{new_pi_c1_status}'.")
+            context.report('Pi_C1', 'Pi_C1', variables['Pi_C1'], new_pi_c1_status)
             return False
 
-    if variables['Pi_C1'] != 'U':
-        if variables['P_out'] == 'U' and variables['P'] != 'U':
+    if variables['Pi_C1'] != UNKNOWN:
+        if variables['P_out'] == UNKNOWN and variables['P'] != UNKNOWN:
             new_pout_status = determine_division_status(variables['P'], variables['Pi_C1'])
-            if new_pout_status != 'U':
-                if variables['P_out'] == 'U':
+            if new_pout_status != UNKNOWN:
+                if variables['P_out'] == UNKNOWN:
                     variables['P_out'] = new_pout_status
                     changes_made = True
                 elif variables['P_out'] != new_pout_status:
-                    CONTRADICTION_FOUND = True
-                    print(f"CONTRADICTION FOUND: P_out is '{variables['P_out']}', but propagation says '{new_pout_status}'.")
+                    context.report('Pi_C1', 'P_out', variables['P_out'], new_pout_status)
                     return False
 
-        elif variables['P'] == 'U' and variables['P_out'] != 'U':
+        elif variables['P'] == UNKNOWN and variables['P_out'] != UNKNOWN:
             new_p_status = determine_product_status(variables['Pi_C1'], variables['P_out'])
-            if new_p_status != 'U':
-                if variables['P'] == 'U':
+            if new_p_status != UNKNOWN:
+                if variables['P'] == UNKNOWN:
                     variables['P'] = new_p_status
                     changes_made = True
                 elif variables['P'] != new_p_status:
-                    CONTRADICTION_FOUND = True
-                    print(f"CONTRADICTION FOUND: P is '{variables['P']}', but propagation says '{new_p_status}'.")
+                    context.report('Pi_C1', 'P', variables['P'], new_p_status)
                     return False
 
     return changes_made
 
 
-def propagate_pi_c2(variables):
+def propagate_pi_c2(variables, context):
     """
     Pi_C2 = x / A_open.
     """
-    global CONTRADICTION_FOUND
     changes_made = False
 
     # Determine Pi_C2
     new_pi_c2_status = determine_division_status(variables['x'], variables['A_open'])
 
-    if new_pi_c2_status != 'U':
-        if variables['Pi_C2'] == 'U':
+    if new_pi_c2_status != UNKNOWN:
+        if variables['Pi_C2'] == UNKNOWN:
             variables['Pi_C2'] = new_pi_c2_status
             changes_made = True
         elif variables['Pi_C2'] != new_pi_c2_status:
-            CONTRADICTION_FOUND = True
-            print(f"CONTRADICTION FOUND IN PI_C2: The initial state of '{variables['Pi_C2']}' contradicts the calculated result of '{new_pi_c2_status}'.")
+            context.report('Pi_C2', 'Pi_C2', variables['Pi_C2'], new_pi_c2_status)
             return False
 
     # return propagation to determine AOpen or x
-    if variables['Pi_C2'] != 'U':
-        if variables['A_open'] == 'U' and variables['x'] != 'U':
+    if variables['Pi_C2'] != UNKNOWN:
+        if variables['A_open'] == UNKNOWN and variables['x'] != UNKNOWN:
             new_a_open_status = determine_division_status(variables['x'], variables['Pi_C2'])
-            if new_a_open_status != 'U':
-                if variables['A_open'] == 'U':
+            if new_a_open_status != UNKNOWN:
+                if variables['A_open'] == UNKNOWN:
                     variables['A_open'] = new_a_open_status
                     changes_made = True
                 elif variables['A_open'] != new_a_open_status:
-                    CONTRADICTION_FOUND = True
-                    print(f"CONTRADICTION FOUND: A_open is '{variables['A_open']}', but propagation says '{new_a_open_status}'.")
+                    context.report('Pi_C2', 'A_open', variables['A_open'], new_a_open_status)
                     return False
 
-        elif variables['x'] == 'U' and variables['A_open'] != 'U':
+        elif variables['x'] == UNKNOWN and variables['A_open'] != UNKNOWN:
             new_x_status = determine_product_status(variables['Pi_C2'], variables['A_open'])
-            if new_x_status != 'U':
-                if variables['x'] == 'U':
+            if new_x_status != UNKNOWN:
+                if variables['x'] == UNKNOWN:
                     variables['x'] = new_x_status
                     changes_made = True
                 elif variables['x'] != new_x_status:
-                    CONTRADICTION_FOUND = True
-                    print(f"CONTRADICTION FOUND: x is '{variables['x']}', but propagation says '{new_x_status}'.")
+                    context.report('Pi_C2', 'x', variables['x'], new_x_status)
                     return False
 
 
@@ -352,188 +402,298 @@ def propagate_pi_c2(variables):
 
 
 # --- 4. Wrapper Function for Each Ensemble ---
-def propagate_ensemble_a(variables):
+def propagate_ensemble_a(variables, context):
     """
     #Ensemble Pi_A1 and Pi_A2 into ensemble_A
     """
     changes_made = False
-    if propagate_pi_a1(variables): 
+    if propagate_pi_a1(variables, context): 
         changes_made = True
-    if propagate_pi_a2(variables): 
+    if propagate_pi_a2(variables, context): 
         changes_made = True
     return changes_made
 
 
 
-def propagate_ensemble_b(variables):
+def propagate_ensemble_b(variables, context):
     """
     #Ensemble Pi_B1 into ensemble B
     But, as ENsemble_B only have 1 regime, the result always the same.
     """
     
     #changes_made = False
-    #if propagate_pi_b1(variables):  # Pi_B1 Propagation
+    #if propagate_pi_b1(variables, context):  # Pi_B1 Propagation
     #    changes_made = True
     #return changes_made
 
-    return propagate_pi_b1(variables)
+    return propagate_pi_b1(variables, context)
 
 
 
-def merge_contact_variable_pi_c1_pi_c2 (variables):
+def merge_contact_variable_pi_c1_pi_c2 (variables, context):
     """
     # Merge the Pi_C1 and Pi_C2 just as to make it easier to be called. 
     # In actual, these should be separated as these 2 are contact variables of inter-ensemble components, not an ensemble
     """
     changes_made = False
-    if propagate_pi_c1(variables): changes_made = True
-    if propagate_pi_c2(variables): changes_made = True
+    if propagate_pi_c1(variables, context): changes_made = True
+    if propagate_pi_c2(variables, context): changes_made = True
     return changes_made
 
 
 
 
 
-# --- 5. Main part of algorithm. Propagate all rules ---
-def solve_pressure_regulator(initial_variables):
-    global CONTRADICTION_FOUND
-    CONTRADICTION_FOUND = False
+# --- 5. Regime registry and agenda (worklist) engine ---
+# Every regime with the variables it reads and the variables it can write.
+# The order is the order of the original sweep: ensemble A, contact variables, ensemble B.
+Regime = namedtuple('Regime', ['name', 'propagate', 'reads', 'writes'])
 
-    variables = initial_variables.copy()
-    changes_made = True
-    iteration = 0
+REGIMES = (
+    Regime('Pi_A1', propagate_pi_a1, ('Q', 'A_open', 'P_in', 'Pi_A1'), ('Pi_A1', 'Q')),
+    Regime('Pi_A2', propagate_pi_a2, ('P_out', 'P_in', 'Pi_A2'), ('Pi_A2', 'P_in', 'P_out')),
+    Regime('Pi_C1', propagate_pi_c1, ('P', 'P_out', 'Pi_C1'), ('Pi_C1', 'P_out', 'P')),
+    Regime('Pi_C2', propagate_pi_c2, ('x', 'A_open', 'Pi_C2'), ('Pi_C2', 'A_open', 'x')),
+    Regime('Pi_B1', propagate_pi_b1, ('x', 'P', 'Pi_B1'), ('Pi_B1', 'x', 'P')),
+)
 
-    print("--- INITIAL STATUS ---")
-    print(variables)
-    print("-" * 20)
 
-    while changes_made:
-        changes_made = False
-        iteration += 1
-        print(f"Iteration {iteration}:")
+def build_dependency_index(regimes):
+    """
+    Map every variable to the regimes that read it.
+    """
+    dependency_index = {}
+    for regime in regimes:
+        for variable in regime.reads:
+            dependency_index.setdefault(variable, []).append(regime)
+    return dependency_index
 
-        # Call propagation iteration
-        changes_made = propagate_ensemble_a(variables) or changes_made
-        changes_made = merge_contact_variable_pi_c1_pi_c2(variables) or changes_made
-        changes_made = propagate_ensemble_b(variables) or changes_made
-        
-        print(variables)
 
-    print("\n--- END STATUS ---")
+DEPENDENCY_INDEX = build_dependency_index(REGIMES)
+
+
+def run_agenda(context, regimes=REGIMES, dependency_index=None, on_step=None, start=None, stats=None):
+    """
+    Propagate the regimes over context.variables (in place) until the agenda is empty.
+    Contradictions are reported to the SolverContext and the evaluations are added to context.iterations.
+    Every regime starts on the agenda once (or only the regimes in start, if given). After a regime ran,
+    only the regimes that read one of the variables it changed are put back, so the work follows the actual changes.
+    on_step(step, regime, variables) is called after every regime evaluation, if given.
+    stats (a profiling.RegimeStats) records calls, changes, contradictions and time per regime, if given.
+    Returns the number of regime evaluations of this run.
+    """
+    if dependency_index is None:
+        dependency_index = DEPENDENCY_INDEX if regimes is REGIMES else build_dependency_index(regimes)
+
+    variables = context.variables
+    justifications = context.justifications
+    agenda = deque(regimes if start is None else start)
+    queued = set(regime.name for regime in agenda)
+    step = 0
+
+    while agenda:
+        regime = agenda.popleft()
+        queued.discard(regime.name)
+
+        before = [variables[variable] for variable in regime.writes]
+        if justifications is not None:
+            known = [variable for variable in regime.reads if variables[variable] != UNKNOWN]
+        if stats is None:
+            regime.propagate(variables, context)
+        else:
+            reported = len(context.contradictions)
+            started = perf_counter()
+            regime.propagate(variables, context)
+            elapsed = perf_counter() - started
+        step += 1
+
+        changed = False
+        for variable, old_status in zip(regime.writes, before):
+            if variables[variable] != old_status:
+                changed = True
+                if justifications is not None:
+                    justifications[variable] = Justification(
+                        regime.name, tuple(name for name in known if name != variable))
+                for dependent in dependency_index.get(variable, ()):
+                    if dependent.name not in queued:
+                        queued.add(dependent.name)
+                        agenda.append(dependent)
+
+        if stats is not None:
+            stats.record(regime.name, changed, len(context.contradictions) > reported, elapsed)
+
+        if on_step is not None:
+            on_step(step, regime, variables)
+
+    context.iterations += step
+    return step
+
+
+
+# --- 6. Main part of algorithm. Propagate all rules ---
+# Result of one solve: final variables, contradictions found (list of Contradiction), the
+# number of regime evaluations the agenda needed and, for a traced solve, the Justification of
+# every derived variable (None otherwise; see whatif.resolve).
+SolveResult = namedtuple('SolveResult', ['variables', 'contradictions', 'iterations', 'justifications'],
+                         defaults=(None,))
+
+
+def solve_with_regimes(initial_variables, regimes=REGIMES, dependency_index=None, on_step=None, stats=None,
+                       trace=False):
+    """
+    Propagate a copy of initial_variables with the given regimes and return a SolveResult.
+    Nothing is printed, on_step(step, regime, variables) is called after every regime evaluation if given.
+    stats is an optional profiling.RegimeStats that accumulates per-regime counters and timings.
+    trace=True also records the justifications of the derived variables.
+    """
+    context = SolverContext(initial_variables.copy(), {} if trace else None)
+
+    # Only the regimes that read a changed variable are evaluated again
+    run_agenda(context, regimes, dependency_index, on_step, stats=stats)
 
     # If a contradiction is found in the middle of iterations, the algorithm will not stop immediately.
-    # It will just get a flag, that at least one of the variables face CONTRADICTION
-    # It continues running other propagations until the system reaches stability,
-    # then exits the loop. 
-    # Finally, the contradiction flag is checked here.
+    # It will just record it, and continues running other propagations until the system reaches stability.
     # Future Enhancement :
-    # 1. Able to log which iteration make which contradition
-    # 2. Now we mostly only cover the contradiction on Pi-* variables, 
+    # Now we mostly only cover the contradiction on Pi-* variables, 
     # other variables only covered when it is so clear like INCREASE against DECREASE in some variable.
-    # if variable changes due to propagation and contradict, only Pi-variables are showing the warning
     # Introduce enhanced propagation rules so the system can check contradictions not only on Pi-* variables, 
     # but also on the core physical variables (e.g.Pin,Pout,Q,Aopen,x, P). 
-    if CONTRADICTION_FOUND:
+    return context.result()
+
+
+def solve_pressure_regulator(initial_variables, on_step=None, stats=None, trace=False):
+    """
+    Solve the pressure regulator silently and return a SolveResult.
+    """
+    return solve_with_regimes(initial_variables, REGIMES, DEPENDENCY_INDEX, on_step, stats, trace)
+
+
+def print_step(step, regime, variables):
+    """
+    Print the variables after one regime evaluation (on_step callback for the interactive mode).
+    """
+    print(f"Step {step} ({regime.name}):")
+    print(format_variables(variables))
+
+
+def solve_and_print(initial_variables, solve=None, model=None):
+    """
+    Interactive mode: solve the pressure regulator (or another solve function with the same
+    signature) and print every step and the end status. On a contradiction, a minimal set of
+    conflicting inputs is computed with the same rules (explain.py): model is the compiled model
+    solve runs, None for the hand-written regimes of solve_pressure_regulator.
+    """
+    solve = solve or solve_pressure_regulator
+    print("--- INITIAL STATUS ---")
+    print(format_variables(initial_variables))
+    print("-" * 20)
+
+    result = solve(initial_variables, on_step=print_step)
+
+    print("\n--- END STATUS ---")
+    for contradiction in result.contradictions:
+        print(format_contradiction(contradiction))
+
+    if result.contradictions:
         print(">>> CONTRADICTION FOUND <<<")
+        # Imported here: explain depends on this module
+        from explain import minimal_conflict, format_conflict
+
+        conflict = minimal_conflict(initial_variables, model)
+        if conflict is not None:
+            print(f"Minimal conflicting inputs: {format_conflict(conflict)}")
     else:
         print(">>> NO CONTRADICTION FOUND <<<")
 
     print("Last Variables Stage:")
-    print(variables)
+    print(format_variables(result.variables))
+    return result
     
 
-# --- 6. Example ---
+# --- 7. Example ---
+# The predefined scenarios of the menu: number -> (description, initial state)
+SCENARIOS = {
+    '1': ("Scenario 1: P_out constant, P_in increasing", {
+        'P_in': INCREASE,
+        'P_out': CONSTANT,
+        'Q': UNKNOWN,
+        'A_open': UNKNOWN,
+        'x': UNKNOWN,
+        'P': UNKNOWN,
+        'Pi_A1': CONSTANT,
+        'Pi_A2': UNKNOWN,
+        'Pi_B1': UNKNOWN,
+        'Pi_C1': UNKNOWN,
+        'Pi_C2': UNKNOWN,
+    }),
+    '2': ("Scenario 2: P_in constant, P_out decreasing", {
+        'P_in': CONSTANT,
+        'P_out': DECREASE,
+        'Q': UNKNOWN,
+        'A_open': UNKNOWN,
+        'x': UNKNOWN,
+        'P': UNKNOWN,
+        'Pi_A1': CONSTANT,
+        'Pi_A2': UNKNOWN,
+        'Pi_B1': UNKNOWN,
+        'Pi_C1': UNKNOWN,
+        'Pi_C2': UNKNOWN,
+    }),
+    '3': ("Scenario 3: P_in increasing, P_out increasing", {
+        'P_in': INCREASE,
+        'P_out': INCREASE,
+        'Q': UNKNOWN,
+        'A_open': UNKNOWN,
+        'x': UNKNOWN,
+        'P': UNKNOWN,
+        'Pi_A1': CONSTANT,
+        'Pi_A2': UNKNOWN,
+        'Pi_B1': UNKNOWN,
+        'Pi_C1': UNKNOWN,
+        'Pi_C2': UNKNOWN,
+    }),
+    '4': ("Scenario 4: P_in increasing, P_out is not determined", {
+        'P_in': INCREASE,
+        'P_out': UNKNOWN,
+        'Q': CONSTANT,
+        'A_open': INCREASE,
+        'x': UNKNOWN,
+        'P': UNKNOWN,
+        'Pi_A1': UNKNOWN,
+        'Pi_A2': UNKNOWN,
+        'Pi_B1': UNKNOWN,
+        'Pi_C1': UNKNOWN,
+        'Pi_C2': UNKNOWN,
+    }),
+    '5': ("Scenario 5: P_in constant, P_out increasing", {
+        'P_in': CONSTANT,
+        'P_out': INCREASE,
+        'Q': UNKNOWN,
+        'A_open': UNKNOWN,
+        'x': UNKNOWN,
+        'P': UNKNOWN,
+        'Pi_A1': UNKNOWN,
+        'Pi_A2': UNKNOWN,
+        'Pi_B1': UNKNOWN,
+        'Pi_C1': UNKNOWN,
+        'Pi_C2': UNKNOWN,
+    }),
+}
+
+
 # Main function to run the simulation with user-selectable options.
-def main():
+# solve is solve_pressure_regulator unless another model variant is given, model its compiled model.
+def main(solve=None, model=None):
     print("Select the scenario you want to run:")
-    print("1. Scenario 1: P_out constant, P_in increasing")
-    print("2. Scenario 2: P_in constant, P_out decreasing")
-    print("3. Scenario 3: P_in increasing, P_out increasing")
-    print("4. Scenario 4: P_in increasing, P_out is not determined")
-    print("5. Scenario 5: P_in constant, P_out increasing")
+    for number, (description, _) in SCENARIOS.items():
+        print(f"{number}. {description}")
     print("6. Manual Input")
 
     choice = input("Make your choice (1/2/3/4/5/6): ")
     
-    if choice == '1':
-        initial_state = {
-            'P_in': INCREASE,
-            'P_out': CONSTANT,
-            'Q': UNKNOWN,
-            'A_open': UNKNOWN,
-            'x': UNKNOWN,
-            'P': UNKNOWN,
-            'Pi_A1': CONSTANT,
-            'Pi_A2': UNKNOWN,
-            'Pi_B1': UNKNOWN,
-            'Pi_C1': UNKNOWN,
-            'Pi_C2': UNKNOWN,
-        }
-        solve_pressure_regulator(initial_state)
-    
-    elif choice == '2':
-        initial_state = {
-            'P_in': CONSTANT,
-            'P_out': DECREASE,
-            'Q': UNKNOWN,
-            'A_open': UNKNOWN,
-            'x': UNKNOWN,
-            'P': UNKNOWN,
-            'Pi_A1': CONSTANT,
-            'Pi_A2': UNKNOWN,
-            'Pi_B1': UNKNOWN,
-            'Pi_C1': UNKNOWN,
-            'Pi_C2': UNKNOWN,
-        }
-        solve_pressure_regulator(initial_state)
-
-    elif choice == '3':
-        initial_state = {
-            'P_in': INCREASE,
-            'P_out': INCREASE,
-            'Q': UNKNOWN,
-            'A_open': UNKNOWN,
-            'x': UNKNOWN,
-            'P': UNKNOWN,
-            'Pi_A1': CONSTANT,
-            'Pi_A2': UNKNOWN,
-            'Pi_B1': UNKNOWN,
-            'Pi_C1': UNKNOWN,
-            'Pi_C2': UNKNOWN,
-        }
-        solve_pressure_regulator(initial_state)
-
-    elif choice == '4':
-        initial_state = {
-            'P_in': INCREASE,
-            'P_out': UNKNOWN,
-            'Q': CONSTANT,
-            'A_open': INCREASE,
-            'x': UNKNOWN,
-            'P': UNKNOWN,
-            'Pi_A1': UNKNOWN,
-            'Pi_A2': UNKNOWN,
-            'Pi_B1': UNKNOWN,
-            'Pi_C1': UNKNOWN,
-            'Pi_C2': UNKNOWN,
-        }
-        solve_pressure_regulator(initial_state)
-
-    elif choice == '5':
-        initial_state = {
-            'P_in': CONSTANT,
-            'P_out': INCREASE,
-            'Q': UNKNOWN,
-            'A_open': UNKNOWN,
-            'x': UNKNOWN,
-            'P': UNKNOWN,
-            'Pi_A1': UNKNOWN,
-            'Pi_A2': UNKNOWN,
-            'Pi_B1': UNKNOWN,
-            'Pi_C1': UNKNOWN,
-            'Pi_C2': UNKNOWN,
-        }
-        solve_pressure_regulator(initial_state)
+    if choice in SCENARIOS:
+        _, initial_state = SCENARIOS[choice]
+        solve_and_print(initial_state, solve, model)
 
     elif choice == '6':
         status_mapping = {
@@ -565,9 +725,9 @@ def main():
             elif status == '':
                 initial_state[var_to_set] = UNKNOWN
             else:
-                print(f"WARNING: Input '{status}' invalid. Status {var_to_set} set to '{UNKNOWN}'.")
+                print(f"WARNING: Input '{status}' invalid. Status {var_to_set} set to '{STATUS_NAMES[UNKNOWN]}'.")
                 
-        solve_pressure_regulator(initial_state)
+        solve_and_print(initial_state, solve, model)
             
     else:
         print("Invalid option")
@@ -0,0 +1,256 @@
+# Non-interactive batch command for scenario files.
+#
+# Reads initial states from a JSONL file (one JSON object per line) or a CSV file (one column per
+# variable), splits them into chunks that are solved by a ProcessPoolExecutor, and streams one JSON
+# result per scenario to the output, in input order.
+#
+# Example:
+#   python batch_cli.py scenarios.jsonl --output results.jsonl --workers 16 --chunk-size 20000
+#
+# --engine compiled solves every scenario with one or more models of models/ in the same pass, e.g. both
+# variants of the regulator (one result line per scenario and model, with a 'model' key):
+#   python batch_cli.py scenarios.jsonl --engine compiled --model pressure_regulator --model pressure_regulator_physical_link
+#
+# The batch and compiled engines solve a whole chunk at once with the vectorized solvers of batch_solver
+# (solve_batch, solve_model_batch per model); the agenda engine solves scenario by scenario and also lists
+# every contradiction. Every result line has the final statuses and 'contradiction'. The work counter
+# depends on the engine: 'sweeps' (passes over all regimes, batch and compiled) or 'evaluations'
+# (regime evaluations, agenda).
+#
+# A status can be written as a code (0-3), a letter (U, I, D, C) or a name (Increased, ...).
+# Variables that are not given start as UNKNOWN. Columns/keys that are not variables are ignored,
+# except 'id', which is copied into the result. A line that cannot be read stops the run with
+# 'path:line: reason', e.g. "scenarios.jsonl:12: invalid status 'X' for P_in".
+
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+from Code import (
+    UNKNOWN,
+    INCREASE,
+    DECREASE,
+    CONSTANT,
+    STATUS_NAMES,
+    STATE_VARIABLES,
+    format_contradiction,
+    solve_pressure_regulator,
+)
+from state import State
+
+
+# --- 1. Reading scenarios ---
+STATUS_MAPPING = {
+    'U': UNKNOWN, 'I': INCREASE, 'D': DECREASE, 'C': CONSTANT,
+    'UNKNOWN': UNKNOWN, 'INCREASED': INCREASE, 'DECREASED': DECREASE, 'CONSTANT': CONSTANT,
+    'INCREASE': INCREASE, 'DECREASE': DECREASE,
+}
+
+
+class ScenarioError(ValueError):
+    """
+    A scenario file line that cannot be read, the message starts with 'path:line:'.
+    """
+
+
+def parse_status(value, variable='status'):
+    """
+    Convert a status from a scenario file into its code (variable only names it in the error).
+    """
+    if isinstance(value, int) and UNKNOWN <= value <= CONSTANT:
+        return value
+    text = str(value).strip().upper()
+    if text == '':
+        return UNKNOWN
+    if text.isdigit() and int(text) <= CONSTANT:
+        return int(text)
+    if text not in STATUS_MAPPING:
+        raise ValueError(f"invalid status '{value}' for {variable}")
+    return STATUS_MAPPING[text]
+
+
+def parse_scenario(record):
+    """
+    Convert one record (dictionary from JSON or CSV) into (id, state.State).
+    """
+    if not isinstance(record, dict):
+        raise ValueError(f"expected an object with one key per variable, got {type(record).__name__}")
+    codes = [parse_status(record[name], name) if name in record else UNKNOWN for name in STATE_VARIABLES]
+    return record.get('id'), State.from_codes(codes)
+
+
+def read_scenarios(path, file_format=None):
+    """
+    Yield (id, State) for every scenario of a JSONL or CSV file, without loading the whole file.
+    A line that cannot be read raises ScenarioError.
+    """
+    if file_format is None:
+        file_format = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+    with open(path, newline='') as scenario_file:
+        if file_format == 'csv':
+            reader = csv.DictReader(scenario_file)
+            for record in reader:
+                try:
+                    scenario = parse_scenario(record)
+                except ValueError as error:
+                    raise ScenarioError(f"{path}:{reader.line_num}: {error}") from None
+                yield scenario
+        else:
+            for line_number, line in enumerate(scenario_file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    scenario = parse_scenario(json.loads(line))
+                except json.JSONDecodeError as error:
+                    raise ScenarioError(f"{path}:{line_number}: invalid JSON ({error.msg})") from None
+                except ValueError as error:
+                    raise ScenarioError(f"{path}:{line_number}: {error}") from None
+                yield scenario
+
+
+# --- 2. Solving one chunk (runs in the worker processes) ---
+def _result_record(scenario_id, variables, contradiction_found, contradictions, work,
+                   variable_names=STATE_VARIABLES, model=None):
+    # work is ('sweeps' or 'evaluations', count), see the header
+    record = {} if scenario_id is None else {'id': scenario_id}
+    if model is not None:
+        record['model'] = model
+    record.update((name, STATUS_NAMES[variables[name]]) for name in variable_names)
+    record['contradiction'] = contradiction_found
+    if contradictions is not None:
+        record['contradictions'] = contradictions
+    record[work[0]] = work[1]
+    return json.dumps(record)
+
+
+def solve_chunk(engine, scenarios, models=()):
+    """
+    Solve a list of (id, State) and return one JSON line per scenario.
+    engine 'batch' uses the vectorized solver (contradiction flag only),
+    engine 'agenda' solves scenario by scenario and also lists the contradictions,
+    engine 'compiled' solves the chunk with each of the named models (model_registry, vectorized,
+    contradiction flag only) and returns one line per scenario and model.
+    """
+    lines = []
+    if engine == 'compiled':
+        from batch_solver import solve_model_batch
+        from model_registry import load_model
+
+        codes = np.array([state.codes() for _, state in scenarios], dtype=np.uint8).reshape(-1, len(STATE_VARIABLES))
+        solved = []
+        for name in models:
+            model = load_model(name)
+            # Variables a scenario file cannot set stay UNKNOWN
+            rows = np.zeros((len(scenarios), len(model.variables)), dtype=np.uint8)
+            for column, variable in enumerate(model.variables):
+                if variable in STATE_VARIABLES:
+                    rows[:, column] = codes[:, STATE_VARIABLES.index(variable)]
+            solved.append((name, model.variables, solve_model_batch(model, rows)))
+
+        for position, (scenario_id, _) in enumerate(scenarios):
+            for name, variable_names, (final_states, contradiction_mask, iterations) in solved:
+                variables = dict(zip(variable_names, final_states[position].tolist()))
+                lines.append(_result_record(scenario_id, variables, bool(contradiction_mask[position]), None,
+                                            ('sweeps', int(iterations[position])), variable_names, name))
+        return lines
+
+    if engine == 'batch':
+        from batch_solver import solve_batch
+
+        final_states, contradiction_mask, iterations = solve_batch([state.codes() for _, state in scenarios])
+        for (scenario_id, _), row, contradiction_found, count in zip(scenarios, final_states, contradiction_mask, iterations):
+            variables = dict(zip(STATE_VARIABLES, row.tolist()))
+            lines.append(_result_record(scenario_id, variables, bool(contradiction_found), None, ('sweeps', int(count))))
+    else:
+        for scenario_id, state in scenarios:
+            result = solve_pressure_regulator(state.to_dict())
+            contradictions = [format_contradiction(contradiction) for contradiction in result.contradictions]
+            lines.append(_result_record(scenario_id, result.variables, bool(contradictions), contradictions,
+                                        ('evaluations', result.iterations)))
+    return lines
+
+
+# --- 3. Process pool driver ---
+# Models of the 'compiled' engine when no --model is given
+DEFAULT_MODELS = ('pressure_regulator',)
+
+
+def chunked(iterable, chunk_size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def solve_stream(scenarios, engine='batch', workers=None, chunk_size=10000, models=DEFAULT_MODELS):
+    """
+    Yield the result lines of every scenario in input order.
+    At most 2 chunks per worker are in flight, so memory stays bounded for any input size.
+    workers=None uses one worker per CPU.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1.")
+    if workers == 1:
+        for chunk in chunked(scenarios, chunk_size):
+            yield from solve_chunk(engine, chunk, models)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunked(scenarios, chunk_size):
+            pending.append(executor.submit(solve_chunk, engine, chunk, models))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve pressure regulator scenarios from a JSONL or CSV file.")
+    parser.add_argument('input', help="scenario file (.jsonl or .csv)")
+    parser.add_argument('-o', '--output', help="result file (JSONL), default: standard output")
+    parser.add_argument('--format', choices=('jsonl', 'csv'), help="input format, default: from the file extension")
+    parser.add_argument('--engine', choices=('batch', 'agenda', 'compiled'), default='batch',
+                        help="'batch' (vectorized, default), 'agenda' (also lists every contradiction) "
+                             "or 'compiled' (the models given with --model)")
+    parser.add_argument('-m', '--model', dest='models', action='append',
+                        help="model of models/ for --engine compiled, can be repeated (default: pressure_regulator)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="worker processes, default: CPU count")
+    parser.add_argument('-c', '--chunk-size', type=int, default=10000, help="scenarios per chunk")
+    args = parser.parse_args(argv)
+
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.models and args.engine != 'compiled':
+        parser.error("--model needs --engine compiled")
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        scenarios = read_scenarios(args.input, args.format)
+        for line in solve_stream(scenarios, args.engine, args.workers, args.chunk_size,
+                                 tuple(args.models or DEFAULT_MODELS)):
+            output.write(line)
+            output.write('\n')
+    except ScenarioError as error:
+        parser.exit(1, f"{parser.prog}: error: {error}\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+# Batched version of solve_pressure_regulator (Code.py) built on NumPy.
+#
+# Every scenario is one row of qualitative codes, in the column order of Code.STATE_VARIABLES:
+#   P_in, P_out, Q, A_open, x, P, Pi_A1, Pi_A2, Pi_B1, Pi_C1, Pi_C2
+# The Pi_A1, Pi_A2, Pi_B1, Pi_C1 and Pi_C2 rules are applied to the whole batch at once as
+# table lookups (PRODUCT_TABLE / DIVISION_TABLE), in the same order and with the same
+# contradiction handling as the propagate_pi_* functions, until every row reaches its fixpoint.
+
+import numpy as np
+
+from Code import (
+    UNKNOWN,
+    CONSTANT,
+    PRODUCT_TABLE,
+    DIVISION_TABLE,
+    STATE_VARIABLES,
+)
+
+
+# --- 1. Tables and column indexes ---
+PRODUCT = np.array(PRODUCT_TABLE, dtype=np.uint8)
+DIVISION = np.array(DIVISION_TABLE, dtype=np.uint8)
+
+COLUMN = {name: index for index, name in enumerate(STATE_VARIABLES)}
+P_IN, P_OUT, Q, A_OPEN, X, P = (COLUMN[name] for name in ('P_in', 'P_out', 'Q', 'A_open', 'x', 'P'))
+PI_A1, PI_A2, PI_B1, PI_C1, PI_C2 = (COLUMN[name] for name in ('Pi_A1', 'Pi_A2', 'Pi_B1', 'Pi_C1', 'Pi_C2'))
+
+
+def encode_states(scenarios):
+    """
+    Convert a list of scenario dictionaries (like the initial_state in main()) into a 2-D array of codes.
+    """
+    return np.array([[scenario[name] for name in STATE_VARIABLES] for scenario in scenarios], dtype=np.uint8)
+
+
+def decode_state(row):
+    """
+    Convert one row of codes back into a scenario dictionary.
+    """
+    return {name: int(row[index]) for index, name in enumerate(STATE_VARIABLES)}
+
+
+# Version of the rules below. The envisionment table stores their results on disk, so its header records
+# it, and it has to be raised whenever a rule changes its results.
+RULE_VERSION = 2
+
+
+# --- 2. Vectorized propagation rules ---
+# Every rule works on a block of rows and returns (changes_made, contradiction) as boolean masks.
+# As in Code.py, a row that hits a contradiction keeps what was already written in that call,
+# but the rule reports no change for it ("return False").
+def _assign(states, column, new_status, mask):
+    """
+    Write new_status into the column for the rows in mask where the column is UNKNOWN.
+    Rows where the column is known and different are reported as contradiction.
+    """
+    current = states[:, column]
+    known = mask & (new_status != UNKNOWN)
+    assigned = known & (current == UNKNOWN)
+    contradiction = known & (current != UNKNOWN) & (current != new_status)
+    states[:, column] = np.where(assigned, new_status, current)
+    return assigned, contradiction
+
+
+def propagate_pi_a1(states):
+    """
+    Pi_A1 = (Q * rho^1/2) / (A_open * Pin^3/2), rho is CONSTANT.
+    """
+    numerator_status = states[:, Q]
+    denominator_status = PRODUCT[states[:, A_OPEN], states[:, P_IN]]
+    new_pi_a1_status = DIVISION[numerator_status, denominator_status]
+
+    everything = np.ones(len(states), dtype=bool)
+    changes_made, contradiction = _assign(states, PI_A1, new_pi_a1_status, everything)
+
+    # If Pi_A1 is CONSTANT, Q follows the denominator; a known Q that Q / denominator could not
+    # decide (I/D or D/I) contradicts it
+    constant_branch = ((new_pi_a1_status == UNKNOWN) & (states[:, PI_A1] == CONSTANT)
+                       & (denominator_status != UNKNOWN))
+    q_from_denominator = constant_branch & (numerator_status == UNKNOWN)
+    contradiction |= constant_branch & (numerator_status != UNKNOWN)
+    states[:, Q] = np.where(q_from_denominator, denominator_status, states[:, Q])
+    changes_made |= q_from_denominator
+
+    return changes_made & ~contradiction, contradiction
+
+
+def propagate_pi_a2(states):
+    """
+    Pi_A2 = P_out / P_in.
+    """
+    new_pi_a2_status = DIVISION[states[:, P_OUT], states[:, P_IN]]
+    everything = np.ones(len(states), dtype=bool)
+    changes_made, contradiction = _assign(states, PI_A2, new_pi_a2_status, everything)
+
+    # P_in = P_out / Pi_A2
+    pi_known = ~contradiction & (states[:, PI_A2] != UNKNOWN)
+    pin_branch = pi_known & (states[:, P_OUT] != UNKNOWN)
+    new_pin_status = DIVISION[states[:, P_OUT], states[:, PI_A2]]
+    assigned, failed = _assign(states, P_IN, new_pin_status, pin_branch)
+    changes_made |= assigned
+    contradiction |= failed
+
+    # P_out = Pi_A2 * P_in
+    pout_branch = pi_known & ~pin_branch & (states[:, P_IN] != UNKNOWN)
+    new_pout_status = PRODUCT[states[:, PI_A2], states[:, P_IN]]
+    assigned, failed = _assign(states, P_OUT, new_pout_status, pout_branch)
+    changes_made |= assigned
+    contradiction |= failed
+
+    return changes_made & ~contradiction, contradiction
+
+
+def propagate_pi_b1(states):
+    """
+    Pi_B1 = (x * P) / K, K is CONSTANT.
+    """
+    new_pi_b1_status = PRODUCT[states[:, X], states[:, P]]
+    everything = np.ones(len(states), dtype=bool)
+    changes_made, contradiction = _assign(states, PI_B1, new_pi_b1_status, everything)
+
+    pi_known = ~contradiction & (states[:, PI_B1] != UNKNOWN)
+    x_unknown = states[:, X] == UNKNOWN
+    p_unknown = states[:, P] == UNKNOWN
+
+    # x = Pi_B1 / P
+    x_branch = pi_known & x_unknown & ~p_unknown
+    assigned, failed = _assign(states, X, DIVISION[states[:, PI_B1], states[:, P]], x_branch)
+    changes_made |= assigned
+    contradiction |= failed
+
+    # P = Pi_B1 / x
+    p_branch = pi_known & ~x_branch & p_unknown & ~x_unknown
+    assigned, failed = _assign(states, P, DIVISION[states[:, PI_B1], states[:, X]], p_branch)
+    changes_made |= assigned
+    contradiction |= failed
+
+    return changes_made & ~contradiction, contradiction
+
+
+def propagate_pi_c1(states):
+    """
+    Pi_C1 = P / Pout.
+    """
+    new_pi_c1_status = DIVISION[states[:, P], states[:, P_OUT]]
+    everything = np.ones(len(states), dtype=bool)
+    changes_made, contradiction = _assign(states, PI_C1, new_pi_c1_status, everything)
+
+    pi_known = ~contradiction & (states[:, PI_C1] != UNKNOWN)
+    pout_unknown = states[:, P_OUT] == UNKNOWN
+    p_unknown = states[:, P] == UNKNOWN
+
+    # P_out = P / Pi_C1
+    pout_branch = pi_known & pout_unknown & ~p_unknown
+    assigned, failed = _assign(states, P_OUT, DIVISION[states[:, P], states[:, PI_C1]], pout_branch)
+    changes_made |= assigned
+    contradiction |= failed
+
+    # P = Pi_C1 * P_out
+    p_branch = pi_known & ~pout_branch & p_unknown & ~pout_unknown
+    assigned, failed = _assign(states, P, PRODUCT[states[:, PI_C1], states[:, P_OUT]], p_branch)
+    changes_made |= assigned
+    contradiction |= failed
+
+    return changes_made & ~contradiction, contradiction
+
+
+def propagate_pi_c2(states):
+    """
+    Pi_C2 = x / A_open.
+    """
+    new_pi_c2_status = DIVISION[states[:, X], states[:, A_OPEN]]
+    everything = np.ones(len(states), dtype=bool)
+    changes_made, contradiction = _assign(states, PI_C2, new_pi_c2_status, everything)
+
+    pi_known = ~contradiction & (states[:, PI_C2] != UNKNOWN)
+    a_open_unknown = states[:, A_OPEN] == UNKNOWN
+    x_unknown = states[:, X] == UNKNOWN
+
+    # A_open = x / Pi_C2
+    a_open_branch = pi_known & a_open_unknown & ~x_unknown
+    assigned, failed = _assign(states, A_OPEN, DIVISION[states[:, X], states[:, PI_C2]], a_open_branch)
+    changes_made |= assigned
+    contradiction |= failed
+
+    # x = Pi_C2 * A_open
+    x_branch = pi_known & ~a_open_branch & x_unknown & ~a_open_unknown
+    assigned, failed = _assign(states, X, PRODUCT[states[:, PI_C2], states[:, A_OPEN]], x_branch)
+    changes_made |= assigned
+    contradiction |= failed
+
+    return changes_made & ~contradiction, contradiction
+
+
+# Same order as one iteration of solve_pressure_regulator:
+# ensemble A (Pi_A1, Pi_A2), contact variables (Pi_C1, Pi_C2), ensemble B (Pi_B1)
+SWEEP = (propagate_pi_a1, propagate_pi_a2, propagate_pi_c1, propagate_pi_c2, propagate_pi_b1)
+
+
+# --- 3. Batched solver ---
+def solve_batch(initial_states):
+    """
+    Propagate every row of initial_states (shape: scenarios x 11 variables) until it is stable.
+    Returns (final_states, contradiction_mask, iterations), where iterations counts the sweeps
+    (one pass over the five regimes) each row needed, including the last one without changes.
+    """
+    states = np.array(initial_states, dtype=np.uint8)
+    if states.ndim != 2 or states.shape[1] != len(STATE_VARIABLES):
+        raise ValueError(f"Expected an array of shape (scenarios, {len(STATE_VARIABLES)}), got {states.shape}.")
+    if states.size and states.max() > CONSTANT:
+        raise ValueError("Every status must be one of the codes UNKNOWN, INCREASE, DECREASE, CONSTANT.")
+
+    count = len(states)
+    contradiction_mask = np.zeros(count, dtype=bool)
+    iterations = np.zeros(count, dtype=np.uint16)
+
+    # Only the rows that still changed in the previous sweep are propagated again
+    active = np.arange(count)
+    while len(active):
+        iterations[active] += 1
+        block = states[active]
+        changes_made = np.zeros(len(active), dtype=bool)
+        contradiction = np.zeros(len(active), dtype=bool)
+
+        for propagate in SWEEP:
+            regime_changes, regime_contradiction = propagate(block)
+            changes_made |= regime_changes
+            contradiction |= regime_contradiction
+
+        states[active] = block
+        contradiction_mask[active] |= contradiction
+        active = active[changes_made]
+
+    return states, contradiction_mask, iterations
+
+
+# --- 4. Batched compiled models ---
+def solve_model_batch(model, initial_states):
+    """
+    Vectorized pi_model.solve_model: every kernel of a compiled model is one table lookup over the whole
+    block, in regime order, sweep after sweep until no row changes any more.
+    initial_states has one column per variable of model.variables (in that order).
+    Returns (final_states, contradiction_mask, iterations) like solve_batch, iterations counting sweeps.
+    """
+    states = np.array(initial_states, dtype=np.uint8)
+    if states.ndim != 2 or states.shape[1] != len(model.variables):
+        raise ValueError(f"Expected an array of shape (scenarios, {len(model.variables)}), got {states.shape}.")
+    if states.size and states.max() > CONSTANT:
+        raise ValueError("Every status must be one of the codes UNKNOWN, INCREASE, DECREASE, CONSTANT.")
+
+    column = {name: index for index, name in enumerate(model.variables)}
+    kernels = []
+    for kernel in model.kernels:
+        width = len(kernel.variables)
+        kernels.append((np.array(kernel.table, dtype=np.uint32),
+                        tuple((2 * position, column[variable]) for position, variable in enumerate(kernel.variables)),
+                        (1 << (2 * width)) - 1, 2 * width))
+
+    count = len(states)
+    contradiction_mask = np.zeros(count, dtype=bool)
+    iterations = np.zeros(count, dtype=np.uint16)
+
+    active = np.arange(count)
+    while len(active):
+        iterations[active] += 1
+        block = states[active]
+        changes_made = np.zeros(len(active), dtype=bool)
+        contradiction = np.zeros(len(active), dtype=bool)
+
+        for table, positions, state_mask, contradiction_shift in kernels:
+            index = np.zeros(len(block), dtype=np.uint32)
+            for shift, variable in positions:
+                index |= block[:, variable].astype(np.uint32) << shift
+            entry = table[index]
+            # As in pi_model.make_propagate, a contradiction leaves the row as it was
+            found = (entry >> contradiction_shift).astype(bool)
+            codes = np.where(found, index, entry & state_mask)
+            changes_made |= codes != index
+            contradiction |= found
+            for shift, variable in positions:
+                block[:, variable] = (codes >> shift) & 3
+
+        states[active] = block
+        contradiction_mask[active] |= contradiction
+        active = active[changes_made]
+
+    return states, contradiction_mask, iterations
@@ -0,0 +1,118 @@
+# Scaling benchmark on synthetic models (model_generator.py).
+#
+# For growing numbers of ensembles, reports model size, generation and compile time,
+# solve time, regime evaluations and peak memory of the solve, using pi_model.solve_model
+# (the same agenda engine as solve_pressure_regulator).
+# A group only propagates once all but one of its variables are known, so with few variables
+# given almost nothing is derived (10% given: about 2 variables derived per 100 ensembles, one
+# evaluation per group). Every size is therefore measured for a sweep of known fractions, and
+# the number of variables given and derived per solve shows how much propagation was done.
+#
+#   python benchmarks/bench_scaling.py --sizes 10 100 1000 5000 --known-fraction 0.1 0.5 0.7 --output scaling.json
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_generator import generate_model, random_initial_state  # noqa: E402
+from pi_model import compile_model, solve_model  # noqa: E402
+from Code import UNKNOWN  # noqa: E402
+
+
+DEFAULT_SIZES = (10, 100, 1000, 5000)
+DEFAULT_KNOWN_FRACTIONS = (0.1, 0.5, 0.7)
+
+
+def measure_solves(spec, model, known_fraction, solves, seed):
+    """
+    Solve random initial states with known_fraction of the variables given; times, regime
+    evaluations, variables given and derived (pi-groups included) and peak memory of one solve.
+    """
+    initial_states = [random_initial_state(spec, known_fraction, seed=seed + index) for index in range(solves)]
+
+    solve_seconds = []
+    evaluations = []
+    given = []
+    derived = []
+    contradictions = 0
+    for initial_state in initial_states:
+        start = time.perf_counter()
+        result = solve_model(model, initial_state)
+        solve_seconds.append(time.perf_counter() - start)
+        evaluations.append(result.iterations)
+        given.append(sum(1 for status in initial_state.values() if status != UNKNOWN))
+        derived.append(sum(1 for status in result.variables.values() if status != UNKNOWN) - given[-1])
+        contradictions += bool(result.contradictions)
+
+    tracemalloc.start()
+    solve_model(model, initial_states[0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'known_fraction': known_fraction,
+        'solve_seconds_min': min(solve_seconds),
+        'solve_seconds_mean': sum(solve_seconds) / len(solve_seconds),
+        'given_mean': sum(given) / len(given),
+        'derived_mean': sum(derived) / len(derived),
+        'regime_evaluations_mean': sum(evaluations) / len(evaluations),
+        'evaluations_per_group': sum(evaluations) / len(evaluations) / max(1, len(spec['groups'])),
+        'solves_with_contradiction': contradictions,
+        'solve_peak_memory_bytes': peak,
+    }
+
+
+def measure(ensemble_count, known_fractions, solves, seed):
+    """
+    Generate and compile a model of ensemble_count ensembles, then one row per known fraction.
+    """
+    started = time.perf_counter()
+    spec = generate_model(ensemble_count, seed=seed)
+    generated = time.perf_counter()
+    model = compile_model(spec)
+    compiled = time.perf_counter()
+
+    size = {
+        'ensembles': ensemble_count,
+        'variables': len(spec['variables']),
+        'groups': len(spec['groups']),
+        'contact_groups': len(spec['contact_groups']),
+        'generate_seconds': generated - started,
+        'compile_seconds': compiled - generated,
+    }
+    return [dict(size, **measure_solves(spec, model, known_fraction, solves, seed)) for known_fraction in known_fractions]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure how solve time and memory scale with model size.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="numbers of ensembles")
+    parser.add_argument('--known-fraction', type=float, nargs='+', default=list(DEFAULT_KNOWN_FRACTIONS),
+                        help="fractions of variables given initially, every size is measured for each")
+    parser.add_argument('--solves', type=int, default=5, help="random initial states per size")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    rows = []
+    print(f"{'ensembles':>9s} {'variables':>9s} {'groups':>7s} {'known':>5s} {'given':>7s} {'derived':>7s} "
+          f"{'compile s':>10s} {'solve ms':>10s} {'evals':>9s} {'evals/grp':>9s} {'peak KiB':>9s}")
+    for size in args.sizes:
+        for row in measure(size, args.known_fraction, args.solves, args.seed):
+            rows.append(row)
+            print(f"{row['ensembles']:9d} {row['variables']:9d} {row['groups']:7d} {row['known_fraction']:5.2f} "
+                  f"{row['given_mean']:7.0f} {row['derived_mean']:7.1f} {row['compile_seconds']:10.3f} "
+                  f"{row['solve_seconds_mean'] * 1e3:10.3f} {row['regime_evaluations_mean']:9.0f} "
+                  f"{row['evaluations_per_group']:9.2f} {row['solve_peak_memory_bytes'] / 1024:9.0f}")
+
+    if args.output:
+        with open(args.output, 'w') as result_file:
+            json.dump(rows, result_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
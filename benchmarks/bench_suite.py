@@ -0,0 +1,206 @@
+# Reproducible benchmark suite for the qualitative solver.
+#
+# Measures:
+#   - determine_product_status and determine_division_status (all 16 status pairs)
+#   - every propagate_pi_* regime (on a fixed set of random states)
+#   - solve_pressure_regulator on the five scenarios of main()
+#   - solve_batch throughput on synthetic scenario sets of growing size
+#
+# Every measurement is the best of several repeats, in seconds per operation.
+# Results are written as JSON and can be compared with a stored baseline:
+#   python benchmarks/bench_suite.py --output bench.json
+#   python benchmarks/bench_suite.py --save-baseline                # store benchmarks/baseline.json
+#   python benchmarks/bench_suite.py --compare benchmarks/baseline.json
+# With --compare the exit code is 1 if any benchmark is slower than the baseline by more than --tolerance.
+# Timings only compare on the same machine and profile (Python, processor, --quick and --repeat): the
+# committed benchmarks/baseline.json records them in 'meta', and --compare warns when they differ.
+# On another machine, store a local baseline with --save-baseline first.
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Code  # noqa: E402
+from Code import STATE_VARIABLES, SCENARIOS  # noqa: E402
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+BATCH_SIZES = (1000, 10000, 100000, 1000000)
+QUICK_BATCH_SIZES = (1000, 10000)
+SEED = 12345
+
+
+def random_states(count, seed=SEED):
+    """
+    Fixed pseudo-random scenario dictionaries, so every run measures the same inputs.
+    """
+    generator = random.Random(seed)
+    return [{name: generator.randrange(4) for name in STATE_VARIABLES} for _ in range(count)]
+
+
+def best_time(function, number, repeat):
+    """
+    Best time of one call of function, in seconds.
+    """
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+
+# --- 1. Benchmarks ---
+def bench_operations(repeat):
+    pairs = [(a, b) for a in range(4) for b in range(4)]
+    results = {}
+    for name, operation in (('determine_product_status', Code.determine_product_status),
+                            ('determine_division_status', Code.determine_division_status)):
+        def run():
+            for a, b in pairs:
+                operation(a, b)
+        results[name] = best_time(run, 2000, repeat) / len(pairs)
+    return results
+
+
+def bench_regimes(repeat):
+    states = random_states(1000)
+    results = {}
+    for regime in Code.REGIMES:
+        copies = [dict(state) for state in states]
+        propagate = regime.propagate
+        context = Code.SolverContext(None)
+
+        def run():
+            for variables in copies:
+                propagate(variables, context)
+
+        # The regimes change their input, so every repeat gets fresh copies
+        timings = []
+        for _ in range(repeat):
+            copies[:] = [dict(state) for state in states]
+            del context.contradictions[:]
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+        results[f"propagate_{regime.name.lower()}"] = min(timings) / len(states)
+    return results
+
+
+def bench_scenarios(repeat):
+    results = {}
+    for number, (_, initial_state) in SCENARIOS.items():
+        results[f"solve_pressure_regulator[scenario_{number}]"] = best_time(
+            lambda: Code.solve_pressure_regulator(initial_state), 500, repeat)
+    return results
+
+
+def bench_batch(sizes, repeat):
+    import numpy as np
+    from batch_solver import solve_batch
+
+    generator = np.random.default_rng(SEED)
+    results = {}
+    for size in sizes:
+        states = generator.integers(0, 4, size=(size, len(STATE_VARIABLES)), dtype=np.uint8)
+        seconds = best_time(lambda: solve_batch(states), 1, max(1, repeat if size <= 100000 else 1))
+        # Stored per scenario, so sizes can be compared with each other
+        results[f"solve_batch[{size}]"] = seconds / size
+    return results
+
+
+def processor_name():
+    """
+    Model name of the processor (platform.processor() is empty on most Linux systems).
+    """
+    try:
+        with open('/proc/cpuinfo') as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def run_suite(quick=False, repeat=5):
+    results = {}
+    results.update(bench_operations(repeat))
+    results.update(bench_regimes(repeat))
+    results.update(bench_scenarios(repeat))
+    results.update(bench_batch(QUICK_BATCH_SIZES if quick else BATCH_SIZES, repeat))
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+            'processor': processor_name(),
+            'cpu_count': os.cpu_count(),
+            'profile': {'quick': quick, 'repeat': repeat},
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'unit': 'seconds per operation',
+        },
+        'results': results,
+    }
+
+
+# --- 2. Baseline comparison ---
+def compare(report, baseline, tolerance):
+    """
+    Print every benchmark against the baseline and return the names that are slower than allowed.
+    """
+    for key in ('python', 'implementation', 'machine', 'processor', 'profile'):
+        if report['meta'].get(key) != baseline['meta'].get(key):
+            print(f"warning: {key} differs from the baseline ({report['meta'].get(key)} against "
+                  f"{baseline['meta'].get(key)}), the timings are not comparable")
+    regressions = []
+    for name, seconds in report['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            print(f"{name:55s} {seconds * 1e6:12.3f} us   (not in baseline)")
+            continue
+        ratio = seconds / reference
+        marker = ''
+        if ratio > 1 + tolerance:
+            marker = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:55s} {seconds * 1e6:12.3f} us   x{ratio:5.2f}{marker}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the qualitative solver.")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', metavar='BASELINE', help="compare with a baseline JSON file")
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, metavar='PATH',
+                        help=f"store the results as baseline (default {DEFAULT_BASELINE})")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown before a regression (0.2 = 20%%)")
+    parser.add_argument('--repeat', type=int, default=5, help="repeats per benchmark, the best one is kept")
+    parser.add_argument('--quick', action='store_true', help="only the small batch sizes")
+    args = parser.parse_args(argv)
+
+    report = run_suite(quick=args.quick, repeat=args.repeat)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as result_file:
+                json.dump(report, result_file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) slower than the baseline by more than {args.tolerance:.0%}")
+            return 1
+    else:
+        for name, seconds in report['results'].items():
+            print(f"{name:55s} {seconds * 1e6:12.3f} us")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+# Thread-scaling benchmark for concurrent solves in one process.
+#
+# Every solve owns its Code.SolverContext, so solves can run on a thread pool without a lock.
+# This benchmark solves the same random scenarios with 1, 2, 4, ... threads, checks that every
+# result equals the single-threaded one (no state leaks between concurrent solves) and reports the
+# throughput and speedup per thread count.
+#
+# Threads only run Python code in parallel on a free-threaded CPython build (3.13t or newer, GIL
+# disabled); with the GIL the speedup stays around 1x. The report says which build was used.
+#
+#   python3.13t benchmarks/bench_threads.py --threads 1 2 4 8 --solves 200000 --output threads.json
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Code import solve_pressure_regulator  # noqa: E402
+from bench_suite import random_states  # noqa: E402
+from pi_model import PRESSURE_REGULATOR, compile_model, solve_model  # noqa: E402
+
+
+DEFAULT_THREADS = (1, 2, 4, 8)
+
+
+def gil_enabled():
+    """
+    False on a free-threaded build running without the GIL.
+    """
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+def make_solver(engine):
+    if engine == 'compiled':
+        model = compile_model(PRESSURE_REGULATOR)
+        return lambda initial_state: solve_model(model, initial_state)
+    return solve_pressure_regulator
+
+
+def solve_all(solve, states):
+    return [solve(state) for state in states]
+
+
+def run_threads(solve, states, thread_count):
+    """
+    Solve states split into one slice per thread. Returns (results in input order, seconds).
+    """
+    size = -(-len(states) // thread_count)
+    slices = [states[start:start + size] for start in range(0, len(states), size)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=thread_count) as executor:
+        parts = list(executor.map(lambda part: solve_all(solve, part), slices))
+    seconds = time.perf_counter() - started
+    return [result for part in parts for result in part], seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure how concurrent solves scale with threads.")
+    parser.add_argument('--threads', type=int, nargs='+', default=list(DEFAULT_THREADS))
+    parser.add_argument('--solves', type=int, default=50000, help="scenarios solved per thread count")
+    parser.add_argument('--engine', choices=('agenda', 'compiled'), default='agenda',
+                        help="hand-written regimes of Code.py or the compiled pi_model kernels")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    solve = make_solver(args.engine)
+    states = random_states(args.solves)
+    expected = solve_all(solve, states)
+
+    rows = []
+    print(f"Python {platform.python_version()} ({platform.python_implementation()}), "
+          f"GIL {'enabled' if gil_enabled() else 'disabled'}, engine {args.engine}")
+    print(f"{'threads':>7s} {'seconds':>9s} {'solves/s':>11s} {'speedup':>8s} {'same':>5s}")
+    for thread_count in args.threads:
+        results, seconds = run_threads(solve, states, thread_count)
+        same = results == expected
+        rows.append({
+            'threads': thread_count,
+            'seconds': seconds,
+            'solves_per_second': len(states) / seconds,
+            'results_match_serial': same,
+        })
+    baseline = rows[0]['seconds'] if rows[0]['threads'] == 1 else None
+    for row in rows:
+        row['speedup'] = baseline / row['seconds'] if baseline else None
+        speedup = f"{row['speedup']:7.2f}x" if baseline else f"{'-':>8s}"
+        print(f"{row['threads']:7d} {row['seconds']:9.3f} {row['solves_per_second']:11.0f} {speedup} "
+              f"{'yes' if row['results_match_serial'] else 'NO':>5s}")
+
+    if args.output:
+        report = {
+            'meta': {
+                'python': platform.python_version(),
+                'implementation': platform.python_implementation(),
+                'gil_enabled': gil_enabled(),
+                'cpu_count': os.cpu_count(),
+                'engine': args.engine,
+                'solves': args.solves,
+            },
+            'results': rows,
+        }
+        with open(args.output, 'w') as result_file:
+            json.dump(report, result_file, indent=2)
+
+    return 0 if all(row['results_match_serial'] for row in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
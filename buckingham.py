@@ -0,0 +1,162 @@
+# Automatic Buckingham-pi derivation from a dimension matrix.
+#
+# Every variable is given with the exponents of its base dimensions, for example
+#   'Q':    {'L': 3, 'T': -1}          (volume flow)
+#   'P_in': {'M': 1, 'L': -1, 'T': -2} (pressure)
+# A dimensionless group is a vector of integer exponents e with D * e = 0, where D is the
+# dimension matrix (one row per base dimension, one column per variable). The groups are a basis
+# of the integer nullspace of D, computed exactly with fractions and scaled to the smallest integers.
+#
+# Following the usual repeating-variable method, the last variables of the list become the
+# "repeating" ones: every group contains exactly one of the first (non-repeating) variables,
+# with a positive exponent. So the variable that should lead a group goes first in the list.
+#
+# Results are cached on disk (JSON), keyed by a hash of the dimension matrix, and can be turned
+# straight into the 'groups' of a pi_model spec.
+
+import hashlib
+import json
+import os
+from fractions import Fraction
+from math import gcd
+
+
+DEFAULT_CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".pi_cache")
+
+
+# --- 1. Exact linear algebra ---
+def dimension_matrix(variables):
+    """
+    Return (dimensions, names, matrix) for {variable: {dimension: exponent}}, matrix[dimension][variable].
+    """
+    names = list(variables)
+    dimensions = sorted({dimension for exponents in variables.values() for dimension in exponents})
+    matrix = [[Fraction(variables[name].get(dimension, 0)) for name in names] for dimension in dimensions]
+    return dimensions, names, matrix
+
+
+def _reduced_row_echelon(matrix, column_count):
+    """
+    Reduced row echelon form (in place) with the columns scanned in the given order.
+    Returns the pivot columns.
+    """
+    pivots = []
+    row = 0
+    for column in range(column_count):
+        pivot = next((r for r in range(row, len(matrix)) if matrix[r][column] != 0), None)
+        if pivot is None:
+            continue
+        matrix[row], matrix[pivot] = matrix[pivot], matrix[row]
+        pivot_value = matrix[row][column]
+        matrix[row] = [value / pivot_value for value in matrix[row]]
+        for other in range(len(matrix)):
+            if other != row and matrix[other][column] != 0:
+                factor = matrix[other][column]
+                matrix[other] = [a - factor * b for a, b in zip(matrix[other], matrix[row])]
+        pivots.append(column)
+        row += 1
+        if row == len(matrix):
+            break
+    return pivots
+
+
+def _smallest_integers(vector):
+    """
+    Scale a rational vector to the smallest integer vector with the same direction,
+    with a positive first non-zero entry.
+    """
+    denominator = 1
+    for value in vector:
+        denominator = denominator * value.denominator // gcd(denominator, value.denominator)
+    integers = [int(value * denominator) for value in vector]
+    divisor = 0
+    for value in integers:
+        divisor = gcd(divisor, abs(value))
+    integers = [value // divisor for value in integers]
+    leading = next(value for value in integers if value != 0)
+    return [-value for value in integers] if leading < 0 else integers
+
+
+def integer_nullspace(matrix, column_count):
+    """
+    Basis of the integer nullspace of matrix (rows of Fractions), one integer vector per free column.
+    The pivots are taken from the last columns first, so the free columns are the first ones.
+    """
+    # Scan the columns from the last to the first, so the repeating variables become pivots
+    order = list(range(column_count - 1, -1, -1))
+    reordered = [[row[column] for column in order] for row in matrix]
+    pivots = _reduced_row_echelon(reordered, column_count)
+    free_columns = [column for column in range(column_count) if column not in pivots]
+
+    basis = []
+    for free in free_columns:
+        solution = [Fraction(0)] * column_count
+        solution[free] = Fraction(1)
+        for row, pivot in enumerate(pivots):
+            solution[pivot] = -reordered[row][free]
+        # Back to the original column order
+        vector = [Fraction(0)] * column_count
+        for position, column in enumerate(order):
+            vector[column] = solution[position]
+        basis.append(_smallest_integers(vector))
+    # Groups in the order of their leading (non-repeating) variable
+    basis.sort(key=lambda vector: next(index for index, value in enumerate(vector) if value != 0))
+    return basis
+
+
+# --- 2. Pi-groups ---
+def derive_pi_groups(variables, prefix='Pi_'):
+    """
+    Return {group name: {variable: exponent}} for {variable: {dimension: exponent}}.
+    The group of non-repeating variable v is named prefix + v.
+    """
+    dimensions, names, matrix = dimension_matrix(variables)
+    groups = {}
+    for vector in integer_nullspace(matrix, len(names)):
+        exponents = {name: exponent for name, exponent in zip(names, vector) if exponent != 0}
+        leading = next(name for name, exponent in zip(names, vector) if exponent != 0)
+        groups[prefix + leading] = exponents
+    return groups
+
+
+def matrix_key(variables):
+    """
+    Hash of the dimension matrix (variable order included, since it chooses the repeating variables).
+    """
+    canonical = json.dumps([[name, sorted(exponents.items())] for name, exponents in variables.items()])
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def cached_pi_groups(variables, prefix='Pi_', cache_directory=DEFAULT_CACHE_DIRECTORY):
+    """
+    derive_pi_groups with an on-disk cache keyed by the dimension matrix.
+    """
+    key = matrix_key(variables)
+    path = os.path.join(cache_directory, f"{key}.json")
+    if os.path.exists(path):
+        with open(path) as cache_file:
+            cached = json.load(cache_file)
+        if cached.get('prefix') == prefix:
+            return cached['groups']
+
+    groups = derive_pi_groups(variables, prefix)
+    os.makedirs(cache_directory, exist_ok=True)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'w') as cache_file:
+        json.dump({'prefix': prefix, 'variables': variables, 'groups': groups}, cache_file)
+    os.replace(temporary_path, path)
+    return groups
+
+
+def model_spec(name, variables, constants=(), prefix='Pi_', cache_directory=DEFAULT_CACHE_DIRECTORY):
+    """
+    Build a pi_model spec from dimensioned variables: the derived groups become the 'groups'.
+    Variables listed in constants (e.g. rho, K) are kept as constants of the model.
+    """
+    groups = cached_pi_groups(variables, prefix, cache_directory)
+    return {
+        'name': name,
+        'variables': [variable for variable in variables if variable not in constants],
+        'constants': list(constants),
+        'groups': groups,
+    }
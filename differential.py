@@ -0,0 +1,269 @@
+# Differential harness: compare solver engines over the whole input space.
+#
+# The pressure regulator has 4^11 = 4,194,304 initial assignments (Code.STATE_VARIABLES, 4 codes each).
+# The harness enumerates them in blocks of rows (the packed index order of envisionment.py), lets every
+# engine solve each block and compares the final variables and the contradiction flag of every engine
+# with the first one, the reference. Every diverging scenario is counted under its cause:
+#   contradiction  'reference only', 'candidate only', 'both' or 'none'
+#   variables      the variables whose final status differs
+# so e.g. the signed product of the physical link variant and a missing core-variable check show up as
+# separate groups, each with its count and a few example scenarios.
+#
+# Engines (all take and return rows of codes in Code.STATE_VARIABLES order):
+#   agenda               Code.solve_pressure_regulator, scenario by scenario (the reference semantics)
+#   batch                batch_solver.solve_batch
+#   table                envisionment.lookup_rows (needs envisionment.bin)
+#   table:PATH           envisionment.lookup_rows with the table built at PATH
+#   model:NAME           pi_model.solve_model with a model of models/, scenario by scenario
+#   model-batch:NAME     batch_solver.solve_model_batch with a model of models/
+#
+#   python differential.py agenda batch model:pressure_regulator model:pressure_regulator_physical_link
+#   python differential.py model:pressure_regulator model-batch:pressure_regulator --sample 100000
+#
+# --physical compares only the 4^6 = 4096 scenarios that set nothing but the physical variables (every
+# pi-group UNKNOWN), the inputs of the menu. The hand-written regimes and the compiled group rule agree
+# exactly there; with pi-groups given as well, each applies its own inverse rules (see pi_model.propagate_group).
+#   python differential.py agenda model:pressure_regulator --physical
+
+import argparse
+import json
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+from Code import STATE_VARIABLES, solve_pressure_regulator
+
+
+# --- 1. Engines ---
+def _scalar_engine(solve):
+    """
+    Engine from a solve(initial_variables) function returning a SolveResult.
+    """
+    def engine(rows):
+        final_states = np.empty_like(rows)
+        contradiction_mask = np.zeros(len(rows), dtype=bool)
+        for position, row in enumerate(rows.tolist()):
+            result = solve(dict(zip(STATE_VARIABLES, row)))
+            final_states[position] = [result.variables[name] for name in STATE_VARIABLES]
+            contradiction_mask[position] = bool(result.contradictions)
+        return final_states, contradiction_mask
+    return engine
+
+
+def _model_columns(model):
+    if sorted(model.variables) != sorted(STATE_VARIABLES):
+        raise ValueError(f"Model '{model.name}' does not have the variables of Code.STATE_VARIABLES.")
+    return [STATE_VARIABLES.index(name) for name in model.variables]
+
+
+def make_engine(name):
+    """
+    The engine function rows -> (final_states, contradiction_mask) of an engine name (see the header).
+    """
+    if name == 'agenda':
+        return _scalar_engine(solve_pressure_regulator)
+    if name == 'batch':
+        from batch_solver import solve_batch
+
+        return lambda rows: solve_batch(rows)[:2]
+
+    kind, _, argument = name.partition(':')
+    if kind == 'table':
+        from envisionment import DEFAULT_TABLE_PATH, lookup_rows, open_table
+
+        path = argument or DEFAULT_TABLE_PATH
+        # Missing or stale tables fail here, before any block is solved
+        open_table(path)
+        return lambda rows: lookup_rows(rows, path)[:2]
+
+    if kind in ('model', 'model-batch') and argument:
+        from model_registry import load_model
+        from pi_model import solve_model
+
+        model = load_model(argument)
+        if kind == 'model':
+            return _scalar_engine(lambda initial_variables: solve_model(model, initial_variables))
+
+        from batch_solver import solve_model_batch
+
+        columns = _model_columns(model)
+        back = np.argsort(columns)
+
+        def engine(rows):
+            final_states, contradiction_mask, _ = solve_model_batch(model, rows[:, columns])
+            return final_states[:, back], contradiction_mask
+        return engine
+
+    raise ValueError(f"Unknown engine '{name}'.")
+
+
+# --- 2. Comparison ---
+SPACE_SIZE = 4 ** len(STATE_VARIABLES)
+
+# The physical variables come first in Code.STATE_VARIABLES, so their scenarios are the lowest indexes
+PHYSICAL_VARIABLES = STATE_VARIABLES[:STATE_VARIABLES.index('Pi_A1')]
+PHYSICAL_SPACE_SIZE = 4 ** len(PHYSICAL_VARIABLES)
+
+# One group of diverging scenarios: its cause, how many scenarios and the indexes of a few of them
+Divergence = namedtuple('Divergence', ['contradiction', 'variables', 'count', 'examples'])
+
+# The comparison of one candidate engine with the reference
+DiffReport = namedtuple('DiffReport', ['reference', 'candidate', 'scenarios', 'diverging', 'groups'])
+
+CONTRADICTION_CAUSES = ('none', 'candidate only', 'reference only', 'both')
+
+_VARIABLE_BITS = 1 << np.arange(len(STATE_VARIABLES), dtype=np.int64)
+
+
+def compare_block(reference, candidate, indexes, groups, examples=5):
+    """
+    Add the divergences of one block to groups ({cause key: [count, example indexes]}).
+    reference and candidate are (final_states, contradiction_mask) of the same rows, indexes their scenario indexes.
+    Returns the number of diverging rows.
+    """
+    reference_states, reference_contradictions = reference
+    candidate_states, candidate_contradictions = candidate
+    variable_bits = (reference_states != candidate_states) @ _VARIABLE_BITS
+    keys = ((reference_contradictions.astype(np.int64) * 2 + candidate_contradictions) << len(STATE_VARIABLES)
+            | variable_bits)
+    diverging = (variable_bits != 0) | (reference_contradictions != candidate_contradictions)
+    if not diverging.any():
+        return 0
+
+    keys = keys[diverging]
+    indexes = indexes[diverging]
+    causes, counts = np.unique(keys, return_counts=True)
+    for cause, count in zip(causes.tolist(), counts.tolist()):
+        group = groups.setdefault(cause, [0, []])
+        group[0] += count
+        if len(group[1]) < examples:
+            group[1].extend(indexes[keys == cause][:examples - len(group[1])].tolist())
+    return int(diverging.sum())
+
+
+def _divergence(cause, count, examples):
+    contradiction = CONTRADICTION_CAUSES[cause >> len(STATE_VARIABLES)]
+    variables = tuple(name for bit, name in enumerate(STATE_VARIABLES) if cause >> bit & 1)
+    return Divergence(contradiction, variables, count, examples)
+
+
+def iter_blocks(indexes=None, chunk_size=1 << 16):
+    """
+    Yield (scenario indexes, rows of codes) over the whole input space, or over the given indexes.
+    """
+    from envisionment import unpack_rows
+
+    if indexes is None:
+        for start in range(0, SPACE_SIZE, chunk_size):
+            block = np.arange(start, min(start + chunk_size, SPACE_SIZE), dtype=np.uint32)
+            yield block, unpack_rows(block)
+    else:
+        indexes = np.asarray(indexes, dtype=np.uint32)
+        for start in range(0, len(indexes), chunk_size):
+            block = indexes[start:start + chunk_size]
+            yield block, unpack_rows(block)
+
+
+def run_harness(engine_names, indexes=None, chunk_size=1 << 16, examples=5):
+    """
+    Compare every engine with the first one (the reference). Returns one DiffReport per candidate,
+    the groups sorted by count.
+    """
+    if len(engine_names) < 2:
+        raise ValueError("Give a reference engine and at least one engine to compare with it.")
+    engines = [make_engine(name) for name in engine_names]
+    groups = [{} for _ in engine_names[1:]]
+    diverging = [0] * (len(engine_names) - 1)
+    scenarios = 0
+
+    for block, rows in iter_blocks(indexes, chunk_size):
+        scenarios += len(block)
+        reference = engines[0](rows)
+        for position, engine in enumerate(engines[1:]):
+            diverging[position] += compare_block(reference, engine(rows), block, groups[position], examples)
+
+    reports = []
+    for name, candidate_groups, count in zip(engine_names[1:], groups, diverging):
+        divergences = sorted((_divergence(cause, total, found) for cause, (total, found) in candidate_groups.items()),
+                             key=lambda divergence: -divergence.count)
+        reports.append(DiffReport(engine_names[0], name, scenarios, count, divergences))
+    return reports
+
+
+# --- 3. Report ---
+def format_scenario(index):
+    """
+    One scenario as 'P_in=I P_out=C ...' (UNKNOWN variables left out).
+    """
+    codes = [(index >> (2 * position)) & 3 for position in range(len(STATE_VARIABLES))]
+    return ' '.join(f"{name}={'UIDC'[code]}" for name, code in zip(STATE_VARIABLES, codes) if code) or '(all unknown)'
+
+
+def print_report(report, top=10, file=None):
+    """
+    Print a report with its top causes (the most frequent first).
+    """
+    file = file or sys.stdout
+    share = report.diverging / report.scenarios if report.scenarios else 0.0
+    print(f"{report.candidate} vs {report.reference}: {report.diverging} of {report.scenarios} scenarios diverge "
+          f"({share:.3%}), {len(report.groups)} cause(s)", file=file)
+    by_contradiction = {}
+    for divergence in report.groups:
+        by_contradiction[divergence.contradiction] = by_contradiction.get(divergence.contradiction, 0) + divergence.count
+    if by_contradiction:
+        print("  by contradiction: " + ', '.join(f"{cause} {count}" for cause, count in by_contradiction.items()),
+              file=file)
+    for divergence in report.groups[:top]:
+        variables = ', '.join(divergence.variables) or '-'
+        print(f"  {divergence.count:9d}  contradiction: {divergence.contradiction:14s}  variables: {variables}", file=file)
+        for index in divergence.examples[:1]:
+            print(f"             e.g. {format_scenario(index)}", file=file)
+    rest = report.groups[top:]
+    if rest:
+        print(f"  ... {len(rest)} more cause(s), {sum(divergence.count for divergence in rest)} scenarios", file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare solver engines over the whole input space.")
+    parser.add_argument('engines', nargs='+', help="reference engine first, then the engines to compare with it")
+    parser.add_argument('--sample', type=int, help="compare this many random scenarios instead of all 4^11")
+    parser.add_argument('--physical', action='store_true',
+                        help="only the scenarios with every pi-group UNKNOWN (4^6), with --sample a sample of them")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-c', '--chunk-size', type=int, default=1 << 16, help="scenarios per block")
+    parser.add_argument('--examples', type=int, default=5, help="example scenarios kept per cause")
+    parser.add_argument('--top', type=int, default=10, help="causes printed per engine (all are in --output)")
+    parser.add_argument('-o', '--output', help="write the reports to this JSON file")
+    args = parser.parse_args(argv)
+
+    space = PHYSICAL_SPACE_SIZE if args.physical else SPACE_SIZE
+    indexes = None if space == SPACE_SIZE else np.arange(space)
+    if args.sample is not None:
+        indexes = np.random.default_rng(args.seed).choice(space, size=min(args.sample, space), replace=False)
+        indexes.sort()
+
+    reports = run_harness(args.engines, indexes, args.chunk_size, args.examples)
+    for report in reports:
+        print_report(report, args.top)
+
+    if args.output:
+        with open(args.output, 'w') as report_file:
+            json.dump([{
+                'reference': report.reference,
+                'candidate': report.candidate,
+                'scenarios': report.scenarios,
+                'diverging': report.diverging,
+                'groups': [{
+                    'contradiction': divergence.contradiction,
+                    'variables': list(divergence.variables),
+                    'count': divergence.count,
+                    'examples': [format_scenario(index) for index in divergence.examples],
+                } for divergence in report.groups],
+            } for report in reports], report_file, indent=2)
+
+    return 0 if all(report.diverging == 0 for report in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
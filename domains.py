@@ -0,0 +1,177 @@
+# Bitset-domain constraint propagation for compiled pi-group models.
+#
+# Instead of one status (or UNKNOWN), every variable holds the set of statuses it can still take,
+# as 3 bits: INCREASE = 0b001, DECREASE = 0b010, CONSTANT = 0b100.
+# UNKNOWN is the full set 0b111 and the empty set 0b000 means a contradiction. So partial knowledge
+# like "A_open is not DECREASE" is kept, where a single status would have to stay UNKNOWN.
+#
+# Every pi-group is a constraint: the definite tuples (pi, variable 1, ..., variable n) that the
+# group rule of pi_model accepts without contradiction. A group runs as a generalized
+# arc-consistency filter: a status stays in a domain only if some accepted tuple inside the current
+# domains supports it. Domains are packed 3 bits per variable, and the filter result of every
+# packed input is memoized per group shape, so a repeated filter call is one dictionary lookup.
+
+from collections import deque, namedtuple
+from itertools import product
+
+from Code import UNKNOWN, INCREASE, DECREASE, CONSTANT, STATUS_NAMES
+from pi_model import propagate_kernel
+
+
+# --- 1. Domains ---
+EMPTY = 0
+FULL = 0b111
+
+# Domain of every code (UNKNOWN is the full set) and the code of every singleton domain
+DOMAIN_OF_CODE = (FULL, 0b001, 0b010, 0b100)
+CODE_OF_DOMAIN = {0b001: INCREASE, 0b010: DECREASE, 0b100: CONSTANT}
+
+
+def domain_names(domain):
+    """
+    Display text of a domain, e.g. '{Increased, Constant}'.
+    """
+    return '{' + ', '.join(STATUS_NAMES[code] for code in (INCREASE, DECREASE, CONSTANT)
+                           if domain & DOMAIN_OF_CODE[code]) + '}'
+
+
+def domains_to_variables(domains):
+    """
+    Collapse domains to codes: singletons become their status, everything else UNKNOWN.
+    """
+    return {name: CODE_OF_DOMAIN.get(domain, UNKNOWN) for name, domain in domains.items()}
+
+
+# --- 2. Group constraints as filters ---
+_supports_cache = {}
+
+
+def accepted_tuples(signs, product_table, division_table, kind='group'):
+    """
+    Every definite tuple (pi, variables...) accepted by the group rule (or the rule of another kernel kind),
+    as tuples of domain bits.
+    """
+    key = (kind, tuple(signs), product_table, division_table)
+    tuples = _supports_cache.get(key)
+    if tuples is None:
+        tuples = []
+        for codes in product((INCREASE, DECREASE, CONSTANT), repeat=len(signs) + 1):
+            _, contradiction = propagate_kernel(kind, codes, signs, product_table, division_table)
+            if contradiction is None:
+                tuples.append(tuple(DOMAIN_OF_CODE[code] for code in codes))
+        tuples = _supports_cache[key] = tuple(tuples)
+    return tuples
+
+
+_filter_memos = {}
+
+
+def make_filter(kernel, product_table, division_table):
+    """
+    Build the filter(domains) function of a compiled kernel.
+    Returns the list of variables whose domain shrank, or None if a domain became empty.
+    """
+    variables = kernel.variables
+    positions = tuple((3 * position, variable) for position, variable in enumerate(variables))
+    tuples = accepted_tuples(kernel.signs, product_table, division_table, kernel.kind)
+    memo = _filter_memos.setdefault((kernel.kind, kernel.signs, product_table, division_table), {})
+
+    def supported(index):
+        masks = [(index >> shift) & 7 for shift, _ in positions]
+        support = [EMPTY] * len(masks)
+        for bits in tuples:
+            for mask, bit in zip(masks, bits):
+                if not mask & bit:
+                    break
+            else:
+                for position, bit in enumerate(bits):
+                    support[position] |= bit
+        if EMPTY in support:
+            return EMPTY
+        result = 0
+        for (shift, _), domain in zip(positions, support):
+            result |= domain << shift
+        return result
+
+    def filter_domains(domains):
+        index = 0
+        for shift, variable in positions:
+            index |= domains[variable] << shift
+        result = memo.get(index)
+        if result is None:
+            result = memo[index] = supported(index)
+        if result == index:
+            return []
+        if result == EMPTY:
+            return None
+
+        changed = []
+        for shift, variable in positions:
+            domain = (result >> shift) & 7
+            if domain != domains[variable]:
+                domains[variable] = domain
+                changed.append(variable)
+        return changed
+
+    filter_domains.__name__ = f"filter_{kernel.name.lower()}"
+    return filter_domains
+
+
+DomainFilter = namedtuple('DomainFilter', ['name', 'filter', 'variables'])
+
+# domains: final domain of every variable; contradictions: names of the groups that emptied a domain;
+# evaluations: number of filter calls
+DomainResult = namedtuple('DomainResult', ['domains', 'contradictions', 'evaluations'])
+
+
+def compile_filters(model):
+    """
+    One arc-consistency filter per group of a pi_model.CompiledModel, plus the variable -> filters index.
+    """
+    filters = tuple(DomainFilter(kernel.name, make_filter(kernel, model.product_table, model.division_table),
+                                 kernel.variables)
+                    for kernel in model.kernels)
+    index = {}
+    for domain_filter in filters:
+        for variable in domain_filter.variables:
+            index.setdefault(variable, []).append(domain_filter)
+    return filters, index
+
+
+# --- 3. Arc-consistency engine ---
+def propagate_domains(domains, filters, index):
+    """
+    Run the filters over domains (in place) until nothing shrinks, with an agenda like Code.run_agenda.
+    A filter is idempotent, so it is only queued again by changes made by other filters.
+    Returns a DomainResult; propagation stops at the first empty domain.
+    """
+    agenda = deque(filters)
+    queued = set(domain_filter.name for domain_filter in filters)
+    evaluations = 0
+
+    while agenda:
+        domain_filter = agenda.popleft()
+        queued.discard(domain_filter.name)
+        changed = domain_filter.filter(domains)
+        evaluations += 1
+
+        if changed is None:
+            return DomainResult(domains, [domain_filter.name], evaluations)
+
+        for variable in changed:
+            for dependent in index.get(variable, ()):
+                if dependent.name not in queued and dependent is not domain_filter:
+                    queued.add(dependent.name)
+                    agenda.append(dependent)
+
+    return DomainResult(domains, [], evaluations)
+
+
+def solve_domains(model, initial_variables, filters=None):
+    """
+    Domain propagation of a compiled model from an assignment of codes (missing variables are UNKNOWN).
+    filters is the result of compile_filters(model), compiled here if not given.
+    """
+    filters, index = filters or compile_filters(model)
+    domains = {name: DOMAIN_OF_CODE[initial_variables.get(name, UNKNOWN)] for name in model.variables}
+    return propagate_domains(domains, filters, index)
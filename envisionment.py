@@ -0,0 +1,161 @@
+# Exhaustive envisionment table of the pressure regulator.
+#
+# The model has 11 variables (Code.STATE_VARIABLES) with 4 possible codes each, so there are only
+# 4^11 = 4,194,304 initial assignments. The build step propagates all of them once with the batched
+# solver and stores one 32-bit entry per assignment in a binary file, after a 32-byte header:
+#   magic b'QRENVTAB', then little-endian uint32 format version, batch_solver.RULE_VERSION,
+#   variable count, entry size in bytes, iteration shift and a reserved 0
+# open_table rejects a table whose header differs from the current one, e.g. a table built before a
+# rule changed, instead of serving stale results. Every entry is:
+#   bits  0..21  final state, 2 bits per variable (same packing as the index)
+#   bit   22     contradiction flag
+#   bits 24..31  iteration count (sweeps of batch_solver.solve_batch)
+# The entry of an initial assignment is found at the position given by its packed code, so a query
+# is a single memory-mapped read instead of a propagation.
+#
+# Build the table once with:
+#   python envisionment.py [path]
+
+import os
+import struct
+import sys
+
+import numpy as np
+
+from Code import STATE_VARIABLES
+from batch_solver import RULE_VERSION, solve_batch
+from state import State
+
+
+# --- 1. Table layout ---
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "envisionment.bin")
+
+VARIABLE_COUNT = len(STATE_VARIABLES)
+TABLE_SIZE = 4 ** VARIABLE_COUNT
+ENTRY_DTYPE = np.dtype('<u4')
+
+STATE_BITS = 2 * VARIABLE_COUNT
+STATE_MASK = (1 << STATE_BITS) - 1
+CONTRADICTION_BIT = 1 << STATE_BITS
+ITERATION_SHIFT = 24
+
+# Variable i is stored in bits 2i and 2i+1
+_SHIFTS = np.arange(VARIABLE_COUNT, dtype=np.uint32) * 2
+
+# Raise it whenever the layout above changes
+TABLE_FORMAT = 1
+TABLE_MAGIC = b'QRENVTAB'
+HEADER = struct.Struct('<8s6I')
+
+
+def table_header():
+    """
+    The header a table built by this version starts with.
+    """
+    return HEADER.pack(TABLE_MAGIC, TABLE_FORMAT, RULE_VERSION, VARIABLE_COUNT, ENTRY_DTYPE.itemsize,
+                       ITERATION_SHIFT, 0)
+
+
+def pack_state(state):
+    """
+    Pack a scenario dictionary (or a state.State) into its table index (2 bits per variable).
+    """
+    if isinstance(state, State):
+        return state.bits
+    return State.from_dict(state).bits
+
+
+def unpack_state(index):
+    """
+    Unpack a table index (or the state bits of an entry) into a scenario dictionary.
+    """
+    return State(index).to_dict()
+
+
+def pack_rows(rows):
+    """
+    Vectorized pack_state for a 2-D array of codes (column order Code.STATE_VARIABLES).
+    """
+    return (np.asarray(rows, dtype=np.uint32) << _SHIFTS).sum(axis=1, dtype=np.uint32)
+
+
+def unpack_rows(indexes):
+    """
+    Vectorized unpack_state, returns a 2-D array of codes.
+    """
+    indexes = np.asarray(indexes, dtype=np.uint32)
+    return ((indexes[:, None] >> _SHIFTS) & 3).astype(np.uint8)
+
+
+# --- 2. Build step ---
+def build_table(path=DEFAULT_TABLE_PATH, chunk_size=1 << 18):
+    """
+    Propagate every initial assignment and write the table to path.
+    """
+    table = np.memmap(path, dtype=ENTRY_DTYPE, mode='w+', offset=HEADER.size, shape=(TABLE_SIZE,))
+    for start in range(0, TABLE_SIZE, chunk_size):
+        indexes = np.arange(start, min(start + chunk_size, TABLE_SIZE), dtype=np.uint32)
+        final_states, contradiction_mask, iterations = solve_batch(unpack_rows(indexes))
+        entries = pack_rows(final_states)
+        entries |= contradiction_mask.astype(np.uint32) << STATE_BITS
+        entries |= iterations.astype(np.uint32) << ITERATION_SHIFT
+        table[start:start + len(indexes)] = entries
+    table.flush()
+    del table
+    # The header is written last, so an interrupted build is not a valid table
+    with open(path, 'r+b') as table_file:
+        table_file.write(table_header())
+    return path
+
+
+# --- 3. Query API ---
+_open_tables = {}
+
+
+def open_table(path=DEFAULT_TABLE_PATH):
+    """
+    Memory-map a table built by build_table (read only). The mapping is reused by later calls.
+    A table with another header (format, rule version or layout) or size is rejected with a ValueError.
+    """
+    table = _open_tables.get(path)
+    if table is None:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Envisionment table '{path}' not found, build it first with: python envisionment.py")
+        with open(path, 'rb') as table_file:
+            header = table_file.read(HEADER.size)
+        if header != table_header():
+            raise ValueError(f"Envisionment table '{path}' was built by another version (format or rules), "
+                             f"rebuild it with: python envisionment.py")
+        if os.path.getsize(path) != HEADER.size + TABLE_SIZE * ENTRY_DTYPE.itemsize:
+            raise ValueError(f"Envisionment table '{path}' has an unexpected size, rebuild it.")
+        table = np.memmap(path, dtype=ENTRY_DTYPE, mode='r', offset=HEADER.size, shape=(TABLE_SIZE,))
+        _open_tables[path] = table
+    return table
+
+
+def lookup(initial_state, path=DEFAULT_TABLE_PATH):
+    """
+    Return (final_state, contradiction_found, iterations) of one scenario dictionary without propagating.
+    final_state and contradiction_found are what solve_pressure_regulator reaches; iterations is the
+    number of sweeps of batch_solver.solve_batch, not the regime evaluations of SolveResult.iterations.
+    """
+    entry = int(open_table(path)[pack_state(initial_state)])
+    return unpack_state(entry & STATE_MASK), bool(entry & CONTRADICTION_BIT), entry >> ITERATION_SHIFT
+
+
+def lookup_rows(initial_states, path=DEFAULT_TABLE_PATH):
+    """
+    Vectorized lookup for a 2-D array of codes, returns the same tuple as solve_batch.
+    """
+    entries = open_table(path)[pack_rows(initial_states)]
+    final_states = unpack_rows(entries & STATE_MASK)
+    contradiction_mask = (entries & CONTRADICTION_BIT) != 0
+    iterations = (entries >> ITERATION_SHIFT).astype(np.uint16)
+    return final_states, contradiction_mask, iterations
+
+
+if __name__ == "__main__":
+    table_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_TABLE_PATH
+    print(f"Building envisionment table for {TABLE_SIZE} initial assignments...")
+    build_table(table_path)
+    print(f"Table written to {table_path}")
@@ -0,0 +1,172 @@
+# Minimal contradiction cores: which of the given inputs cannot hold together.
+#
+# A solve that reports a contradiction only says which regime found it. minimal_conflict returns a
+# subset-minimal set of the user-supplied assignments that is inconsistent on its own: removing any one
+# of them makes the rest consistent (it is not necessarily the smallest such set). It is found with
+# QuickXplain (Junker, 2004): the candidates are split in halves, and a half is only searched if the
+# other half (plus what is already known to be needed) is still consistent. That needs about
+# k * log(n / k) consistency checks for a core of k of n inputs, instead of trying subsets.
+#
+# Two things keep every check cheap on large models:
+# - The candidates are first narrowed to the inputs the first contradiction was derived from, by
+#   following the justifications of a traced solve (see whatif.py). Only if that set turns out to be
+#   consistent are all the inputs searched.
+# - A check only starts the agenda from the regimes that read a known variable, in regime order. A
+#   regime whose variables are all UNKNOWN never changes anything, so the work follows the part of the
+#   model the inputs reach. For the hand-written regimes and the compiled pressure regulator this finds
+#   a contradiction exactly when a full solve does (checked on all 4^11 inputs).
+#
+# The checks use the regimes of the solve that found the contradiction: the hand-written regimes of
+# Code.py by default, or a compiled pi_model. QuickXplain alone is only minimal if every superset of an
+# inconsistent set is inconsistent too. The hand-written rules depend on the evaluation order, so a last
+# pass removes every input the rest of the core is still inconsistent without.
+
+from collections import namedtuple
+
+from Code import (
+    UNKNOWN,
+    STATUS_NAMES,
+    STATE_VARIABLES,
+    REGIMES,
+    DEPENDENCY_INDEX,
+    SolverContext,
+    run_agenda,
+    solve_with_regimes,
+)
+
+
+# assignments: the minimal inconsistent inputs {variable: status}; checks: consistency checks it took
+Conflict = namedtuple('Conflict', ['assignments', 'checks'])
+
+# The regimes a conflict is searched with; a pi_model.CompiledModel has the same fields
+Rules = namedtuple('Rules', ['variables', 'regimes', 'dependency_index'])
+
+# The hand-written regimes of solve_pressure_regulator
+HAND_WRITTEN_RULES = Rules(STATE_VARIABLES, REGIMES, DEPENDENCY_INDEX)
+
+
+# --- 1. Consistency check ---
+class _Checker:
+    """
+    Consistency of a set of assignments under a Rules (or compiled model), counting the checks.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.unknown = dict.fromkeys(model.variables, UNKNOWN)
+        self.checks = 0
+
+    def consistent(self, assignments):
+        self.checks += 1
+        variables = self.unknown.copy()
+        variables.update(assignments)
+
+        dependency_index = self.model.dependency_index
+        started = set()
+        for variable in assignments:
+            started.update(regime.name for regime in dependency_index.get(variable, ()))
+        start = [regime for regime in self.model.regimes if regime.name in started]
+
+        context = SolverContext(variables)
+        run_agenda(context, self.model.regimes, dependency_index, start=start)
+        return not context.contradictions
+
+
+# --- 2. QuickXplain ---
+def _quickxplain(checker, background, delta, candidates):
+    """
+    A minimal subset of candidates that is inconsistent together with background,
+    or [] if background alone is already inconsistent (only checked when delta is not empty).
+    """
+    if delta and not checker.consistent(background):
+        return []
+    if len(candidates) == 1:
+        return candidates
+
+    middle = len(candidates) // 2
+    first, second = candidates[:middle], candidates[middle:]
+    second_core = _quickxplain(checker, {**background, **dict(first)}, first, second)
+    first_core = _quickxplain(checker, {**background, **dict(second_core)}, second_core, first)
+    return first_core + second_core
+
+
+def _shrink(checker, background, core):
+    """
+    Drop every assignment of core that the rest (with background) is still inconsistent without.
+    """
+    core = list(core)
+    for item in list(core):
+        rest = [other for other in core if other != item]
+        if not checker.consistent({**background, **dict(rest)}):
+            core = rest
+    return core
+
+
+def _suspects(result, model, inputs):
+    """
+    The inputs the first contradiction of a traced SolveResult was derived from: the inputs reached by
+    following the justifications back from the known variables of the regime that reported it.
+    """
+    regime = next(regime for regime in model.regimes if regime.name == result.contradictions[0].regime)
+    pending = [variable for variable in regime.reads if result.variables[variable] != UNKNOWN]
+    seen = set(pending)
+    suspects = set()
+    while pending:
+        variable = pending.pop()
+        justification = result.justifications.get(variable)
+        if justification is None:
+            if variable in inputs:
+                suspects.add(variable)
+            continue
+        for antecedent in justification.antecedents:
+            if antecedent not in seen:
+                seen.add(antecedent)
+                pending.append(antecedent)
+    return suspects
+
+
+def minimal_conflict(initial_variables, model=None, background=None, order=None):
+    """
+    A subset-minimal Conflict among the known variables of initial_variables, or None if they are consistent.
+    model holds the regimes to check with (HAND_WRITTEN_RULES by default, or a compiled model).
+    background ({variable: status}) holds assignments taken as true, they are never part of the conflict.
+    order lists the variables to blame first (default: the order of initial_variables); QuickXplain keeps
+    the earlier ones in the conflict when there is a choice.
+    """
+    model = model or HAND_WRITTEN_RULES
+    background = {variable: status for variable, status in (background or {}).items() if status != UNKNOWN}
+    inputs = {variable: status for variable, status in initial_variables.items()
+              if status != UNKNOWN and variable not in background}
+    variables = set(model.variables)
+    for variable in list(inputs) + list(background):
+        if variable not in variables:
+            raise KeyError(f"Unknown variable '{variable}'.")
+
+    checker = _Checker(model)
+    if not checker.consistent(background):
+        raise ValueError("The background assignments are inconsistent on their own.")
+
+    result = solve_with_regimes({**checker.unknown, **inputs, **background}, model.regimes, model.dependency_index,
+                                trace=True)
+    checker.checks += 1
+    if not result.contradictions:
+        return None
+
+    # Narrow the candidates to the inputs behind the first contradiction, if they suffice
+    suspects = _suspects(result, model, inputs)
+    narrowed = {variable: inputs[variable] for variable in suspects}
+    if len(suspects) < len(inputs) and checker.consistent({**background, **narrowed}):
+        suspects = set(inputs)
+
+    ranking = {variable: position for position, variable in enumerate(order or inputs)}
+    candidates = sorted(((variable, inputs[variable]) for variable in suspects),
+                        key=lambda item: ranking.get(item[0], len(ranking)))
+    core = _shrink(checker, background, _quickxplain(checker, background, [], candidates))
+    return Conflict(dict(core), checker.checks)
+
+
+def format_conflict(conflict):
+    """
+    Display text of a Conflict.
+    """
+    return ', '.join(f"{variable}={STATUS_NAMES[status]}" for variable, status in conflict.assignments.items())
@@ -0,0 +1,330 @@
+# Multi-valued decision diagram (MDD) of all consistent full assignments of a compiled model.
+#
+# The diagram has one layer per variable. A node has one edge per status (INCREASE, DECREASE,
+# CONSTANT), either to a node of the next layer or to nothing, and every path from the root
+# through all layers is a full assignment that every pi-group accepts (domains.accepted_tuples).
+# It is built once per model, top-down: two partial assignments lead to the same node when they agree
+# on every variable that still has an unfinished group. Then it is reduced bottom-up (nodes without
+# a path to the end are removed, nodes with the same edges are merged).
+#
+# Queries take a partial assignment (missing variables and UNKNOWN are free) and make one or two
+# passes over the diagram, without propagation:
+#   count(mdd, partial)            number of consistent completions
+#   is_consistent(mdd, partial)    count > 0
+#   possible_values(mdd, partial)  the statuses every variable can still take
+# The diagram is stored as JSON, keyed by a hash of the model, like the pi-group cache of buckingham.py.
+#
+# The size of the diagram depends on the layer order: a layer holds at most one node per combination
+# of its live variables. For the pressure regulator it has 91 nodes; for big, loosely coupled networks
+# (model_generator.py) it can grow to millions of nodes, and propagation is the better tool there.
+
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+from Code import UNKNOWN, INCREASE, DECREASE, CONSTANT
+from domains import CODE_OF_DOMAIN, accepted_tuples
+from pi_model import RULE_VERSION
+
+
+DEFAULT_CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".mdd_cache")
+
+# Version of the stored layout, raised whenever the diagram or its file changes shape
+MDD_FORMAT = 1
+
+VALUES = (INCREASE, DECREASE, CONSTANT)
+NO_NODE = -1
+
+# variables: one per layer, top to bottom; layers: per layer a list of nodes, a node is the tuple of
+# its child indices in the next layer for INCREASE, DECREASE, CONSTANT (NO_NODE if the edge is missing).
+# The children of the last layer are 0 (the end) or NO_NODE; the root is node 0 of layer 0.
+MDD = namedtuple('MDD', ['key', 'variables', 'layers'])
+
+
+# --- 1. Construction ---
+def model_key(model):
+    """
+    Hash of everything the diagram depends on: variables, groups, the qualitative algebra, the version of
+    the rules the accepted tuples come from (pi_model.RULE_VERSION) and the file format.
+    """
+    canonical = json.dumps([
+        MDD_FORMAT,
+        RULE_VERSION,
+        list(model.variables),
+        [[kernel.name, list(kernel.variables), list(kernel.signs), kernel.kind] for kernel in model.kernels],
+        model.product_table,
+        model.division_table,
+    ])
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def variable_order(model):
+    """
+    Layer order that keeps few variables "live" (assigned, with a group still unfinished), which keeps
+    the layers narrow: groups are taken greedily, each time the neighbouring group that leaves the fewest
+    live variables, and the variables of a group are placed when the group is taken.
+    """
+    groups = [kernel.variables for kernel in model.kernels]
+    groups_of = {}
+    for index, variables in enumerate(groups):
+        for variable in variables:
+            groups_of.setdefault(variable, []).append(index)
+    remaining = {variable: len(indices) for variable, indices in groups_of.items()}
+
+    order = []
+    placed = set()
+    taken = set()
+    candidates = set()
+    next_unused = 0
+
+    def growth(index):
+        # Change of the number of live variables if group index is taken now
+        change = 0
+        for variable in groups[index]:
+            if variable not in placed:
+                change += remaining[variable] > 1
+            else:
+                change -= remaining[variable] == 1
+        return change
+
+    while len(taken) < len(groups):
+        if candidates:
+            index = min(candidates, key=lambda candidate: (growth(candidate), candidate))
+        else:
+            while next_unused in taken:
+                next_unused += 1
+            index = next_unused
+        taken.add(index)
+        candidates.discard(index)
+        for variable in groups[index]:
+            remaining[variable] -= 1
+            if variable not in placed:
+                placed.add(variable)
+                order.append(variable)
+            for neighbour in groups_of[variable]:
+                if neighbour not in taken:
+                    candidates.add(neighbour)
+
+    order.extend(variable for variable in model.variables if variable not in placed)
+    return order
+
+
+def _group_prefixes(kernel, position, model):
+    """
+    Positions of the group variables in layer order, and every accepted prefix of their codes in that order.
+    """
+    indices = sorted(range(len(kernel.variables)), key=lambda index: position[kernel.variables[index]])
+    prefixes = set()
+    for bits in accepted_tuples(kernel.signs, model.product_table, model.division_table, kernel.kind):
+        codes = tuple(CODE_OF_DOMAIN[bits[index]] for index in indices)
+        for length in range(1, len(codes) + 1):
+            prefixes.add(codes[:length])
+    return [position[kernel.variables[index]] for index in indices], prefixes
+
+
+def build_mdd(model):
+    """
+    Build the reduced MDD of a pi_model.CompiledModel.
+    """
+    order = variable_order(model)
+    position = {variable: level for level, variable in enumerate(order)}
+    depth = len(order)
+
+    groups = [_group_prefixes(kernel, position, model) for kernel in model.kernels]
+    groups_at = [[] for _ in range(depth)]
+    for group in groups:
+        for level in group[0]:
+            groups_at[level].append(group)
+
+    # live[level]: the variables assigned before level that still have an unfinished group
+    live = []
+    for level in range(depth + 1):
+        live.append(tuple(sorted({assigned for levels, _ in groups for assigned in levels
+                                  if assigned < level <= levels[-1]})))
+
+    # Top-down: states are the codes of the live variables
+    states = {(): 0}
+    raw_layers = []
+    for level in range(depth):
+        slot = {assigned: index for index, assigned in enumerate(live[level])}
+        next_slot = live[level + 1]
+        next_states = {}
+        nodes = []
+        for state in states:
+            children = []
+            for value in VALUES:
+                consistent = True
+                for levels, prefixes in groups_at[level]:
+                    prefix = tuple(value if assigned == level else state[slot[assigned]]
+                                   for assigned in levels if assigned <= level)
+                    if prefix not in prefixes:
+                        consistent = False
+                        break
+                if not consistent:
+                    children.append(NO_NODE)
+                    continue
+                next_state = tuple(value if assigned == level else state[slot[assigned]] for assigned in next_slot)
+                children.append(next_states.setdefault(next_state, len(next_states)))
+            nodes.append(tuple(children))
+        raw_layers.append(nodes)
+        states = next_states
+
+    return MDD(model_key(model), tuple(order), _reduce(raw_layers))
+
+
+def _reduce(raw_layers):
+    """
+    Remove the nodes without a path to the end and merge the nodes with the same children.
+    """
+    layers = [None] * len(raw_layers)
+    renumber = {0: 0}
+    for level in range(len(raw_layers) - 1, -1, -1):
+        unique = {}
+        mapping = {}
+        for index, children in enumerate(raw_layers[level]):
+            children = tuple(renumber.get(child, NO_NODE) for child in children)
+            if children == (NO_NODE,) * len(VALUES):
+                continue
+            mapping[index] = unique.setdefault(children, len(unique))
+        layers[level] = list(unique)
+        renumber = mapping
+
+    if 0 not in renumber:
+        # No consistent assignment at all
+        return [[] for _ in layers]
+    return layers
+
+
+def size(mdd):
+    """
+    Number of nodes and edges of the diagram.
+    """
+    nodes = sum(len(layer) for layer in mdd.layers)
+    edges = sum(child != NO_NODE for layer in mdd.layers for children in layer for child in children)
+    return nodes, edges
+
+
+# --- 2. Persistence ---
+def save_mdd(mdd, path):
+    """
+    Write the diagram as JSON (through a temporary file, so readers never see a partial file).
+    """
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'w') as mdd_file:
+        json.dump({'key': mdd.key, 'variables': list(mdd.variables), 'layers': mdd.layers}, mdd_file)
+    os.replace(temporary_path, path)
+
+
+def load_mdd(path):
+    """
+    Read a diagram written by save_mdd.
+    """
+    with open(path) as mdd_file:
+        data = json.load(mdd_file)
+    layers = [[tuple(children) for children in layer] for layer in data['layers']]
+    return MDD(data['key'], tuple(data['variables']), layers)
+
+
+def cached_mdd(model, cache_directory=DEFAULT_CACHE_DIRECTORY):
+    """
+    build_mdd with an on-disk cache keyed by model_key.
+    """
+    key = model_key(model)
+    path = os.path.join(cache_directory, f"{key}.json")
+    if os.path.exists(path):
+        mdd = load_mdd(path)
+        if mdd.key == key:
+            return mdd
+
+    mdd = build_mdd(model)
+    os.makedirs(cache_directory, exist_ok=True)
+    save_mdd(mdd, path)
+    return mdd
+
+
+# --- 3. Queries ---
+def _allowed(mdd, partial):
+    """
+    Per layer, the edge positions (0 INCREASE, 1 DECREASE, 2 CONSTANT) the partial assignment allows.
+    """
+    free = tuple(range(len(VALUES)))
+    allowed = []
+    for variable in mdd.variables:
+        status = partial.get(variable, UNKNOWN)
+        allowed.append(free if status == UNKNOWN else (VALUES.index(status),))
+    return allowed
+
+
+def _counts_below(mdd, allowed):
+    """
+    Per layer and node, the number of allowed paths from the node to the end.
+    """
+    below = [None] * (len(mdd.layers) + 1)
+    below[-1] = [1]
+    for level in range(len(mdd.layers) - 1, -1, -1):
+        child_counts = below[level + 1]
+        counts = []
+        for children in mdd.layers[level]:
+            total = 0
+            for edge in allowed[level]:
+                child = children[edge]
+                if child != NO_NODE:
+                    total += child_counts[child]
+            counts.append(total)
+        below[level] = counts
+    return below
+
+
+def count(mdd, partial):
+    """
+    Number of consistent full assignments that agree with partial.
+    """
+    if not mdd.layers or not mdd.layers[0]:
+        return 0
+    return _counts_below(mdd, _allowed(mdd, partial))[0][0]
+
+
+def is_consistent(mdd, partial):
+    """
+    True if partial has at least one consistent completion.
+    """
+    return count(mdd, partial) > 0
+
+
+def value_counts(mdd, partial):
+    """
+    {variable: {status: number of consistent completions of partial with that status}}.
+    """
+    result = {variable: dict.fromkeys(VALUES, 0) for variable in mdd.variables}
+    if not mdd.layers or not mdd.layers[0]:
+        return result
+
+    allowed = _allowed(mdd, partial)
+    below = _counts_below(mdd, allowed)
+    # above: per node of the current layer, the number of allowed paths from the root to it
+    above = [1]
+    for level, variable in enumerate(mdd.variables):
+        child_counts = below[level + 1]
+        next_above = [0] * len(child_counts)
+        totals = [0] * len(VALUES)
+        for node, children in enumerate(mdd.layers[level]):
+            paths = above[node]
+            if not paths:
+                continue
+            for edge in allowed[level]:
+                child = children[edge]
+                if child != NO_NODE and child_counts[child]:
+                    totals[edge] += paths * child_counts[child]
+                    next_above[child] += paths
+        result[variable] = dict(zip(VALUES, totals))
+        above = next_above
+    return result
+
+
+def possible_values(mdd, partial):
+    """
+    {variable: tuple of the statuses it can still take in a consistent completion of partial}.
+    """
+    return {variable: tuple(value for value, total in totals.items() if total)
+            for variable, totals in value_counts(mdd, partial).items()}
@@ -0,0 +1,78 @@
+# Generator of large synthetic pi-group models.
+#
+# A generated model is a network of ensembles, like the pressure regulator but much bigger:
+# - every ensemble gets a few variables with random base dimensions (M, L, T), and its pi-groups
+#   are derived with buckingham.derive_pi_groups, so every group is dimensionally consistent;
+# - ensembles are coupled by contact groups: a variable of a new ensemble gets the same
+#   dimensions as a variable of an earlier ensemble, and the group (v_new / v_earlier) links them.
+# The result is an ordinary pi_model spec, so it is compiled and solved with the same engine
+# (and the same propagation semantics) as the pressure regulator.
+
+import random
+
+from buckingham import derive_pi_groups
+from Code import INCREASE, DECREASE, CONSTANT
+
+
+BASE_DIMENSIONS = ('M', 'L', 'T')
+
+
+def _random_dimensions(generator):
+    while True:
+        exponents = {dimension: generator.randint(-2, 2) for dimension in BASE_DIMENSIONS}
+        exponents = {dimension: exponent for dimension, exponent in exponents.items() if exponent}
+        if exponents:
+            return exponents
+
+
+def generate_model(ensemble_count, variables_per_ensemble=(4, 6), contacts_per_ensemble=1, seed=0):
+    """
+    Return a pi_model spec with ensemble_count ensembles.
+    variables_per_ensemble is the (min, max) number of variables of one ensemble.
+    """
+    generator = random.Random(seed)
+    dimensions = {}
+    spec = {
+        'name': f"synthetic_{ensemble_count}",
+        'variables': [],
+        'constants': [],
+        'groups': {},
+        'ensembles': {},
+        'contact_groups': [],
+    }
+
+    for ensemble in range(ensemble_count):
+        count = generator.randint(*variables_per_ensemble)
+        names = [f"E{ensemble}_v{index}" for index in range(count)]
+        ensemble_dimensions = {name: _random_dimensions(generator) for name in names}
+
+        # Contact variables share the dimensions of a variable of an earlier ensemble
+        contacts = []
+        if ensemble > 0:
+            for name in names[:contacts_per_ensemble]:
+                partner = generator.choice(spec['variables'])
+                ensemble_dimensions[name] = dict(dimensions[partner])
+                contacts.append((name, partner))
+
+        groups = derive_pi_groups(ensemble_dimensions, prefix=f"Pi_E{ensemble}_")
+        dimensions.update(ensemble_dimensions)
+        spec['variables'].extend(names)
+        spec['groups'].update(groups)
+        spec['ensembles'][f"E{ensemble}"] = list(groups)
+
+        for name, partner in contacts:
+            group_name = f"Pi_C_{name}"
+            spec['groups'][group_name] = {name: 1, partner: -1}
+            spec['contact_groups'].append(group_name)
+
+    return spec
+
+
+def random_initial_state(spec, known_fraction=0.1, seed=0):
+    """
+    Random initial assignment: known_fraction of the model variables get a definite status,
+    everything else (including every pi-group) starts UNKNOWN.
+    """
+    generator = random.Random(seed)
+    return {name: generator.choice((INCREASE, DECREASE, CONSTANT))
+            for name in spec['variables'] if generator.random() < known_fraction}
@@ -0,0 +1,176 @@
+# File-based model registry with a compiled on-disk cache.
+#
+# Every model is a pi_model spec stored as a file in the models/ directory, as JSON
+# (models/pressure_regulator.json) or TOML (needs Python 3.11+ for tomllib). The file name without
+# extension is the model name.
+#
+# Compiling a model evaluates the group rule for every combination of codes of every group. The registry
+# does that once: the kernel tables are written to the cache directory, keyed by a hash of the model file
+# and the qualitative algebra, so a changed file or algebra is compiled again and a new process only
+# reads the tables back. Loaded models are also kept in memory for the lifetime of the registry.
+
+import hashlib
+import json
+import os
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+from Code import PRODUCT_TABLE, DIVISION_TABLE
+from pi_model import RULE_VERSION, Kernel, assemble_model, compile_kernels, model_algebra
+
+
+PACKAGE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL_DIRECTORY = os.path.join(PACKAGE_DIRECTORY, "models")
+DEFAULT_CACHE_DIRECTORY = os.path.join(PACKAGE_DIRECTORY, ".model_cache")
+
+MODEL_EXTENSIONS = ('.json', '.toml')
+
+
+# --- 1. Model files ---
+def parse_spec(content, extension):
+    """
+    Parse the bytes of a model file into a spec and check that it has the required entries.
+    """
+    if extension == '.toml':
+        if tomllib is None:
+            raise ValueError("TOML model files need Python 3.11 or newer (tomllib).")
+        spec = tomllib.loads(content.decode('utf-8'))
+    else:
+        spec = json.loads(content)
+
+    for required in ('variables', 'groups'):
+        if required not in spec:
+            raise ValueError(f"Model file has no '{required}'.")
+    return spec
+
+
+def content_key(content, product_table=PRODUCT_TABLE, division_table=DIVISION_TABLE):
+    """
+    Hash of a model file and the algebra it is compiled with.
+    """
+    digest = hashlib.sha256(content)
+    # Version of the cache file layout (entries carry the kernel kind) and of the rules the tables come from
+    digest.update(b'kernels-2')
+    digest.update(f'rules-{RULE_VERSION}'.encode('utf-8'))
+    digest.update(json.dumps([product_table, division_table]).encode('utf-8'))
+    return digest.hexdigest()
+
+
+# --- 2. Compiled cache ---
+def _save_kernels(path, key, kernels):
+    # Groups of the same shape share one table, so every table is stored once
+    tables = []
+    table_index = {}
+    entries = []
+    for kernel in kernels:
+        if kernel.table not in table_index:
+            table_index[kernel.table] = len(tables)
+            tables.append(kernel.table)
+        entries.append([kernel.name, kernel.variables, kernel.signs, table_index[kernel.table], kernel.kind])
+
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'w') as cache_file:
+        json.dump({'key': key, 'tables': tables, 'kernels': entries}, cache_file)
+    os.replace(temporary_path, path)
+
+
+def _load_kernels(path, key):
+    """
+    Kernels from a cache file, or None if the file is missing or belongs to another key.
+    """
+    try:
+        with open(path) as cache_file:
+            cached = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+    if cached.get('key') != key:
+        return None
+    tables = [tuple(table) for table in cached['tables']]
+    return [Kernel(name, tuple(variables), tuple(signs), tables[index], kind)
+            for name, variables, signs, index, kind in cached['kernels']]
+
+
+# --- 3. Registry ---
+class ModelRegistry:
+    """
+    Loads the models of a directory by name and compiles each one at most once per content hash.
+    The tables default to the algebra named in every model file.
+    """
+
+    def __init__(self, directory=DEFAULT_MODEL_DIRECTORY, cache_directory=DEFAULT_CACHE_DIRECTORY,
+                 product_table=None, division_table=None):
+        self.directory = directory
+        self.cache_directory = cache_directory
+        self.product_table = product_table
+        self.division_table = division_table
+        self._models = {}
+
+    def names(self):
+        """
+        Names of the models in the directory.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(os.path.splitext(file_name)[0] for file_name in os.listdir(self.directory)
+                      if os.path.splitext(file_name)[1] in MODEL_EXTENSIONS)
+
+    def path(self, name):
+        """
+        Path of the file of a model (KeyError if there is none).
+        """
+        for extension in MODEL_EXTENSIONS:
+            path = os.path.join(self.directory, name + extension)
+            if os.path.exists(path):
+                return path
+        raise KeyError(f"No model '{name}' in {self.directory}.")
+
+    def _read(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as model_file:
+            content = model_file.read()
+        return content, os.path.splitext(path)[1]
+
+    def spec(self, name):
+        """
+        The spec of a model, as stored in its file.
+        """
+        content, extension = self._read(name)
+        return parse_spec(content, extension)
+
+    def load(self, name):
+        """
+        The pi_model.CompiledModel of a model, from memory, from the disk cache or compiled now.
+        """
+        content, extension = self._read(name)
+        spec = parse_spec(content, extension)
+        spec_product_table, spec_division_table = model_algebra(spec)
+        product_table = self.product_table or spec_product_table
+        division_table = self.division_table or spec_division_table
+        key = content_key(content, product_table, division_table)
+        model = self._models.get(name)
+        if model is not None and model[0] == key:
+            return model[1]
+
+        cache_path = os.path.join(self.cache_directory, f"{key}.json")
+        kernels = _load_kernels(cache_path, key)
+        if kernels is None:
+            kernels = compile_kernels(spec, product_table, division_table)
+            os.makedirs(self.cache_directory, exist_ok=True)
+            _save_kernels(cache_path, key, kernels)
+
+        compiled = assemble_model(spec, kernels, product_table, division_table)
+        self._models[name] = (key, compiled)
+        return compiled
+
+
+default_registry = ModelRegistry()
+
+
+def load_model(name):
+    """
+    Load a model of the models/ directory with the default registry.
+    """
+    return default_registry.load(name)
@@ -0,0 +1,402 @@
+# Declarative pi-group models and the compiler that turns them into propagation kernels.
+#
+# A model is plain data (dictionaries and lists, so it can also be stored as JSON):
+#   'variables'          the qualitative variables of the scenario, in state order
+#   'constants'          variables that are always CONSTANT (they drop out of every group)
+#   'groups'             every pi-group with the exponent of each variable, in evaluation order
+#                        e.g. Pi_A1 = (Q * rho^1/2) / (A_open * Pin^3/2)
+#                        -> {'Q': 1, 'rho': 0.5, 'A_open': -1, 'P_in': -1.5}
+#   'ensembles'          the groups of every ensemble
+#   'contact_groups'     the groups linking two ensembles through their contact variables
+#   'constraints'        optional extra constraints that are not pi-groups, e.g. a physical link
+#                        {'Physical_Link': {'kind': 'link', 'variables': {'x': 1, 'A_open': 1}}}
+#   'algebra'            optional name of the product/division semantics (ALGEBRAS), default 'positive'
+#
+# Only the sign of an exponent matters qualitatively (for positive quantities x^3/2 moves like x),
+# so a group is "pi = product(numerator variables) / product(denominator variables)".
+#
+# The compiler evaluates the propagation rule of every group for every combination of codes of
+# its variables ahead of time. The kernel of a group is then one lookup in that table:
+#   index = packed codes of (pi, variable 1, ..., variable n), 2 bits each
+#   entry = packed codes after propagation | contradiction bit | propagated code | position of the variable
+# The same rule is used for every group, so there is no hand-written code per regime.
+#
+# A constraint is compiled the same way, with the rule registered for its kind (register_rule), so
+# extra constraints run as the same table-lookup kernels. Its first variable takes the place of pi and
+# the signs of the other variables are relative to it.
+
+from collections import namedtuple
+from fractions import Fraction
+
+from Code import (
+    UNKNOWN,
+    CONSTANT,
+    INCREASE,
+    DECREASE,
+    PRODUCT_TABLE,
+    SIGNED_PRODUCT_TABLE,
+    DIVISION_TABLE,
+    Regime,
+    build_dependency_index,
+    solve_with_regimes,
+)
+
+
+# --- 1. The pressure regulator as data ---
+PRESSURE_REGULATOR = {
+    'name': 'pressure_regulator',
+    'variables': ['P_in', 'P_out', 'Q', 'A_open', 'x', 'P'],
+    'constants': ['rho', 'K'],
+    'groups': {
+        'Pi_A1': {'Q': 1, 'rho': 0.5, 'A_open': -1, 'P_in': -1.5},
+        'Pi_A2': {'P_out': 1, 'P_in': -1},
+        'Pi_B1': {'x': 1, 'P': 1, 'K': -1},
+        'Pi_C1': {'P': 1, 'P_out': -1},
+        'Pi_C2': {'x': 1, 'A_open': -1},
+    },
+    'ensembles': {
+        'A': ['Pi_A1', 'Pi_A2'],
+        'B': ['Pi_B1'],
+    },
+    'contact_groups': ['Pi_C1', 'Pi_C2'],
+}
+
+
+# --- 2. Compiled structures ---
+# variables: names of the group's kernel inputs, the pi-group first; signs: +1 numerator / -1 denominator;
+# kind: the rule the table was compiled from ('group' for pi-groups, see KERNEL_RULES)
+Kernel = namedtuple('Kernel', ['name', 'variables', 'signs', 'table', 'kind'], defaults=('group',))
+
+# variables: state order (model variables, then pi-groups); regimes: ready for Code.run_agenda;
+# product_table / division_table: the qualitative algebra the kernels were compiled with
+CompiledModel = namedtuple('CompiledModel', ['name', 'variables', 'constants', 'kernels', 'regimes',
+                                             'dependency_index', 'ensembles', 'contact_groups',
+                                             'product_table', 'division_table'])
+
+
+# Product and division tables of every algebra a model can choose with 'algebra':
+# 'positive' - all quantities positive, (DECREASE * DECREASE) = DECREASE (Code.py)
+# 'signed'   - (DECREASE * DECREASE) = INCREASE (the physical link variant)
+ALGEBRAS = {
+    'positive': (PRODUCT_TABLE, DIVISION_TABLE),
+    'signed': (SIGNED_PRODUCT_TABLE, DIVISION_TABLE),
+}
+
+
+def model_algebra(spec):
+    """
+    (product_table, division_table) of the algebra a spec asks for.
+    """
+    name = spec.get('algebra', 'positive')
+    if name not in ALGEBRAS:
+        raise ValueError(f"Unknown algebra '{name}', expected one of {', '.join(ALGEBRAS)}.")
+    return ALGEBRAS[name]
+
+
+def _exponent_sign(exponent):
+    """
+    Return +1 for a positive exponent and -1 for a negative one ("3/2", 1.5 and 3 are all accepted).
+    """
+    exponent = Fraction(exponent) if isinstance(exponent, str) else exponent
+    if exponent == 0:
+        raise ValueError("An exponent of 0 removes the variable from the group, leave it out instead.")
+    return 1 if exponent > 0 else -1
+
+
+def _fold_product(statuses, product_table):
+    result = CONSTANT
+    for status in statuses:
+        result = product_table[result][status]
+    return result
+
+
+def _group_allows(codes, signs, product_table, division_table):
+    """
+    True if the fully known codes [pi, variable 1, ..., variable n] satisfy pi = numerator / denominator.
+    Where the algebra cannot tell, the table entry UNKNOWN is read as what it stands for:
+    - an UNKNOWN product (I * D) can be anything, so every pi is allowed;
+    - an UNKNOWN quotient (I / D, D / I) moves the way of the numerator, never CONSTANT.
+    """
+    numerator = _fold_product([c for c, s in zip(codes[1:], signs) if s > 0], product_table)
+    denominator = _fold_product([c for c, s in zip(codes[1:], signs) if s < 0], product_table)
+    if numerator == UNKNOWN or denominator == UNKNOWN:
+        return True
+    forward = division_table[numerator][denominator]
+    if forward == UNKNOWN:
+        return codes[0] != CONSTANT
+    return codes[0] == forward
+
+
+_KNOWN_STATUSES = (INCREASE, DECREASE, CONSTANT)
+
+
+def propagate_group(codes, signs, product_table, division_table):
+    """
+    Reference propagation rule of one group, evaluated at compile time (and by domains.py).
+    codes is [pi, variable 1, ..., variable n]. For every entry whose partners are all known, each of
+    INCREASE, DECREASE and CONSTANT is tried through the forward rule pi = numerator / denominator
+    (see _group_allows) and the ones that fit are kept. A single one is assigned if the entry is UNKNOWN,
+    a known entry that does not fit is a contradiction, and so is an UNKNOWN one nothing fits (reported on pi).
+    This is repeated until nothing changes. A tuple the forward rule derives is never rejected.
+    Returns (codes, contradiction), contradiction is None or (position, propagated status).
+    """
+    codes = list(codes)
+    changes_made = True
+    while changes_made:
+        changes_made = False
+        for position in range(len(codes)):
+            if UNKNOWN in codes[:position] or UNKNOWN in codes[position + 1:]:
+                continue
+            matching = [status for status in _KNOWN_STATUSES
+                        if _group_allows(codes[:position] + [status] + codes[position + 1:], signs,
+                                         product_table, division_table)]
+            implied = matching[0] if len(matching) == 1 else UNKNOWN
+
+            if codes[position] == UNKNOWN:
+                if not matching:
+                    return codes, (0, UNKNOWN)
+                if implied != UNKNOWN:
+                    codes[position] = implied
+                    changes_made = True
+            elif codes[position] not in matching:
+                return codes, (position, implied)
+
+    return codes, None
+
+
+_OPPOSITE = (UNKNOWN, DECREASE, INCREASE, CONSTANT)
+
+
+def propagate_link(codes, signs, product_table, division_table):
+    """
+    Rule of a 'link' constraint: every variable moves like the first one (sign +1) or opposite to it
+    (sign -1), e.g. the valve opening follows the plunger position. The algebra is not used.
+    Same contract as propagate_group.
+    """
+    codes = list(codes)
+    reference = codes[0]
+    if reference == UNKNOWN:
+        for status, sign in zip(codes[1:], signs):
+            if status != UNKNOWN:
+                reference = status if sign > 0 else _OPPOSITE[status]
+                break
+        else:
+            return codes, None
+
+    for position, status in enumerate(codes):
+        implied = reference if position == 0 or signs[position - 1] > 0 else _OPPOSITE[reference]
+        if status == UNKNOWN:
+            codes[position] = implied
+        elif status != implied:
+            return codes, (position, implied)
+    return codes, None
+
+
+# Version of the built-in rules. The tables compiled from them are cached on disk (model_registry,
+# mdd), so it is part of every cache key and has to be raised whenever a rule changes its results.
+RULE_VERSION = 2
+
+# Propagation rule of every kernel kind, rule(codes, signs, product_table, division_table) -> (codes, contradiction).
+# Constraint plugins add their kind with register_rule.
+KERNEL_RULES = {
+    'group': propagate_group,
+    'link': propagate_link,
+}
+
+
+def register_rule(kind, rule):
+    """
+    Register the propagation rule of a constraint kind. The rule must be deterministic and must
+    not change afterwards: its tables are cached (in memory and by model_registry) by kind.
+    """
+    if KERNEL_RULES.get(kind, rule) is not rule:
+        raise ValueError(f"Constraint kind '{kind}' is already registered.")
+    KERNEL_RULES[kind] = rule
+
+
+def propagate_kernel(kind, codes, signs, product_table, division_table):
+    """
+    Apply the rule of a kernel kind (see propagate_group for the contract).
+    """
+    return KERNEL_RULES[kind](codes, signs, product_table, division_table)
+
+
+# The table only depends on the kind, the signs and the algebra, so kernels of the same shape share it
+_table_cache = {}
+
+
+def compile_group(name, variables, signs, product_table=PRODUCT_TABLE, division_table=DIVISION_TABLE,
+                  kind='group'):
+    """
+    Precompute the kernel table of one group (pi is the first entry of variables), or of a constraint of another kind.
+    """
+    if kind not in KERNEL_RULES:
+        raise ValueError(f"Unknown constraint kind '{kind}'.")
+    signs = tuple(signs)
+    key = (kind, signs, product_table, division_table)
+    table = _table_cache.get(key)
+    if table is None:
+        table = _table_cache[key] = _build_table(kind, signs, product_table, division_table)
+    return Kernel(name, tuple(variables), signs, table, kind)
+
+
+def _build_table(kind, signs, product_table, division_table):
+    width = len(signs) + 1
+    contradiction_bit = 1 << (2 * width)
+    table = []
+    for index in range(4 ** width):
+        codes = [(index >> (2 * position)) & 3 for position in range(width)]
+        codes, contradiction = propagate_kernel(kind, codes, signs, product_table, division_table)
+        entry = 0
+        for position, status in enumerate(codes):
+            entry |= status << (2 * position)
+        if contradiction is not None:
+            position, propagated = contradiction
+            entry |= contradiction_bit | (propagated << (2 * width + 1)) | (position << (2 * width + 3))
+        table.append(entry)
+    return tuple(table)
+
+
+def make_propagate(kernel):
+    """
+    Build the propagate(variables) function of a kernel, with the same contract as the
+    propagate_pi_* functions of Code.py: returns True if something changed.
+    """
+    name, variables, _, table, _ = kernel
+    positions = tuple((2 * position, variable) for position, variable in enumerate(variables))
+    contradiction_bit = 1 << (2 * len(variables))
+    propagated_shift = 2 * len(variables) + 1
+
+    def propagate(state, context):
+        index = 0
+        for shift, variable in positions:
+            index |= state[variable] << shift
+        entry = table[index]
+        if entry == index:
+            return False
+
+        if entry & contradiction_bit:
+            # Nothing is written, so the agenda does not run the dependents (and this kernel) again for it
+            variable = variables[entry >> (propagated_shift + 2)]
+            context.report(name, variable, state[variable], (entry >> propagated_shift) & 3)
+            return False
+
+        for shift, variable in positions:
+            state[variable] = (entry >> shift) & 3
+        return True
+
+    propagate.__name__ = f"propagate_{name.lower()}"
+    return propagate
+
+
+# --- 3. Compiler ---
+def group_inputs(spec):
+    """
+    Yield (group name, kernel variables, signs) for every group of a spec, constants left out.
+    """
+    declared = set(spec['variables'])
+    constant_names = set(spec.get('constants', ()))
+    for group_name, exponents in spec['groups'].items():
+        kernel_variables = [group_name]
+        signs = []
+        for variable, exponent in exponents.items():
+            if variable in constant_names:
+                # CONSTANT is neutral for product and division
+                continue
+            if variable not in declared:
+                raise ValueError(f"Group '{group_name}' uses undeclared variable '{variable}'.")
+            kernel_variables.append(variable)
+            signs.append(_exponent_sign(exponent))
+        yield group_name, kernel_variables, signs
+
+
+def constraint_inputs(spec):
+    """
+    Yield (constraint name, kernel variables, signs, kind) for every constraint of a spec.
+    The first variable is the reference, the signs of the others are relative to it.
+    """
+    declared = set(spec['variables'])
+    taken = declared | set(spec['groups'])
+    for constraint_name, constraint in spec.get('constraints', {}).items():
+        kind = constraint.get('kind')
+        if kind not in KERNEL_RULES:
+            raise ValueError(f"Constraint '{constraint_name}' has unknown kind '{kind}'.")
+        if constraint_name in taken:
+            raise ValueError(f"Constraint name '{constraint_name}' is already used by a variable or group.")
+        exponents = constraint.get('variables', {})
+        if len(exponents) < 2:
+            raise ValueError(f"Constraint '{constraint_name}' needs at least 2 variables.")
+        for variable in exponents:
+            if variable not in declared:
+                raise ValueError(f"Constraint '{constraint_name}' uses undeclared variable '{variable}'.")
+        reference_sign = None
+        signs = []
+        for exponent in exponents.values():
+            sign = _exponent_sign(exponent)
+            if reference_sign is None:
+                reference_sign = sign
+            else:
+                signs.append(sign * reference_sign)
+        yield constraint_name, list(exponents), signs, kind
+
+
+def compile_kernels(spec, product_table, division_table):
+    """
+    Kernels of every group, then of every constraint, of a spec.
+    """
+    kernels = [compile_group(group_name, kernel_variables, signs, product_table, division_table)
+               for group_name, kernel_variables, signs in group_inputs(spec)]
+    kernels.extend(compile_group(constraint_name, kernel_variables, signs, product_table, division_table, kind)
+                   for constraint_name, kernel_variables, signs, kind in constraint_inputs(spec))
+    return kernels
+
+
+def compile_model(spec, product_table=None, division_table=None):
+    """
+    Compile a model spec into kernels and regimes for Code.run_agenda.
+    The tables default to the spec's algebra.
+    """
+    spec_product_table, spec_division_table = model_algebra(spec)
+    product_table = product_table or spec_product_table
+    division_table = division_table or spec_division_table
+    kernels = compile_kernels(spec, product_table, division_table)
+    return assemble_model(spec, kernels, product_table, division_table)
+
+
+def assemble_model(spec, kernels, product_table=PRODUCT_TABLE, division_table=DIVISION_TABLE):
+    """
+    Build the CompiledModel of a spec from its kernels (compiled here or loaded from a cache).
+    """
+    groups = spec['groups']
+    regimes = [Regime(kernel.name, make_propagate(kernel), kernel.variables, kernel.variables)
+               for kernel in kernels]
+
+    for group_name in spec.get('contact_groups', ()):
+        if group_name not in groups:
+            raise ValueError(f"Contact group '{group_name}' is not defined in 'groups'.")
+    for ensemble, members in spec.get('ensembles', {}).items():
+        for group_name in members:
+            if group_name not in groups:
+                raise ValueError(f"Ensemble '{ensemble}' uses undefined group '{group_name}'.")
+
+    return CompiledModel(
+        name=spec.get('name', 'model'),
+        variables=tuple(spec['variables']) + tuple(groups),
+        constants=tuple(spec.get('constants', ())),
+        kernels=tuple(kernels),
+        regimes=tuple(regimes),
+        dependency_index=build_dependency_index(regimes),
+        ensembles={ensemble: tuple(members) for ensemble, members in spec.get('ensembles', {}).items()},
+        contact_groups=tuple(spec.get('contact_groups', ())),
+        product_table=product_table,
+        division_table=division_table,
+    )
+
+
+def solve_model(model, initial_variables, on_step=None, stats=None, trace=False):
+    """
+    Propagate a compiled model from initial_variables until it is stable and return a Code.SolveResult.
+    Missing variables start as UNKNOWN.
+    """
+    variables = {name: initial_variables.get(name, UNKNOWN) for name in model.variables}
+    return solve_with_regimes(variables, model.regimes, model.dependency_index, on_step, stats, trace)
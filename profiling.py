@@ -0,0 +1,59 @@
+# Per-regime profiling for the propagation engines.
+#
+# A RegimeStats object is passed as stats=... to solve_pressure_regulator, solve_with_regimes,
+# run_agenda or pi_model.solve_model. For every regime it records:
+#   calls           how many times the regime was evaluated
+#   changed         how many of those evaluations changed at least one variable
+#   contradictions  how many of those evaluations found a contradiction
+#   seconds         cumulative time spent inside the regime
+# Without stats the engines only pay one "is None" check per regime evaluation.
+
+import json
+import sys
+
+
+class RegimeStats:
+    """
+    Counters and timings per regime, accumulated over any number of solves.
+    """
+
+    def __init__(self):
+        self.regimes = {}
+
+    def record(self, name, changed, contradiction, seconds):
+        counters = self.regimes.get(name)
+        if counters is None:
+            counters = self.regimes[name] = {'calls': 0, 'changed': 0, 'contradictions': 0, 'seconds': 0.0}
+        counters['calls'] += 1
+        counters['changed'] += changed
+        counters['contradictions'] += contradiction
+        counters['seconds'] += seconds
+
+    def reset(self):
+        self.regimes.clear()
+
+    def as_dict(self):
+        return {name: dict(counters) for name, counters in self.regimes.items()}
+
+    def dump(self, file=None):
+        """
+        Print the profile, the most expensive regime first.
+        """
+        file = file or sys.stdout
+        total = sum(counters['seconds'] for counters in self.regimes.values()) or 1.0
+        print(f"{'regime':16s} {'calls':>10s} {'changed':>10s} {'contra':>10s} {'total ms':>10s} {'us/call':>9s} {'share':>7s}", file=file)
+        for name, counters in sorted(self.regimes.items(), key=lambda item: -item[1]['seconds']):
+            calls = counters['calls']
+            print(f"{name:16s} {calls:10d} {counters['changed']:10d} {counters['contradictions']:10d} "
+                  f"{counters['seconds'] * 1e3:10.3f} {counters['seconds'] / calls * 1e6:9.3f} "
+                  f"{counters['seconds'] / total:7.1%}", file=file)
+        never_changed = [name for name, counters in self.regimes.items() if counters['changed'] == 0]
+        if never_changed:
+            print(f"Never changed anything: {', '.join(never_changed)}", file=file)
+
+    def save(self, path):
+        """
+        Write the profile as JSON.
+        """
+        with open(path, 'w') as profile_file:
+            json.dump(self.as_dict(), profile_file, indent=2)
@@ -0,0 +1,165 @@
+# Strongly-connected-component scheduling of the regimes.
+#
+# The regimes and variables form a bipartite graph: regime -> variable for every variable it can write,
+# variable -> regime for every regime that reads it. Folding the variables out gives a regime graph with
+# an edge R -> S if R can write a variable that S reads. A regime only ever writes UNKNOWN variables
+# (a known one is either confirmed or reported as a contradiction), so the edges through variables that
+# are known in the initial state are dropped: they can never carry a change.
+#
+# The strongly connected components of that graph run in topological order. Inside a component the
+# agenda of Code.run_agenda iterates to a fixpoint; a component without a cycle is usually done after one
+# evaluation of its regime. When a component is finished, no later component can change a variable it
+# reads, so it is never evaluated again, where a single global agenda may come back to it many times.
+
+from collections import OrderedDict
+
+from Code import UNKNOWN, REGIMES, SolverContext, build_dependency_index, run_agenda
+
+
+# --- 1. Graph and components ---
+def regime_graph(regimes, variables):
+    """
+    Successors of every regime (by position): the regimes that read a variable it can write,
+    only through variables that are UNKNOWN in variables.
+    """
+    readers = {}
+    for position, regime in enumerate(regimes):
+        for variable in regime.reads:
+            if variables[variable] == UNKNOWN:
+                readers.setdefault(variable, []).append(position)
+
+    graph = []
+    for position, regime in enumerate(regimes):
+        successors = set()
+        for variable in regime.writes:
+            successors.update(readers.get(variable, ()))
+        successors.discard(position)
+        graph.append(sorted(successors))
+    return graph
+
+
+def strongly_connected_components(graph):
+    """
+    Tarjan's algorithm (iterative, so large models do not hit the recursion limit).
+    Returns the components as lists of node positions, in topological order of the condensed graph.
+    """
+    index_of = [None] * len(graph)
+    lowlink = [0] * len(graph)
+    on_stack = [False] * len(graph)
+    stack = []
+    components = []
+    counter = 0
+
+    for root in range(len(graph)):
+        if index_of[root] is not None:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, child = work.pop()
+            if child == 0:
+                index_of[node] = lowlink[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            successors = graph[node]
+            while child < len(successors):
+                successor = successors[child]
+                child += 1
+                if index_of[successor] is None:
+                    work.append((node, child))
+                    work.append((successor, 0))
+                    break
+                if on_stack[successor]:
+                    lowlink[node] = min(lowlink[node], index_of[successor])
+            else:
+                if lowlink[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(sorted(component))
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+    # Tarjan finds every component after all the components it reaches
+    components.reverse()
+    return components
+
+
+def schedule(regimes, variables):
+    """
+    The regimes grouped into components, in the order they have to run for this initial state.
+    """
+    graph = regime_graph(regimes, variables)
+    return [tuple(regimes[position] for position in component)
+            for component in strongly_connected_components(graph)]
+
+
+# --- 2. Scheduled solve ---
+def run_schedule(context, plan, on_step=None, stats=None):
+    """
+    Run every component of a plan ((regimes, dependency index) pairs) to its fixpoint in order,
+    over context (see Code.run_agenda). Returns the number of regime evaluations.
+    """
+    evaluations = 0
+    for component, dependency_index in plan:
+        step_callback = on_step
+        if on_step is not None and evaluations:
+            # Number the steps across components, as a single agenda would
+            offset = evaluations
+            step_callback = lambda step, regime, variables: on_step(offset + step, regime, variables)
+        evaluations += run_agenda(context, component, dependency_index, step_callback, stats=stats)
+    return evaluations
+
+
+class Scheduler:
+    """
+    Solves with component scheduling. The plan only depends on which variables are UNKNOWN initially,
+    so the plans of the last maxsize unknown-patterns are kept.
+    """
+
+    def __init__(self, regimes=REGIMES, maxsize=4096):
+        self.regimes = tuple(regimes)
+        self.variables = tuple(sorted({variable for regime in self.regimes
+                                       for variable in regime.reads + regime.writes}))
+        self.maxsize = maxsize
+        self._plans = OrderedDict()
+
+    def plan(self, variables):
+        """
+        The components for an initial state, each with its own dependency index.
+        """
+        key = tuple(variables[variable] == UNKNOWN for variable in self.variables)
+        plan = self._plans.get(key)
+        if plan is not None:
+            self._plans.move_to_end(key)
+            return plan
+
+        plan = [(component, build_dependency_index(component)) for component in schedule(self.regimes, variables)]
+        self._plans[key] = plan
+        if len(self._plans) > self.maxsize:
+            self._plans.popitem(last=False)
+        return plan
+
+    def solve(self, initial_variables, on_step=None, stats=None, trace=False):
+        """
+        Same as Code.solve_with_regimes, with the regimes run component by component.
+        """
+        context = SolverContext(initial_variables.copy(), {} if trace else None)
+        run_schedule(context, self.plan(context.variables), on_step, stats)
+        return context.result()
+
+
+# Scheduler of the pressure regulator
+default_scheduler = Scheduler()
+
+
+def solve_scheduled(initial_variables, on_step=None, stats=None, trace=False):
+    """
+    solve_pressure_regulator with component scheduling.
+    """
+    return default_scheduler.solve(initial_variables, on_step, stats, trace)
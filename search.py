@@ -0,0 +1,170 @@
+# Backtracking search over the completions of a partial solve ("envisionments").
+#
+# When propagation stops with UNKNOWN variables left, every consistent full assignment is found by
+# branching on the remaining unknowns. At every node the regime agenda (Code.run_agenda) runs again,
+# started only from the regimes that read the branched variable, so values it forces are filled in
+# and contradicting branches are cut before going deeper. A full assignment that the regimes accept
+# without a contradiction is a solution.
+#
+# The regimes are those of a compiled pi_model (by default the pressure regulator). Their group rules
+# only infer what every consistent completion agrees on, so pruning never loses a solution and the
+# solutions do not depend on the branching order. The hand-written rules of Code.py are not used here:
+# on partial states their result depends on the evaluation order, so they would prune differently
+# depending on which variable is branched first.
+#
+# Variable ordering: branch first on the unknown variable of the regime closest to firing (fewest
+# unknowns among the variables it reads), ties broken by the number of regimes reading the variable.
+
+import argparse
+from collections import namedtuple
+
+import Code
+from Code import UNKNOWN, INCREASE, DECREASE, CONSTANT
+from Code import SolverContext, run_agenda, format_variables, format_contradiction
+from pi_model import PRESSURE_REGULATOR, compile_model, solve_model
+
+
+VALUES = (INCREASE, DECREASE, CONSTANT)
+
+# solutions: full assignments found; nodes: search nodes propagated; pruned: nodes cut by a contradiction;
+# complete: False if the search stopped at the limit before exploring everything
+SearchResult = namedtuple('SearchResult', ['solutions', 'nodes', 'pruned', 'complete'])
+
+
+_default_model = None
+
+
+def default_model():
+    """
+    The compiled pressure regulator, compiled on first use.
+    """
+    global _default_model
+    if _default_model is None:
+        _default_model = compile_model(PRESSURE_REGULATOR)
+    return _default_model
+
+
+# --- 1. Propagation at a node ---
+def _propagate(variables, regimes, dependency_index, start=None):
+    """
+    Run the agenda over variables (in place). Returns True if no contradiction was reported.
+    """
+    context = SolverContext(variables)
+    run_agenda(context, regimes, dependency_index, start=start)
+    return not context.contradictions
+
+
+# --- 2. Variable ordering ---
+def choose_variable(variables, regimes, dependency_index):
+    """
+    The unknown variable to branch on next, or None if every variable is known.
+    A variable no regime reads is free: it is branched on last, after every regime is fully known.
+    """
+    best = None
+    best_key = None
+    for regime in regimes:
+        unknown = [name for name in regime.reads if variables[name] == UNKNOWN]
+        if not unknown or (best_key is not None and len(unknown) > best_key[0]):
+            continue
+        for name in unknown:
+            key = (len(unknown), -len(dependency_index[name]))
+            if best_key is None or key < best_key:
+                best, best_key = name, key
+    if best is None:
+        best = next((name for name, status in variables.items() if status == UNKNOWN), None)
+    return best
+
+
+# --- 3. Search ---
+def iter_completions(initial_variables, model=None, counters=None):
+    """
+    Yield every consistent full assignment of a compiled model that extends initial_variables
+    (missing variables are UNKNOWN). model defaults to the compiled pressure regulator.
+    counters, if given, is a dict whose 'nodes' and 'pruned' entries are incremented during the search.
+    Stopping the iteration early stops the search.
+    """
+    if model is None:
+        model = default_model()
+    regimes, dependency_index = model.regimes, model.dependency_index
+    if counters is None:
+        counters = {}
+    counters.setdefault('nodes', 0)
+    counters.setdefault('pruned', 0)
+
+    variables = {name: initial_variables.get(name, UNKNOWN) for name in model.variables}
+    counters['nodes'] += 1
+    if not _propagate(variables, regimes, dependency_index):
+        counters['pruned'] += 1
+        return
+
+    # Depth-first with an explicit stack of (variables, branch variable, remaining values)
+    stack = []
+    variable = choose_variable(variables, regimes, dependency_index)
+    if variable is None:
+        yield variables
+        return
+    stack.append((variables, variable, list(VALUES)))
+
+    while stack:
+        parent, variable, values = stack[-1]
+        if not values:
+            stack.pop()
+            continue
+        child = parent.copy()
+        child[variable] = values.pop(0)
+
+        counters['nodes'] += 1
+        if not _propagate(child, regimes, dependency_index, start=dependency_index.get(variable, ())):
+            counters['pruned'] += 1
+            continue
+
+        next_variable = choose_variable(child, regimes, dependency_index)
+        if next_variable is None:
+            yield child
+        else:
+            stack.append((child, next_variable, list(VALUES)))
+
+
+def find_completions(initial_variables, limit=None, model=None):
+    """
+    Return a SearchResult with the consistent full assignments, at most limit of them if given.
+    """
+    counters = {}
+    solutions = []
+    complete = True
+    search = iter_completions(initial_variables, model, counters)
+    for solution in search:
+        if limit is not None and len(solutions) == limit:
+            complete = False
+            break
+        solutions.append(solution)
+    search.close()
+    return SearchResult(solutions, counters['nodes'], counters['pruned'], complete)
+
+
+# --- 4. Command line ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Enumerate every consistent completion of a scenario.")
+    parser.add_argument('scenario', choices=sorted(Code.SCENARIOS), help="number of a predefined scenario")
+    parser.add_argument('--limit', type=int, help="stop after this many solutions")
+    args = parser.parse_args(argv)
+
+    description, initial_state = Code.SCENARIOS[args.scenario]
+    print(description)
+    partial = solve_model(default_model(), initial_state)
+    for contradiction in partial.contradictions:
+        print(format_contradiction(contradiction))
+    unknown = [name for name, status in partial.variables.items() if status == UNKNOWN]
+    print(f"Propagation leaves {len(unknown)} unknown: {', '.join(unknown) or '-'}")
+
+    result = find_completions(initial_state, args.limit)
+    for number, solution in enumerate(result.solutions, 1):
+        print(f"\n--- Completion {number} ---")
+        print(format_variables(solution))
+
+    more = "" if result.complete else f" (stopped at the limit of {args.limit})"
+    print(f"\n{len(result.solutions)} completion(s){more}, {result.nodes} nodes, {result.pruned} pruned")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+# Qualitative time-stepping simulation with a state-transition graph.
+#
+# A simulation starts from a regulator state and lets its inputs (the variables known in the initial
+# state) change over time. At every step one input moves to a neighbouring status under its rule:
+#   'continuity'  I -> C, D -> C, C -> I, C -> D (a change of direction passes through CONSTANT)
+#   'settling'    I -> C, D -> C (a disturbance dies out)
+#   'fixed'       the input never changes
+# The successor is propagated with the compiled model. It is kept only if it has no contradiction and no
+# variable, derived ones included, jumps from INCREASE to DECREASE (or back) without passing CONSTANT.
+#
+# A state is the packed codes of the inputs (2 bits each, one 64-bit key), because the derived variables
+# follow from them. The graph is explored level by level (breadth first): every block of the frontier is
+# expanded and propagated at once with batch_solver.solve_model_batch, the visited keys are one sorted
+# uint64 array (8 bytes per state), the transitions are appended to a file and a frontier level larger
+# than frontier_limit is kept in a memory-mapped file. So graphs with millions of states fit in memory.
+#
+# The strongly connected components of the graph are the cycles (a component with more than one state);
+# the components that no transition leaves are the attractors. For every attractor the variables with
+# the same status in all of its states are reported as its invariants, e.g. P_out stays Constant.
+#
+#   python simulation.py 1 --rule Pi_A1=fixed --rule P_out=fixed
+#   python simulation.py --set P_in=I --set P=C --set Pi_C1=C --rule P=fixed --rule Pi_C1=fixed
+
+import argparse
+import os
+import sys
+import tempfile
+from array import array
+from collections import namedtuple
+
+import numpy as np
+
+from Code import UNKNOWN, INCREASE, DECREASE, CONSTANT, STATUS_NAMES, SCENARIOS
+from batch_solver import solve_model_batch
+
+
+# --- 1. Transition rules ---
+RULES = {
+    'continuity': ((INCREASE, CONSTANT), (DECREASE, CONSTANT), (CONSTANT, INCREASE), (CONSTANT, DECREASE)),
+    'settling': ((INCREASE, CONSTANT), (DECREASE, CONSTANT)),
+    'fixed': (),
+}
+
+DEFAULT_RULE = 'continuity'
+
+# Explored graph: the input variables, the sorted keys of the visited states, the path of the transition
+# file (uint64 pairs source key, target key), the number of transitions and of levels, and whether the
+# exploration finished (False if it stopped at max_states)
+Exploration = namedtuple('Exploration', ['inputs', 'states', 'edges_path', 'transitions', 'levels', 'complete'])
+
+# One attractor: its number of states, a few of them (as {input: status}) and its invariants {variable: status}
+Attractor = namedtuple('Attractor', ['size', 'examples', 'invariants'])
+
+SimulationResult = namedtuple('SimulationResult', ['inputs', 'states', 'transitions', 'levels', 'complete',
+                                                   'components', 'cycles', 'attractor_count', 'attractors'])
+
+
+def _input_moves(inputs, rules):
+    """
+    (shift, old status, new status) of every possible move of every input.
+    """
+    rules = rules or {}
+    for variable in rules:
+        if variable not in inputs:
+            raise ValueError(f"'{variable}' is not an input of the initial state.")
+    moves = []
+    for position, variable in enumerate(inputs):
+        rule = rules.get(variable, DEFAULT_RULE)
+        if rule not in RULES:
+            raise ValueError(f"Unknown rule '{rule}', expected one of {', '.join(RULES)}.")
+        moves.extend((np.uint64(2 * position), np.uint64(old), np.uint64(new)) for old, new in RULES[rule])
+    return moves
+
+
+def _rows(model, columns, keys):
+    """
+    Rows of codes (model.variables order) for packed input keys, the derived variables UNKNOWN.
+    """
+    rows = np.zeros((len(keys), len(model.variables)), dtype=np.uint8)
+    for position, column in enumerate(columns):
+        rows[:, column] = (keys >> np.uint64(2 * position)) & np.uint64(3)
+    return rows
+
+
+def _continuous(before, after):
+    """
+    Rows where no variable jumps between INCREASE and DECREASE.
+    """
+    jumps = ((before == INCREASE) & (after == DECREASE)) | ((before == DECREASE) & (after == INCREASE))
+    return ~jumps.any(axis=1)
+
+
+# --- 2. Exploration ---
+def explore(model, initial_variables, rules=None, directory=None, chunk_size=1 << 14, frontier_limit=1 << 22,
+            max_states=None):
+    """
+    Breadth-first exploration of every state reachable from initial_variables. The transition file
+    and spilled frontiers are written to directory (a new temporary directory if None).
+    """
+    inputs = tuple(name for name in model.variables if initial_variables.get(name, UNKNOWN) != UNKNOWN)
+    if not inputs:
+        raise ValueError("The initial state has no known variable to change.")
+    if len(inputs) > 32:
+        raise ValueError("At most 32 inputs fit in a 64-bit state key.")
+    columns = [model.variables.index(name) for name in inputs]
+    moves = _input_moves(inputs, rules)
+
+    start = np.array([sum(initial_variables[name] << (2 * position) for position, name in enumerate(inputs))],
+                     dtype=np.uint64)
+    _, contradiction, _ = solve_model_batch(model, _rows(model, columns, start))
+    if contradiction[0]:
+        raise ValueError("The initial state has a contradiction.")
+
+    directory = directory or tempfile.mkdtemp(prefix='simulation_')
+    edges_path = os.path.join(directory, 'transitions.bin')
+    visited = start
+    frontier = start
+    transitions = 0
+    levels = 0
+    complete = True
+
+    with open(edges_path, 'wb') as edges_file:
+        while len(frontier):
+            levels += 1
+            found = []
+            for block_start in range(0, len(frontier), chunk_size):
+                keys = np.asarray(frontier[block_start:block_start + chunk_size])
+                before, _, _ = solve_model_batch(model, _rows(model, columns, keys))
+
+                sources = []
+                targets = []
+                for shift, old, new in moves:
+                    movable = np.nonzero(((keys >> shift) & np.uint64(3)) == old)[0]
+                    sources.append(movable)
+                    targets.append((keys[movable] & ~(np.uint64(3) << shift)) | (new << shift))
+                sources = np.concatenate(sources)
+                targets = np.concatenate(targets)
+
+                after, contradiction, _ = solve_model_batch(model, _rows(model, columns, targets))
+                allowed = np.nonzero(~contradiction & _continuous(before[sources], after))[0]
+                # The transitions of every state are written together (see _load_graph)
+                allowed = allowed[np.argsort(sources[allowed], kind='stable')]
+                pairs = np.empty((len(allowed), 2), dtype=np.uint64)
+                pairs[:, 0] = keys[sources[allowed]]
+                pairs[:, 1] = targets[allowed]
+                edges_file.write(pairs.tobytes())
+                transitions += len(pairs)
+                found.append(np.unique(pairs[:, 1]))
+
+            new_states = np.unique(np.concatenate(found)) if found else visited[:0]
+            new_states = new_states[~np.isin(new_states, visited, assume_unique=True)]
+            if max_states is not None and len(visited) + len(new_states) > max_states:
+                new_states = new_states[:max(max_states - len(visited), 0)]
+                complete = False
+            visited = np.union1d(visited, new_states)
+            frontier = new_states
+            if len(frontier) > frontier_limit:
+                frontier_path = os.path.join(directory, f'frontier_{levels}.npy')
+                np.save(frontier_path, frontier)
+                frontier = np.load(frontier_path, mmap_mode='r')
+            if not complete:
+                break
+
+    return Exploration(inputs, visited, edges_path, transitions, levels, complete)
+
+
+# --- 3. Cycles and attractors ---
+# The graph is kept as (starts, counts, targets): the successors of state n are
+# targets[starts[n]:starts[n] + counts[n]], positions in the sorted state keys. Every state is expanded
+# exactly once, so its transitions are contiguous in the transition file and no global sort is needed.
+def strongly_connected_components(starts, counts, targets):
+    """
+    Iterative Tarjan. Returns (component id of every state, number of components);
+    a component only reaches components with a smaller id.
+    """
+    node_count = len(starts)
+    starts = array('q', np.asarray(starts, dtype=np.int64).tobytes())
+    counts = array('q', np.asarray(counts, dtype=np.int64).tobytes())
+    index_of = array('q', [-1]) * node_count
+    lowlink = array('q', [0]) * node_count
+    component = array('q', [-1]) * node_count
+    on_stack = bytearray(node_count)
+    stack = []
+    counter = 0
+    count = 0
+
+    for root in range(node_count):
+        if index_of[root] >= 0:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, child = work.pop()
+            if child == 0:
+                index_of[node] = lowlink[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = 1
+            first = starts[node]
+            position = first + child
+            end = first + counts[node]
+            while position < end:
+                successor = targets[position]
+                position += 1
+                if index_of[successor] < 0:
+                    work.append((node, position - first))
+                    work.append((successor, 0))
+                    break
+                if on_stack[successor] and index_of[successor] < lowlink[node]:
+                    lowlink[node] = index_of[successor]
+            else:
+                if lowlink[node] == index_of[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component[member] = count
+                        if member == node:
+                            break
+                    count += 1
+                if work:
+                    parent = work[-1][0]
+                    if lowlink[node] < lowlink[parent]:
+                        lowlink[parent] = lowlink[node]
+
+    return np.frombuffer(component, dtype=np.int64), count
+
+
+def _load_graph(exploration, chunk_edges=1 << 22):
+    """
+    Read the transition file in chunks into (starts, counts, targets), targets as a compact int32 array.
+    Transitions to states that were not kept (max_states) are left out.
+    """
+    states = exploration.states
+    pairs = np.memmap(exploration.edges_path, dtype=np.uint64, mode='r').reshape(-1, 2) \
+        if exploration.transitions else np.zeros((0, 2), dtype=np.uint64)
+    starts = np.full(len(states), np.iinfo(np.int64).max, dtype=np.int64)
+    counts = np.zeros(len(states), dtype=np.int64)
+    targets = array('i')
+
+    for chunk_start in range(0, len(pairs), chunk_edges):
+        chunk = np.asarray(pairs[chunk_start:chunk_start + chunk_edges])
+        sources = np.searchsorted(states, chunk[:, 0])
+        positions = np.searchsorted(states, chunk[:, 1])
+        kept = positions < len(states)
+        kept[kept] = states[positions[kept]] == chunk[kept, 1]
+        sources, positions = sources[kept], positions[kept]
+
+        unique_sources, first = np.unique(sources, return_index=True)
+        np.minimum.at(starts, unique_sources, first + len(targets))
+        counts += np.bincount(sources, minlength=len(states))
+        targets.frombytes(positions.astype(np.int32).tobytes())
+
+    starts[counts == 0] = 0
+    del pairs
+    return starts, counts, targets
+
+
+def _attractors(starts, counts, targets, component, count, chunk_states=1 << 18):
+    """
+    Components without a transition to another component, the largest first.
+    """
+    edge_targets = np.frombuffer(targets, dtype=np.int32)
+    has_exit = np.zeros(count, dtype=bool)
+    order = np.argsort(starts, kind='stable')
+    for chunk_start in range(0, len(order), chunk_states):
+        nodes = order[chunk_start:chunk_start + chunk_states]
+        nodes = nodes[counts[nodes] > 0]
+        if not len(nodes):
+            continue
+        first = starts[nodes[0]]
+        last = starts[nodes[-1]] + counts[nodes[-1]]
+        sources = np.repeat(component[nodes], counts[nodes])
+        leaving = sources != component[edge_targets[first:last]]
+        has_exit[sources[leaving]] = True
+
+    sizes = np.bincount(component, minlength=count)
+    terminal = np.nonzero(~has_exit)[0]
+    return terminal[np.argsort(-sizes[terminal], kind='stable')], sizes
+
+
+def _invariants(model, columns, keys, chunk_size=1 << 14):
+    """
+    {variable: status} of the variables that have the same known status in every state of keys.
+    """
+    same = None
+    for block_start in range(0, len(keys), chunk_size):
+        final_states, _, _ = solve_model_batch(model, _rows(model, columns, keys[block_start:block_start + chunk_size]))
+        low = final_states.min(axis=0)
+        high = final_states.max(axis=0)
+        if same is None:
+            reference = low
+            same = low == high
+        else:
+            same &= (low == high) & (low == reference)
+    return {name: int(reference[column]) for column, name in enumerate(model.variables)
+            if same[column] and reference[column] != UNKNOWN}
+
+
+def simulate(initial_variables, model=None, rules=None, directory=None, max_states=None, max_attractors=20,
+             examples=3, chunk_size=1 << 14, frontier_limit=1 << 22):
+    """
+    Explore the transition graph from initial_variables and find its cycles and attractors.
+    model defaults to the compiled pressure regulator; rules maps inputs to a rule name (default 'continuity').
+    Only the max_attractors largest attractors are described, attractor_count counts all of them.
+    """
+    if model is None:
+        from model_registry import load_model
+
+        model = load_model('pressure_regulator')
+
+    with tempfile.TemporaryDirectory(prefix='simulation_') as temporary_directory:
+        exploration = explore(model, initial_variables, rules, directory or temporary_directory, chunk_size,
+                              frontier_limit, max_states)
+        starts, counts, targets = _load_graph(exploration)
+
+    component, count = strongly_connected_components(starts, counts, targets)
+    terminal, sizes = _attractors(starts, counts, targets, component, count)
+
+    columns = [model.variables.index(name) for name in exploration.inputs]
+    attractors = []
+    for attractor in terminal[:max_attractors]:
+        keys = exploration.states[component == attractor]
+        described = [{name: int(key >> np.uint64(2 * position)) & 3 for position, name in enumerate(exploration.inputs)}
+                     for key in keys[:examples]]
+        attractors.append(Attractor(int(sizes[attractor]), described, _invariants(model, columns, keys, chunk_size)))
+
+    return SimulationResult(
+        inputs=exploration.inputs,
+        states=len(exploration.states),
+        transitions=len(targets),
+        levels=exploration.levels,
+        complete=exploration.complete,
+        components=count,
+        cycles=int((sizes > 1).sum()),
+        attractor_count=len(terminal),
+        attractors=attractors,
+    )
+
+
+# --- 4. Command line ---
+STATUS_LETTERS = {'I': INCREASE, 'D': DECREASE, 'C': CONSTANT}
+
+
+def _format(statuses):
+    return ', '.join(f"{name}={STATUS_NAMES[status]}" for name, status in statuses.items()) or '-'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Qualitative simulation from a scenario of Code.py.")
+    parser.add_argument('scenario', nargs='?', choices=sorted(SCENARIOS), help="scenario number of the menu")
+    parser.add_argument('--set', action='append', default=[], metavar='VARIABLE=STATUS',
+                        help="initial status (I, D or C), added to the scenario")
+    parser.add_argument('--model', default='pressure_regulator', help="model of models/")
+    parser.add_argument('--rule', action='append', default=[], metavar='VARIABLE=RULE',
+                        help=f"rule of an input ({', '.join(RULES)}), default {DEFAULT_RULE}")
+    parser.add_argument('--max-states', type=int, help="stop exploring after this many states")
+    parser.add_argument('--attractors', type=int, default=10, help="attractors to describe")
+    args = parser.parse_args(argv)
+
+    rules = {}
+    for rule in args.rule:
+        variable, separator, name = rule.partition('=')
+        if not separator:
+            parser.error(f"--rule expects VARIABLE=RULE, got '{rule}'")
+        rules[variable] = name
+
+    initial_state = dict(SCENARIOS[args.scenario][1]) if args.scenario else {}
+    for setting in args.set:
+        variable, separator, status = setting.partition('=')
+        if not separator or status.upper() not in STATUS_LETTERS:
+            parser.error(f"--set expects VARIABLE=I, D or C, got '{setting}'")
+        initial_state[variable] = STATUS_LETTERS[status.upper()]
+    if not initial_state:
+        parser.error("give a scenario or at least one --set")
+
+    from model_registry import load_model
+
+    result = simulate(initial_state, load_model(args.model), rules, max_states=args.max_states,
+                      max_attractors=args.attractors)
+
+    print(f"Inputs: {', '.join(f'{name} ({rules.get(name, DEFAULT_RULE)})' for name in result.inputs)}")
+    print(f"{result.states} states, {result.transitions} transitions, {result.levels} levels"
+          f"{'' if result.complete else ' (stopped at --max-states)'}")
+    print(f"{result.components} components, {result.cycles} cycle(s), {result.attractor_count} attractor(s)")
+    for number, attractor in enumerate(result.attractors, start=1):
+        print(f"Attractor {number}: {attractor.size} state(s)")
+        print(f"  invariants: {_format(attractor.invariants)}")
+        for example in attractor.examples:
+            print(f"  e.g. {_format(example)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# LRU memoization of solve results.
+#
+# The same scenarios are asked again and again (for example the five scenarios of main()),
+# so the result of a solve is kept, keyed on the canonical encoding of the initial assignment:
+# its packed state.State bits (2 bits per variable in Code.STATE_VARIABLES order). The cache has a bounded size and evicts the
+# least recently used result first.
+
+from collections import OrderedDict, namedtuple
+
+from Code import STATE_VARIABLES, SolveResult, solve_pressure_regulator
+from state import state_type
+
+
+CacheStats = namedtuple('CacheStats', ['hits', 'misses', 'evictions', 'size', 'maxsize'])
+
+
+def canonical_key(initial_variables, variables=STATE_VARIABLES):
+    """
+    Return the hashable key of an initial assignment (the codes packed in a fixed variable order).
+    initial_variables is a dictionary or a state.State of that variable order; both give the same key.
+    """
+    state_class = state_type(tuple(variables))
+    if isinstance(initial_variables, state_class):
+        return initial_variables.bits
+    return state_class.from_dict(initial_variables).bits
+
+
+class SolveCache:
+    """
+    Bounded LRU cache in front of a solve function returning a Code.SolveResult.
+    Only the variables, contradictions and iterations are kept: the justifications of a traced
+    solve are dropped, a cached result always has justifications None.
+    """
+
+    def __init__(self, maxsize=1024, solve=solve_pressure_regulator, variables=STATE_VARIABLES):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+        self.maxsize = maxsize
+        self.variables = tuple(variables)
+        self._solve = solve
+        self._results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def solve(self, initial_variables):
+        """
+        Return the result for initial_variables (a dictionary or a state.State), solving it only if
+        it is not cached yet. The returned variables and contradictions are copies, so callers may
+        change them freely; the justifications are not kept (None).
+        """
+        key = canonical_key(initial_variables, self.variables)
+        result = self._results.get(key)
+        if result is not None:
+            self.hits += 1
+            self._results.move_to_end(key)
+        else:
+            self.misses += 1
+            if not isinstance(initial_variables, dict):
+                initial_variables = initial_variables.to_dict()
+            result = self._solve(initial_variables)
+            self._results[key] = result
+            if len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+                self.evictions += 1
+
+        return SolveResult(dict(result.variables), list(result.contradictions), result.iterations)
+
+    def stats(self):
+        return CacheStats(self.hits, self.misses, self.evictions, len(self._results), self.maxsize)
+
+    def clear(self):
+        """
+        Drop every cached result and reset the counters.
+        """
+        self._results.clear()
+        self.hits = self.misses = self.evictions = 0
+
+
+# Shared cache for the pressure regulator
+default_cache = SolveCache()
+
+
+def cached_solve_pressure_regulator(initial_variables):
+    """
+    solve_pressure_regulator through the shared LRU cache.
+    """
+    return default_cache.solve(initial_variables)
@@ -0,0 +1,128 @@
+# Compact state type: 2 bits per variable in one integer.
+#
+# A State holds a whole assignment as a single int (variable i in bits 2i and 2i+1, the same packing
+# as the envisionment table), in a __slots__ object without a __dict__. It is immutable, so copying
+# is free, equality and hashing are integer operations, and it can be used directly as a cache key.
+# For the pressure regulator that is one 22-bit int instead of an 11-entry dictionary.
+#
+#   state = State.from_dict({'P_in': INCREASE, 'Pi_A1': CONSTANT})   # missing variables are UNKNOWN
+#   state['P_in'], state.set('Q', DECREASE), state.to_dict()
+#
+# State uses the variable order of Code.STATE_VARIABLES; state_type(variables) gives the same type
+# for any other variable order (e.g. the variables of a compiled pi_model).
+
+from functools import lru_cache
+from operator import index
+
+from Code import UNKNOWN, CONSTANT, STATE_VARIABLES, STATUS_NAMES
+
+
+def _checked(name, status):
+    """
+    The status (as an int) if it is one of the codes UNKNOWN..CONSTANT, a ValueError otherwise.
+    """
+    try:
+        code = index(status)
+    except TypeError:
+        code = None
+    if code is None or not UNKNOWN <= code <= CONSTANT:
+        raise ValueError(f"Invalid status {status!r} for {name}, expected a code from 0 to 3.")
+    return code
+
+
+class State:
+    """
+    Immutable assignment of the variables in VARIABLES, packed 2 bits per variable.
+    """
+
+    __slots__ = ('bits',)
+
+    VARIABLES = STATE_VARIABLES
+    SHIFTS = {name: 2 * position for position, name in enumerate(STATE_VARIABLES)}
+
+    def __init__(self, bits=0):
+        bits = index(bits)
+        if not 0 <= bits < 1 << (2 * len(self.VARIABLES)):
+            raise ValueError(f"Invalid state bits {bits} for {len(self.VARIABLES)} variables.")
+        object.__setattr__(self, 'bits', bits)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("State is immutable, use set() for a changed copy.")
+
+    @classmethod
+    def from_dict(cls, variables):
+        """
+        Pack a scenario dictionary; variables that are not given are UNKNOWN, other keys are ignored.
+        A status that is not a code raises ValueError.
+        """
+        bits = 0
+        for name, shift in cls.SHIFTS.items():
+            bits |= _checked(name, variables.get(name, UNKNOWN)) << shift
+        return cls(bits)
+
+    @classmethod
+    def from_codes(cls, codes):
+        """
+        Pack a sequence of codes in VARIABLES order (exactly one per variable).
+        """
+        codes = tuple(codes)
+        if len(codes) != len(cls.VARIABLES):
+            raise ValueError(f"Expected {len(cls.VARIABLES)} codes, got {len(codes)}.")
+        bits = 0
+        for position, (name, status) in enumerate(zip(cls.VARIABLES, codes)):
+            bits |= _checked(name, status) << (2 * position)
+        return cls(bits)
+
+    def to_dict(self):
+        bits = self.bits
+        return {name: (bits >> shift) & 3 for name, shift in self.SHIFTS.items()}
+
+    def codes(self):
+        """
+        Tuple of the codes in VARIABLES order.
+        """
+        bits = self.bits
+        return tuple((bits >> shift) & 3 for shift in self.SHIFTS.values())
+
+    def __getitem__(self, name):
+        return (self.bits >> self.SHIFTS[name]) & 3
+
+    def set(self, name, status):
+        """
+        Copy of the state with one variable changed.
+        """
+        shift = self.SHIFTS[name]
+        return type(self)((self.bits & ~(3 << shift)) | (_checked(name, status) << shift))
+
+    def unknown(self):
+        """
+        Names of the variables that are UNKNOWN.
+        """
+        bits = self.bits
+        return [name for name, shift in self.SHIFTS.items() if not (bits >> shift) & 3]
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.bits == other.bits
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __reduce__(self):
+        return (type(self), (self.bits,))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{name}={STATUS_NAMES[self[name]]}' for name in self.VARIABLES)})"
+
+
+@lru_cache(maxsize=None)
+def state_type(variables):
+    """
+    State type for another variable order (variables is a tuple of names).
+    """
+    variables = tuple(variables)
+    if variables == STATE_VARIABLES:
+        return State
+    shifts = {name: 2 * position for position, name in enumerate(variables)}
+    return type('State', (State,), {'__slots__': (), 'VARIABLES': variables, 'SHIFTS': shifts})
@@ -0,0 +1,94 @@
+# Streaming (incremental) solver for qualitative sensor events.
+#
+# The solver keeps a live solved state of the pressure regulator. Every event such as
+# ('P_in', INCREASE) is applied to that state and only the regimes that read the changed variable
+# are put on the agenda, so an event costs the few regime evaluations it actually triggers
+# instead of a full solve_pressure_regulator from scratch.
+#
+# An event that only adds information (the variable was UNKNOWN or already had that status) is
+# propagated incrementally. An event that changes a known status invalidates what was derived
+# from the old status, so the state is then solved again from the inputs received so far.
+#
+# As in whatif.py, the state is also solved again once a contradiction is involved (found before or by
+# this event), because what a regime derives after a contradiction depends on the evaluation order.
+# So with the compiled kernels of pi_model the live state is always that of a full solve of the inputs.
+# The hand-written regimes of Code.py (REGIMES) depend on the order on their own: propagating an event
+# into a previous fixpoint can miss a contradiction a full solve of the inputs reports (or report one it
+# does not), so with them every event solves the inputs again. No divergence from a full solve remains.
+
+from collections import namedtuple
+
+from Code import (
+    UNKNOWN,
+    REGIMES,
+    SolverContext,
+    build_dependency_index,
+    run_agenda,
+    solve_with_regimes,
+)
+
+
+# variables: copy of the live state after the event; contradictions: the ones this event added (not reported before);
+# recomputed: True if the state was solved again from the inputs
+StreamUpdate = namedtuple('StreamUpdate', ['variable', 'status', 'variables', 'contradictions', 'recomputed'])
+
+
+class IncrementalSolver:
+    """
+    Live solved state that is updated one event at a time. It is always the result of a full solve of
+    the inputs; for the regimes of a compiled model most events only cost the regimes they reach.
+    """
+
+    def __init__(self, initial_variables, regimes=REGIMES, dependency_index=None):
+        self.regimes = regimes
+        self.dependency_index = dependency_index or build_dependency_index(regimes)
+        # What was given from outside (initial state and events), the rest is derived
+        self.inputs = dict(initial_variables)
+        self.variables = {}
+        self.contradictions = []
+        self._solve_inputs()
+
+    def _solve_inputs(self):
+        """
+        Solve the inputs again and return the contradictions that were not there before.
+        """
+        result = solve_with_regimes(self.inputs, self.regimes, self.dependency_index)
+        known = set(self.contradictions)
+        self.variables = result.variables
+        self.contradictions = result.contradictions
+        return [contradiction for contradiction in result.contradictions if contradiction not in known]
+
+    def apply(self, variable, status):
+        """
+        Apply one event (variable became status) and return a StreamUpdate.
+        """
+        if variable not in self.variables:
+            raise KeyError(f"Unknown variable '{variable}'.")
+
+        self.inputs[variable] = status
+        current = self.variables[variable]
+
+        if current not in (UNKNOWN, status) or self.contradictions or self.regimes is REGIMES:
+            new_contradictions = self._solve_inputs()
+            return StreamUpdate(variable, status, dict(self.variables), new_contradictions, True)
+
+        if current == status:
+            return StreamUpdate(variable, status, dict(self.variables), [], False)
+
+        # Only the regimes reading this variable have to look at it
+        variables = dict(self.variables)
+        variables[variable] = status
+        context = SolverContext(variables)
+        run_agenda(context, self.regimes, self.dependency_index, start=self.dependency_index.get(variable, ()))
+        if context.contradictions:
+            new_contradictions = self._solve_inputs()
+            return StreamUpdate(variable, status, dict(self.variables), new_contradictions, True)
+        self.variables = variables
+        return StreamUpdate(variable, status, dict(self.variables), [], False)
+
+    def stream(self, events):
+        """
+        Apply every (variable, status) event of an iterable and yield a StreamUpdate after each one.
+        """
+        for variable, status in events:
+            yield self.apply(variable, status)
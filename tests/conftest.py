@@ -0,0 +1,18 @@
+# The modules of the repository are flat top-level scripts, make them importable from the tests.
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def envisionment_table(tmp_path_factory):
+    """
+    Path of an envisionment table built for this test run (envisionment.bin is not part of the repository).
+    """
+    from envisionment import build_table
+
+    return build_table(str(tmp_path_factory.mktemp('envisionment') / 'envisionment.bin'))
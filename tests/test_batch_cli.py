@@ -0,0 +1,86 @@
+# Reading scenario files and solving them with the batch command.
+
+import json
+
+import pytest
+
+from Code import UNKNOWN, INCREASE, DECREASE, CONSTANT, STATE_VARIABLES, STATUS_NAMES, solve_pressure_regulator
+from batch_cli import ScenarioError, main, read_scenarios, solve_stream
+from model_registry import load_model
+from pi_model import solve_model
+
+
+def _write(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def test_jsonl_and_csv_give_the_same_scenarios(tmp_path):
+    jsonl = _write(tmp_path / 'scenarios.jsonl',
+                   '{"id": "a", "P_in": "I", "P_out": 3, "Q": "Decreased"}\n\n{"id": "b", "x": "d", "note": 1}\n')
+    csv = _write(tmp_path / 'scenarios.csv', 'id,P_in,P_out,Q,x,note\na,I,3,Decreased,,\nb,,,,d,1\n')
+    expected = [('a', {'P_in': INCREASE, 'P_out': CONSTANT, 'Q': DECREASE}), ('b', {'x': DECREASE})]
+    for path in (jsonl, csv):
+        scenarios = [(scenario_id, state.to_dict()) for scenario_id, state in read_scenarios(path)]
+        assert [scenario_id for scenario_id, _ in scenarios] == ['a', 'b']
+        for (_, variables), (_, given) in zip(scenarios, expected):
+            assert variables == {name: given.get(name, UNKNOWN) for name in STATE_VARIABLES}
+
+
+@pytest.mark.parametrize('text, message', [
+    ('{"P_in": "I"}\n{"P_in": "X"}\n', ":2: invalid status 'X' for P_in"),
+    ('{"P_in": "I"}\n\n{"P_in": "I"\n', ":3: invalid JSON"),
+    ('[1, 2]\n', ":1: expected an object"),
+])
+def test_unreadable_line_is_located(tmp_path, text, message):
+    path = _write(tmp_path / 'scenarios.jsonl', text)
+    with pytest.raises(ScenarioError, match=f"^{path}{message}"):
+        list(read_scenarios(path))
+
+
+def test_unreadable_csv_row_is_located(tmp_path):
+    path = _write(tmp_path / 'scenarios.csv', 'P_in,Q\nI,C\nC,7\n')
+    with pytest.raises(ScenarioError, match=f"^{path}:3: invalid status '7' for Q"):
+        list(read_scenarios(path))
+
+
+def test_command_reports_the_line(tmp_path, capsys):
+    path = _write(tmp_path / 'scenarios.jsonl', '{"P_in": "I"}\n{"Q": "up"}\n')
+    with pytest.raises(SystemExit) as exit_info:
+        main([path, '--workers', '1'])
+    assert exit_info.value.code == 1
+    assert f"{path}:2: invalid status 'up' for Q" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('engine', ['batch', 'agenda'])
+def test_results_keep_the_input_order_with_two_workers(tmp_path, engine):
+    lines = [json.dumps({'id': number, **{name: (number >> (2 * position)) & 3
+                                          for position, name in enumerate(STATE_VARIABLES)}})
+             for number in range(0, 4 ** len(STATE_VARIABLES), 4099)]
+    path = _write(tmp_path / 'scenarios.jsonl', '\n'.join(lines) + '\n')
+    results = [json.loads(line) for line in solve_stream(read_scenarios(path), engine, workers=2, chunk_size=37)]
+    assert [result['id'] for result in results] == [json.loads(line)['id'] for line in lines]
+    for line, result in zip(lines, results):
+        initial = {name: json.loads(line)[name] for name in STATE_VARIABLES}
+        expected = solve_pressure_regulator(initial)
+        assert result['contradiction'] == bool(expected.contradictions)
+        assert {name: result[name] for name in STATE_VARIABLES} == \
+            {name: STATUS_NAMES[status] for name, status in expected.variables.items()}
+
+
+def test_compiled_engine_solves_every_model(tmp_path):
+    models = ('pressure_regulator', 'pressure_regulator_physical_link')
+    lines = [json.dumps({'id': number, 'P_in': status, 'x': other})
+             for number, (status, other) in enumerate([(INCREASE, UNKNOWN), (CONSTANT, DECREASE), (DECREASE, INCREASE)])]
+    path = _write(tmp_path / 'scenarios.jsonl', '\n'.join(lines) + '\n')
+    results = [json.loads(line) for line in solve_stream(read_scenarios(path), 'compiled', workers=1, models=models)]
+    assert [(result['id'], result['model']) for result in results] == [(number, name) for number in range(3)
+                                                                        for name in models]
+    for result in results:
+        model = load_model(result['model'])
+        initial = {name: json.loads(lines[result['id']])[name] for name in ('P_in', 'x')}
+        expected = solve_model(model, initial)
+        assert result['contradiction'] == bool(expected.contradictions)
+        assert {name: result[name] for name in model.variables} == \
+            {name: STATUS_NAMES[status] for name, status in expected.variables.items()}
+        assert result['sweeps'] >= 1
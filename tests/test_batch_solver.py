@@ -0,0 +1,37 @@
+# The batched solvers against the scalar ones.
+
+import numpy as np
+
+from Code import STATE_VARIABLES, solve_pressure_regulator
+from batch_solver import decode_state, solve_batch, solve_model_batch
+from pi_model import solve_model
+from search import default_model
+
+
+def _random_states(count, seed=0):
+    return np.random.default_rng(seed).integers(0, 4, (count, len(STATE_VARIABLES)), dtype=np.uint8)
+
+
+def test_solve_batch_matches_solve_pressure_regulator():
+    initial_states = _random_states(20000)
+    states, contradiction_mask, iterations = solve_batch(initial_states)
+    assert iterations.min() >= 1
+    for initial, final, contradiction in zip(initial_states, states, contradiction_mask):
+        expected = solve_pressure_regulator(decode_state(initial))
+        assert decode_state(final) == expected.variables, initial
+        assert contradiction == bool(expected.contradictions), initial
+
+
+def test_solve_model_batch_matches_solve_model():
+    """
+    Same contradictions, and the same variables where there is none (after a contradiction the
+    kernels may stop in another order).
+    """
+    model = default_model()
+    initial_states = _random_states(20000, seed=1)
+    states, contradiction_mask, _ = solve_model_batch(model, initial_states)
+    for initial, final, contradiction in zip(initial_states, states, contradiction_mask):
+        expected = solve_model(model, dict(zip(model.variables, map(int, initial))))
+        assert contradiction == bool(expected.contradictions), initial
+        if not contradiction:
+            assert dict(zip(model.variables, map(int, final))) == expected.variables, initial
@@ -0,0 +1,69 @@
+# Pi-groups derived from the dimension matrix, and their on-disk cache.
+
+import json
+import os
+
+import pytest
+
+import buckingham
+from buckingham import cached_pi_groups, derive_pi_groups, dimension_matrix, integer_nullspace, matrix_key, model_spec
+
+PRESSURE = {'M': 1, 'L': -1, 'T': -2}
+REGULATOR = {
+    'Q': {'L': 3, 'T': -1},
+    'P_out': dict(PRESSURE),
+    'A_open': {'L': 2},
+    'P_in': dict(PRESSURE),
+    'rho': {'M': 1, 'L': -3},
+}
+REGULATOR_GROUPS = {
+    'Pi_Q': {'Q': 2, 'A_open': -2, 'P_in': -1, 'rho': 1},
+    'Pi_P_out': {'P_out': 1, 'P_in': -1},
+}
+
+
+def test_regulator_groups():
+    groups = derive_pi_groups(REGULATOR)
+    assert groups == REGULATOR_GROUPS
+    for exponents in groups.values():
+        for dimension in 'MLT':
+            assert sum(exponent * REGULATOR[name].get(dimension, 0) for name, exponent in exponents.items()) == 0
+
+
+def test_nullspace_is_integer_and_minimal():
+    dimensions, names, matrix = dimension_matrix(REGULATOR)
+    assert (dimensions, names) == (['L', 'M', 'T'], list(REGULATOR))
+    assert matrix == [[3, -1, 2, -1, -3], [0, 1, 0, 1, 1], [-1, -2, 0, -2, 0]]
+    # 5 variables of rank 3: a basis of 2 integer vectors without common factors
+    basis = integer_nullspace(matrix, len(names))
+    assert basis == [[2, 0, -2, -1, 1], [0, 1, 0, -1, 0]]
+
+
+def test_cache_serves_the_second_call(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    assert cached_pi_groups(REGULATOR, cache_directory=directory) == REGULATOR_GROUPS
+    path = os.path.join(directory, f"{matrix_key(REGULATOR)}.json")
+    with open(path) as cache_file:
+        assert json.load(cache_file)['groups'] == REGULATOR_GROUPS
+
+    def derive_again(*arguments):
+        raise AssertionError("derived again instead of read from the cache")
+
+    monkeypatch.setattr(buckingham, 'derive_pi_groups', derive_again)
+    assert cached_pi_groups(REGULATOR, cache_directory=directory) == REGULATOR_GROUPS
+    spec = model_spec('regulator', REGULATOR, constants=('rho',), cache_directory=directory)
+    assert spec['variables'] == ['Q', 'P_out', 'A_open', 'P_in'] and spec['groups'] == REGULATOR_GROUPS
+
+    # Another prefix is not served from the entry of the first one
+    with pytest.raises(AssertionError, match="derived again"):
+        cached_pi_groups(REGULATOR, prefix='G_', cache_directory=directory)
+
+
+def test_key_follows_the_matrix():
+    key = matrix_key(REGULATOR)
+    assert len(key) == 64 and key == matrix_key({name: dict(exponents) for name, exponents in REGULATOR.items()})
+    changed = dict(REGULATOR, A_open={'L': 3})
+    assert matrix_key(changed) != key
+    # The order chooses the repeating variables, so it is part of the key
+    reordered = dict(reversed(list(REGULATOR.items())))
+    assert matrix_key(reordered) != key
@@ -0,0 +1,61 @@
+# The hand-written regimes of Code.py.
+
+import numpy as np
+
+from Code import (
+    UNKNOWN,
+    INCREASE,
+    DECREASE,
+    CONSTANT,
+    STATE_VARIABLES,
+    SolverContext,
+    propagate_ensemble_a,
+    merge_contact_variable_pi_c1_pi_c2,
+    propagate_ensemble_b,
+    solve_pressure_regulator,
+)
+
+
+def _initial(**statuses):
+    initial = dict.fromkeys(STATE_VARIABLES, UNKNOWN)
+    initial.update(statuses)
+    return initial
+
+
+def test_pi_a1_constant_sets_q_from_the_denominator():
+    result = solve_pressure_regulator(_initial(A_open=DECREASE, P_in=CONSTANT, Pi_A1=CONSTANT))
+    assert not result.contradictions
+    assert result.variables['Q'] == DECREASE
+
+
+def test_pi_a1_constant_checks_q_against_the_denominator():
+    result = solve_pressure_regulator(_initial(Q=INCREASE, A_open=DECREASE, P_in=CONSTANT, Pi_A1=CONSTANT))
+    assert [(contradiction.regime, contradiction.variable) for contradiction in result.contradictions] == \
+        [('Pi_A1', 'Q')]
+
+
+def _sweep(initial):
+    """
+    The fixed sweep loop the agenda replaced: all regimes, again and again, until a sweep changes nothing.
+    """
+    context = SolverContext(dict(initial))
+    sweeps = 0
+    changes_made = True
+    while changes_made:
+        sweeps += 1
+        changes_made = propagate_ensemble_a(context.variables, context)
+        changes_made = merge_contact_variable_pi_c1_pi_c2(context.variables, context) or changes_made
+        changes_made = propagate_ensemble_b(context.variables, context) or changes_made
+    return context, sweeps
+
+
+def test_agenda_matches_the_sweep_loop():
+    generator = np.random.default_rng(0)
+    for _ in range(20000):
+        initial = {name: int(status) for name, status in zip(STATE_VARIABLES, generator.integers(0, 4, len(STATE_VARIABLES)))}
+        context, sweeps = _sweep(initial)
+        result = solve_pressure_regulator(initial)
+        assert result.variables == context.variables, initial
+        # The same contradictions, found in another order
+        assert set(result.contradictions) == set(context.contradictions), initial
+        assert result.iterations <= 5 * sweeps, initial
@@ -0,0 +1,14 @@
+# The engines of differential.py on the physical inputs of the menu.
+
+import numpy as np
+
+from differential import PHYSICAL_SPACE_SIZE, run_harness
+
+
+def test_engines_agree_on_physical_inputs(envisionment_table):
+    engines = ['agenda', 'batch', f'table:{envisionment_table}', 'model:pressure_regulator',
+               'model-batch:pressure_regulator']
+    for report in run_harness(engines, np.arange(PHYSICAL_SPACE_SIZE)):
+        assert report.scenarios == PHYSICAL_SPACE_SIZE
+        assert report.diverging == 0, report.candidate
+
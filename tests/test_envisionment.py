@@ -0,0 +1,35 @@
+# The envisionment table against the solver it was built with, and its header.
+
+import shutil
+
+import numpy as np
+import pytest
+
+from Code import STATE_VARIABLES
+from envisionment import HEADER, TABLE_FORMAT, TABLE_MAGIC, lookup, lookup_rows
+from batch_solver import RULE_VERSION, decode_state, solve_batch
+
+
+def test_lookup_matches_the_solvers(envisionment_table):
+    rows = np.random.default_rng(0).integers(0, 4, (2000, len(STATE_VARIABLES)), dtype=np.uint8)
+    final_states, contradiction_mask, iterations = lookup_rows(rows, envisionment_table)
+    expected = solve_batch(rows)
+    for found, wanted in zip((final_states, contradiction_mask, iterations), expected):
+        assert (found == wanted).all()
+
+    for row, final, contradiction, sweeps in list(zip(rows, *expected))[:200]:
+        assert lookup(decode_state(row), envisionment_table) == (decode_state(final), contradiction, sweeps)
+
+
+@pytest.mark.parametrize('header', [
+    HEADER.pack(TABLE_MAGIC, TABLE_FORMAT, RULE_VERSION - 1, len(STATE_VARIABLES), 4, 24, 0),
+    HEADER.pack(TABLE_MAGIC, TABLE_FORMAT + 1, RULE_VERSION, len(STATE_VARIABLES), 4, 24, 0),
+    bytes(HEADER.size),
+], ids=['old rules', 'other format', 'no header'])
+def test_stale_table_is_rejected(envisionment_table, tmp_path, header):
+    path = str(tmp_path / 'stale.bin')
+    shutil.copyfile(envisionment_table, path)
+    with open(path, 'r+b') as table_file:
+        table_file.write(header)
+    with pytest.raises(ValueError, match="another version"):
+        lookup_rows(np.zeros((1, len(STATE_VARIABLES)), dtype=np.uint8), path)
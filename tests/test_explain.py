@@ -0,0 +1,38 @@
+# QuickXplain cores are inconsistent and subset-minimal under the rules of the solve they explain.
+
+import numpy as np
+import pytest
+
+from Code import UNKNOWN, INCREASE, CONSTANT, STATE_VARIABLES, solve_with_regimes
+from explain import HAND_WRITTEN_RULES, minimal_conflict
+from search import default_model
+
+
+def _inconsistent(rules, assignments):
+    initial = dict.fromkeys(rules.variables, UNKNOWN)
+    initial.update(assignments)
+    return bool(solve_with_regimes(initial, rules.regimes, rules.dependency_index).contradictions)
+
+
+@pytest.mark.parametrize('rules', [HAND_WRITTEN_RULES, default_model()], ids=['hand-written', 'compiled'])
+def test_cores_are_subset_minimal(rules):
+    generator = np.random.default_rng(0)
+    conflicts = 0
+    for _ in range(500):
+        initial = {name: int(status) for name, status in zip(STATE_VARIABLES, generator.integers(0, 4, len(STATE_VARIABLES)))}
+        conflict = minimal_conflict(initial, rules)
+        if conflict is None:
+            assert not _inconsistent(rules, initial), initial
+            continue
+        conflicts += 1
+        core = conflict.assignments
+        assert _inconsistent(rules, core), initial
+        for variable in core:
+            assert not _inconsistent(rules, {name: status for name, status in core.items() if name != variable}), core
+    assert conflicts
+
+
+@pytest.mark.parametrize('rules', [HAND_WRITTEN_RULES, default_model()], ids=['hand-written', 'compiled'])
+def test_consistent_inputs_are_not_blamed(rules):
+    # Pi_A1 = Q / (A_open * P_in) is Constant when all three increase
+    assert minimal_conflict({'P_in': INCREASE, 'Q': INCREASE, 'A_open': INCREASE, 'Pi_A1': CONSTANT}, rules) is None
@@ -0,0 +1,26 @@
+# Decision diagram queries against the backtracking search.
+
+import random
+
+from Code import UNKNOWN, STATE_VARIABLES
+from mdd import build_mdd, count, is_consistent, model_key
+from pi_model import RULE_VERSION
+from search import default_model, find_completions
+
+MODEL = default_model()
+MDD = build_mdd(MODEL)
+
+
+def test_count_matches_search():
+    generator = random.Random(0)
+    for _ in range(200):
+        partial = {name: generator.choice((UNKNOWN, UNKNOWN, 1, 2, 3)) for name in STATE_VARIABLES}
+        expected = len(find_completions(partial).solutions)
+        assert count(MDD, partial) == expected, partial
+        assert is_consistent(MDD, partial) == (expected > 0), partial
+
+
+def test_key_depends_on_the_rule_version(monkeypatch):
+    key = model_key(MODEL)
+    monkeypatch.setattr('mdd.RULE_VERSION', RULE_VERSION + 1)
+    assert model_key(MODEL) != key
@@ -0,0 +1,40 @@
+# Generated models compile and solve like the pressure regulator.
+
+import numpy as np
+
+from Code import UNKNOWN
+from batch_solver import solve_model_batch
+from model_generator import generate_model, random_initial_state
+from pi_model import compile_model, solve_model
+
+
+def test_generation_is_reproducible():
+    assert generate_model(20, seed=3) == generate_model(20, seed=3)
+    assert generate_model(20, seed=3) != generate_model(20, seed=4)
+
+
+def test_groups_use_declared_variables():
+    spec = generate_model(50, seed=1)
+    variables = set(spec['variables'])
+    for name, exponents in spec['groups'].items():
+        assert exponents and set(exponents) <= variables, name
+    assert set(spec['contact_groups']) <= set(spec['groups'])
+    assert len(spec['contact_groups']) == len(spec['ensembles']) - 1
+
+
+def test_agenda_and_batch_agree_on_generated_model():
+    spec = generate_model(50, seed=1)
+    model = compile_model(spec)
+    initial_states = [random_initial_state(spec, known_fraction=0.3, seed=seed) for seed in range(100)]
+    # Every variable known: the pi-groups follow from them, so nothing can contradict
+    generator = np.random.default_rng(0)
+    initial_states.append({name: int(status) for name, status in
+                           zip(spec['variables'], generator.integers(1, 4, len(spec['variables'])))})
+
+    rows = np.array([[initial.get(name, UNKNOWN) for name in model.variables] for initial in initial_states],
+                    dtype=np.uint8)
+    states, contradiction_mask, _ = solve_model_batch(model, rows)
+    for initial, final, contradiction in zip(initial_states, states, contradiction_mask):
+        result = solve_model(model, initial)
+        assert not result.contradictions and not contradiction
+        assert [result.variables[name] for name in model.variables] == list(final)
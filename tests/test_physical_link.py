@@ -0,0 +1,50 @@
+# The physical link variant against a hand-written version of its rules.
+
+import itertools
+
+import Code
+from Code import (
+    UNKNOWN,
+    SIGNED_PRODUCT_TABLE,
+    STATE_VARIABLES,
+    REGIMES,
+    Regime,
+    build_dependency_index,
+    solve_with_regimes,
+)
+from model_registry import load_model
+from pi_model import solve_model
+
+# The inputs of the menu: every pi-group UNKNOWN
+PHYSICAL_VARIABLES = STATE_VARIABLES[:STATE_VARIABLES.index('Pi_A1')]
+
+
+def test_physical_link_variant_matches_hand_rules(monkeypatch):
+    """
+    The regimes of Code.py with the signed product and the link x = A_open written by hand give the
+    same result as the compiled pressure_regulator_physical_link model for every physical input.
+    """
+    def propagate_physical_link(variables, context):
+        x_status, a_open_status = variables['x'], variables['A_open']
+        if x_status != UNKNOWN and a_open_status == UNKNOWN:
+            variables['A_open'] = x_status
+            return True
+        if a_open_status != UNKNOWN and x_status == UNKNOWN:
+            variables['x'] = a_open_status
+            return True
+        if x_status != a_open_status:
+            context.report('Physical_Link', 'A_open', a_open_status, x_status)
+        return False
+
+    monkeypatch.setattr(Code, 'PRODUCT_TABLE', SIGNED_PRODUCT_TABLE)
+    regimes = REGIMES + (Regime('Physical_Link', propagate_physical_link, ('x', 'A_open'), ('x', 'A_open')),)
+    dependency_index = build_dependency_index(regimes)
+    model = load_model('pressure_regulator_physical_link')
+
+    for statuses in itertools.product(range(4), repeat=len(PHYSICAL_VARIABLES)):
+        initial = dict.fromkeys(STATE_VARIABLES, UNKNOWN)
+        initial.update(zip(PHYSICAL_VARIABLES, statuses))
+        expected = solve_with_regimes(initial, regimes, dependency_index)
+        result = solve_model(model, initial)
+        assert bool(result.contradictions) == bool(expected.contradictions), initial
+        assert result.variables == expected.variables, initial
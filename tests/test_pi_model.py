@@ -0,0 +1,67 @@
+# The group rule of pi_model against its forward definition and against the hand-written regimes of Code.py.
+
+import itertools
+
+import pytest
+
+from Code import (
+    UNKNOWN,
+    INCREASE,
+    DECREASE,
+    CONSTANT,
+    PRODUCT_TABLE,
+    SIGNED_PRODUCT_TABLE,
+    DIVISION_TABLE,
+    STATE_VARIABLES,
+    solve_pressure_regulator,
+)
+from pi_model import PRESSURE_REGULATOR, compile_model, propagate_group, solve_model
+
+KNOWN = (INCREASE, DECREASE, CONSTANT)
+SHAPES = [(1, -1, -1), (1, -1), (1, 1), (1,), (-1,), (1, 1, -1, -1)]
+PHYSICAL_VARIABLES = STATE_VARIABLES[:6]
+
+
+@pytest.mark.parametrize('product_table', [PRODUCT_TABLE, SIGNED_PRODUCT_TABLE])
+@pytest.mark.parametrize('signs', SHAPES)
+def test_forward_tuples_are_accepted(signs, product_table):
+    """
+    pi derived from known variables, with any of the entries hidden again, is never a contradiction
+    and never infers anything else.
+    """
+    for statuses in itertools.product(KNOWN, repeat=len(signs)):
+        full, contradiction = propagate_group([UNKNOWN, *statuses], signs, product_table, DIVISION_TABLE)
+        assert contradiction is None
+        for hidden in itertools.product((False, True), repeat=len(full)):
+            codes = [UNKNOWN if hide else status for status, hide in zip(full, hidden)]
+            propagated, contradiction = propagate_group(codes, signs, product_table, DIVISION_TABLE)
+            assert contradiction is None, (signs, codes)
+            assert all(status in (UNKNOWN, expected) for status, expected in zip(propagated, full)), (signs, codes)
+
+
+def test_independent_inputs_are_consistent():
+    # Pi_A1 = Q / (A_open * P_in) with Q, A_open and P_in all increasing gives Pi_A1 = I / I = CONSTANT
+    assert propagate_group([CONSTANT, INCREASE, INCREASE, INCREASE], (1, -1, -1),
+                           PRODUCT_TABLE, DIVISION_TABLE) == ([CONSTANT, INCREASE, INCREASE, INCREASE], None)
+
+
+@pytest.mark.parametrize('pi_a1', [UNKNOWN, CONSTANT])
+def test_compiled_model_matches_hand_regimes(pi_a1):
+    """
+    Every physical input of the menu (pi-groups UNKNOWN, or Pi_A1 CONSTANT as in the manual input):
+    the compiled model finds a contradiction exactly when solve_pressure_regulator does and agrees
+    with every variable the hand-written regimes derive (it may derive more).
+    """
+    model = compile_model(PRESSURE_REGULATOR)
+    for statuses in itertools.product((UNKNOWN,) + KNOWN, repeat=len(PHYSICAL_VARIABLES)):
+        initial = dict.fromkeys(STATE_VARIABLES, UNKNOWN)
+        initial.update(zip(PHYSICAL_VARIABLES, statuses))
+        initial['Pi_A1'] = pi_a1
+        expected = solve_pressure_regulator(initial)
+        result = solve_model(model, initial)
+        assert bool(result.contradictions) == bool(expected.contradictions), initial
+        if pi_a1 == UNKNOWN:
+            assert result.variables == expected.variables, initial
+        elif not expected.contradictions:
+            assert all(result.variables[name] == status
+                       for name, status in expected.variables.items() if status != UNKNOWN), initial
@@ -0,0 +1,62 @@
+# Per-regime counters of RegimeStats on known scenarios.
+
+import io
+import json
+
+from Code import UNKNOWN, INCREASE, DECREASE, CONSTANT, STATE_VARIABLES, SolverContext, run_agenda
+from profiling import RegimeStats
+
+
+def _initial(**statuses):
+    initial = dict.fromkeys(STATE_VARIABLES, UNKNOWN)
+    initial.update(statuses)
+    return initial
+
+
+def _counters(stats):
+    return {name: (counters['calls'], counters['changed'], counters['contradictions'])
+            for name, counters in stats.as_dict().items()}
+
+
+# P_out and the contact groups constant: Pi_C1 gives P, Pi_B1 gives x, Pi_C2 gives A_open
+PROPAGATING = _initial(P_in=INCREASE, P_out=CONSTANT, Pi_C1=CONSTANT, Pi_C2=CONSTANT, Pi_B1=CONSTANT)
+
+
+def test_counts_of_a_propagating_scenario():
+    stats = RegimeStats()
+    context = SolverContext(dict(PROPAGATING))
+    evaluations = run_agenda(context, stats=stats)
+    assert not context.contradictions
+    assert _counters(stats) == {'Pi_A1': (2, 0, 0), 'Pi_A2': (2, 1, 0), 'Pi_C1': (2, 1, 0), 'Pi_C2': (3, 1, 0),
+                                'Pi_B1': (2, 1, 0)}
+    assert evaluations == sum(calls for calls, _, _ in _counters(stats).values()) == 11
+    assert all(counters['seconds'] >= 0 for counters in stats.as_dict().values())
+
+
+def test_contradictions_are_counted_and_solves_accumulate():
+    stats = RegimeStats()
+    run_agenda(SolverContext(dict(PROPAGATING)), stats=stats)
+    # x Decreased contradicts Pi_B1 = x * P with P Constant
+    context = SolverContext({**PROPAGATING, 'x': DECREASE})
+    run_agenda(context, stats=stats)
+    assert [contradiction.regime for contradiction in context.contradictions] == ['Pi_B1']
+    assert _counters(stats) == {'Pi_A1': (4, 0, 0), 'Pi_A2': (4, 2, 0), 'Pi_C1': (4, 2, 0), 'Pi_C2': (5, 2, 0),
+                                'Pi_B1': (3, 1, 1)}
+
+    stats.reset()
+    assert stats.as_dict() == {}
+
+
+def test_as_dict_save_round_trip(tmp_path):
+    stats = RegimeStats()
+    run_agenda(SolverContext(dict(PROPAGATING)), stats=stats)
+    path = tmp_path / 'profile.json'
+    stats.save(str(path))
+    assert json.loads(path.read_text()) == stats.as_dict()
+    # as_dict is a copy
+    stats.as_dict()['Pi_A1']['calls'] = 0
+    assert stats.as_dict()['Pi_A1']['calls'] == 2
+
+    output = io.StringIO()
+    stats.dump(output)
+    assert "Never changed anything: Pi_A1" in output.getvalue()
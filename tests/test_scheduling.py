@@ -0,0 +1,50 @@
+# Component scheduling against the agenda, and Tarjan against plain reachability.
+
+import random
+
+import numpy as np
+
+from Code import STATE_VARIABLES, solve_pressure_regulator
+from scheduling import solve_scheduled, strongly_connected_components
+
+
+def _reachable(graph, start):
+    seen = {start}
+    pending = [start]
+    while pending:
+        for successor in graph[pending.pop()]:
+            if successor not in seen:
+                seen.add(successor)
+                pending.append(successor)
+    return seen
+
+
+def test_components_of_random_graphs():
+    generator = random.Random(0)
+    for _ in range(200):
+        size = generator.randint(1, 30)
+        graph = [sorted(generator.sample(range(size), generator.randint(0, 3) if size > 3 else 0)) for _ in range(size)]
+        components = strongly_connected_components(graph)
+        assert sorted(node for component in components for node in component) == list(range(size))
+
+        reachable = [_reachable(graph, node) for node in range(size)]
+        position = {node: number for number, component in enumerate(components) for node in component}
+        for node in range(size):
+            same = {other for other in reachable[node] if node in reachable[other]}
+            assert same == set(components[position[node]])
+            # Topological order: no edge goes back to an earlier component
+            assert all(position[successor] >= position[node] for successor in graph[node])
+
+
+def test_scheduled_solve_matches_the_agenda():
+    generator = np.random.default_rng(0)
+    scheduled_evaluations = agenda_evaluations = 0
+    for _ in range(20000):
+        initial = {name: int(status) for name, status in zip(STATE_VARIABLES, generator.integers(0, 4, len(STATE_VARIABLES)))}
+        expected = solve_pressure_regulator(initial)
+        result = solve_scheduled(initial)
+        assert result.variables == expected.variables, initial
+        assert bool(result.contradictions) == bool(expected.contradictions), initial
+        scheduled_evaluations += result.iterations
+        agenda_evaluations += expected.iterations
+    assert scheduled_evaluations <= agenda_evaluations
@@ -0,0 +1,37 @@
+# Backtracking search against a brute-force enumeration of the full assignments.
+
+import itertools
+
+from Code import INCREASE, DECREASE, CONSTANT
+from pi_model import PRESSURE_REGULATOR, compile_model, solve_model
+from search import default_model, find_completions
+
+
+def _brute_force(model, initial):
+    free = [name for name in model.variables if name not in initial]
+    solutions = []
+    for statuses in itertools.product((INCREASE, DECREASE, CONSTANT), repeat=len(free)):
+        variables = dict(initial, **dict(zip(free, statuses)))
+        if not solve_model(model, variables).contradictions:
+            solutions.append(variables)
+    return solutions
+
+
+def _key(solution):
+    return tuple(sorted(solution.items()))
+
+
+def test_completions_of_independent_inputs():
+    initial = {'Q': INCREASE, 'A_open': INCREASE, 'P_in': INCREASE}
+    result = find_completions(initial)
+    assert result.complete and result.solutions
+    assert sorted(map(_key, result.solutions)) == sorted(map(_key, _brute_force(default_model(), initial)))
+
+
+def test_free_variables_are_enumerated():
+    spec = dict(PRESSURE_REGULATOR, variables=PRESSURE_REGULATOR['variables'] + ['T'])
+    model = compile_model(spec)
+    initial = {'Q': INCREASE, 'A_open': DECREASE, 'P_in': CONSTANT, 'P_out': INCREASE, 'x': INCREASE, 'P': CONSTANT}
+    result = find_completions(initial, model=model)
+    assert all(status != 0 for solution in result.solutions for status in solution.values())
+    assert sorted(map(_key, result.solutions)) == sorted(map(_key, _brute_force(model, initial)))
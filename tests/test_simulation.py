@@ -0,0 +1,34 @@
+# The simulator keeps exactly the successors Code.py accepts.
+
+import itertools
+
+from Code import UNKNOWN, INCREASE, DECREASE, CONSTANT, STATE_VARIABLES, solve_pressure_regulator
+from model_registry import load_model
+from simulation import simulate
+
+PHYSICAL_VARIABLES = STATE_VARIABLES[:6]
+
+
+def test_every_consistent_physical_state_is_reached(tmp_path):
+    initial = dict.fromkeys(STATE_VARIABLES, UNKNOWN)
+    initial.update(dict.fromkeys(PHYSICAL_VARIABLES, INCREASE))
+    result = simulate(initial, load_model('pressure_regulator'), directory=str(tmp_path))
+
+    consistent = 0
+    for statuses in itertools.product((INCREASE, DECREASE, CONSTANT), repeat=len(PHYSICAL_VARIABLES)):
+        state = dict.fromkeys(STATE_VARIABLES, UNKNOWN)
+        state.update(zip(PHYSICAL_VARIABLES, statuses))
+        consistent += not solve_pressure_regulator(state).contradictions
+    # e.g. Q, A_open and P_in all Increasing (Pi_A1 Constant) is one of them
+    assert result.states == consistent == 3 ** len(PHYSICAL_VARIABLES)
+    # every input has one continuity move from INCREASE or DECREASE and two from CONSTANT, none is dropped
+    assert result.transitions == result.states * len(PHYSICAL_VARIABLES) * 4 // 3
+
+
+def test_pressure_stays_constant_with_fixed_p_and_pi_c1(tmp_path):
+    initial = dict.fromkeys(STATE_VARIABLES, UNKNOWN)
+    initial.update(P_in=INCREASE, P=CONSTANT, Pi_C1=CONSTANT)
+    result = simulate(initial, load_model('pressure_regulator'), {'P': 'fixed', 'Pi_C1': 'fixed'},
+                      directory=str(tmp_path))
+    assert result.states == 3
+    assert [attractor.invariants['P_out'] for attractor in result.attractors] == [CONSTANT]
@@ -0,0 +1,58 @@
+# The LRU solve cache.
+
+from Code import UNKNOWN, INCREASE, DECREASE, CONSTANT, STATE_VARIABLES, solve_pressure_regulator
+from solve_cache import CacheStats, SolveCache, canonical_key
+from state import State
+
+
+def _initial(**statuses):
+    initial = dict.fromkeys(STATE_VARIABLES, UNKNOWN)
+    initial.update(statuses)
+    return initial
+
+
+def test_least_recently_used_is_evicted():
+    solved = []
+    cache = SolveCache(maxsize=2, solve=lambda initial: solved.append(initial['P_in']) or solve_pressure_regulator(initial))
+    cache.solve(_initial(P_in=INCREASE))
+    cache.solve(_initial(P_in=DECREASE))
+    cache.solve(_initial(P_in=INCREASE))      # hit, P_in=INCREASE is now the most recent
+    cache.solve(_initial(P_in=CONSTANT))      # evicts P_in=DECREASE
+    cache.solve(_initial(P_in=INCREASE))      # still cached
+    cache.solve(_initial(P_in=DECREASE))      # solved again, evicts P_in=CONSTANT
+    assert solved == [INCREASE, DECREASE, CONSTANT, DECREASE]
+    assert cache.stats() == CacheStats(hits=2, misses=4, evictions=2, size=2, maxsize=2)
+
+    cache.clear()
+    assert cache.stats() == CacheStats(0, 0, 0, 0, 2)
+
+
+def test_dictionary_and_state_share_a_key():
+    initial = _initial(P_in=INCREASE, Pi_A1=CONSTANT)
+    # Missing variables are UNKNOWN, other keys are ignored
+    assert canonical_key(initial) == canonical_key({'P_in': INCREASE, 'Pi_A1': CONSTANT, 'id': 7}) \
+        == canonical_key(State.from_dict(initial))
+    assert canonical_key(initial) != canonical_key(_initial(P_in=INCREASE))
+
+    cache = SolveCache()
+    first = cache.solve(initial)
+    second = cache.solve(State.from_dict(initial))
+    assert cache.stats()[:2] == (1, 1)
+    assert second.variables == first.variables == solve_pressure_regulator(initial).variables
+
+
+def test_returned_result_cannot_change_the_cache():
+    cache = SolveCache()
+    initial = _initial(P_in=CONSTANT, P_out=DECREASE, Pi_A2=INCREASE)
+    first = cache.solve(initial)
+    assert first.contradictions and first.justifications is None
+    expected = (dict(first.variables), list(first.contradictions))
+    first.variables['P_in'] = DECREASE
+    first.contradictions.clear()
+    second = cache.solve(initial)
+    assert (second.variables, second.contradictions) == expected
+
+
+def test_justifications_are_dropped():
+    cache = SolveCache(solve=lambda initial: solve_pressure_regulator(initial, trace=True))
+    assert cache.solve(_initial(P_in=INCREASE, P_out=CONSTANT)).justifications is None
@@ -0,0 +1,82 @@
+# The packed State type.
+
+import itertools
+import pickle
+import random
+
+import pytest
+
+from Code import UNKNOWN, INCREASE, DECREASE, CONSTANT, STATE_VARIABLES
+from state import State, state_type
+
+
+def _random_assignments(count, variables=STATE_VARIABLES, seed=0):
+    generator = random.Random(seed)
+    for _ in range(count):
+        yield {name: generator.randrange(4) for name in variables}
+
+
+def test_round_trip_of_every_variable_and_status():
+    for name, status in itertools.product(STATE_VARIABLES, (UNKNOWN, INCREASE, DECREASE, CONSTANT)):
+        state = State.from_dict({name: status})
+        assert state[name] == status
+        assert state.to_dict() == {other: status if other == name else UNKNOWN for other in STATE_VARIABLES}
+    for variables in _random_assignments(2000):
+        state = State.from_dict(variables)
+        assert state.to_dict() == variables
+        assert State.from_codes(state.codes()) == state
+        assert state.codes() == tuple(variables[name] for name in STATE_VARIABLES)
+        assert State(state.bits) == state
+        assert pickle.loads(pickle.dumps(state)) == state
+
+
+def test_set_and_unknown():
+    state = State.from_dict({'P_in': INCREASE, 'Q': DECREASE})
+    changed = state.set('Q', CONSTANT).set('P_in', UNKNOWN)
+    assert (state['Q'], changed['Q'], changed['P_in']) == (DECREASE, CONSTANT, UNKNOWN)
+    assert state.unknown() == [name for name in STATE_VARIABLES if name not in ('P_in', 'Q')]
+
+
+def test_equal_states_hash_equally():
+    states = [State.from_dict(variables) for variables in _random_assignments(2000)]
+    for first, second in zip(states, states[1:]):
+        assert (first == second) == (first.bits == second.bits)
+    copies = [State.from_dict(state.to_dict()) for state in states]
+    assert all(state == copy and hash(state) == hash(copy) for state, copy in zip(states, copies))
+    assert len(set(states + copies)) == len({state.bits for state in states})
+    # A State of another variable order is never equal to a State
+    other = state_type(tuple(reversed(STATE_VARIABLES)))
+    assert other(states[0].bits) != states[0]
+
+
+def test_state_is_immutable():
+    state = State.from_dict({'P_in': INCREASE})
+    with pytest.raises(AttributeError):
+        state.bits = 0
+    with pytest.raises(AttributeError):
+        state.extra = 1
+    assert state['P_in'] == INCREASE
+
+
+@pytest.mark.parametrize('build', [
+    lambda: State.from_dict({'P_in': 4}),
+    lambda: State.from_dict({'Q': -1}),
+    lambda: State.from_dict({'Q': 'I'}),
+    lambda: State.from_codes((0,) * (len(STATE_VARIABLES) - 1) + (7,)),
+    lambda: State.from_codes((0,) * (len(STATE_VARIABLES) + 1)),
+    lambda: State().set('x', 5),
+    lambda: State(1 << (2 * len(STATE_VARIABLES))),
+    lambda: State(-1),
+])
+def test_invalid_codes_are_rejected(build):
+    with pytest.raises(ValueError):
+        build()
+
+
+def test_state_type_for_another_order():
+    variables = ('b', 'a', 'c')
+    state_class = state_type(variables)
+    assert state_type(variables) is state_class and state_type(STATE_VARIABLES) is State
+    state = state_class.from_dict({'a': DECREASE, 'c': CONSTANT})
+    assert state.codes() == (UNKNOWN, DECREASE, CONSTANT)
+    assert state.to_dict() == {'b': UNKNOWN, 'a': DECREASE, 'c': CONSTANT}
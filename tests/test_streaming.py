@@ -0,0 +1,47 @@
+# The live state of the streaming solver against a full solve of the inputs it received.
+
+import random
+
+import pytest
+
+from Code import UNKNOWN, DECREASE, CONSTANT, STATE_VARIABLES, solve_with_regimes, REGIMES, DEPENDENCY_INDEX
+from search import default_model
+from streaming import IncrementalSolver
+
+MODEL = default_model()
+
+
+@pytest.mark.parametrize('regimes, dependency_index', [(REGIMES, DEPENDENCY_INDEX),
+                                                       (MODEL.regimes, MODEL.dependency_index)],
+                         ids=['hand-written', 'compiled'])
+def test_live_state_matches_a_full_solve(regimes, dependency_index):
+    generator = random.Random(0)
+    for _ in range(5000):
+        initial = {name: generator.choice((UNKNOWN, UNKNOWN, 1, 2, 3)) for name in STATE_VARIABLES}
+        solver = IncrementalSolver(initial, regimes, dependency_index)
+        for _ in range(3):
+            before = set(solver.contradictions)
+            update = solver.apply(generator.choice(STATE_VARIABLES), generator.randrange(1, 4))
+            # An update reports exactly the contradictions that were not there before it
+            assert set(update.contradictions) == set(solver.contradictions) - before
+            assert len(update.contradictions) == len(set(update.contradictions))
+        expected = solve_with_regimes(solver.inputs, regimes, dependency_index)
+        assert (solver.variables, solver.contradictions) == (expected.variables, expected.contradictions)
+
+
+def test_contradiction_found_by_a_full_solve_is_reported():
+    initial = dict.fromkeys(STATE_VARIABLES, UNKNOWN)
+    initial.update(P_out=DECREASE, A_open=DECREASE, P=DECREASE, Pi_A2=CONSTANT, Pi_B1=CONSTANT)
+    solver = IncrementalSolver(initial)
+    updates = list(solver.stream([('Pi_A2', DECREASE), ('Pi_C2', CONSTANT), ('P_in', CONSTANT)]))
+    assert 'Pi_B1' in {contradiction.regime for update in updates for contradiction in update.contradictions}
+    assert solver.contradictions == solve_with_regimes(solver.inputs).contradictions
+
+
+def test_incremental_update_with_compiled_regimes():
+    initial = dict.fromkeys(STATE_VARIABLES, UNKNOWN)
+    initial.update(P_out=CONSTANT, Pi_A2=CONSTANT)
+    solver = IncrementalSolver(initial, MODEL.regimes, MODEL.dependency_index)
+    update = solver.apply('Pi_C1', CONSTANT)
+    assert not update.recomputed and not update.contradictions
+    assert update.variables['P'] == CONSTANT
@@ -0,0 +1,54 @@
+# What-if re-solving against a full solve of the changed inputs.
+
+import random
+
+from Code import UNKNOWN, INCREASE, DECREASE, CONSTANT, STATE_VARIABLES, solve_pressure_regulator
+from search import default_model
+from pi_model import solve_model
+from whatif import resolve
+
+
+def _edits(count, seed=0):
+    """
+    Random (initial variables, changes) pairs.
+    """
+    generator = random.Random(seed)
+    for _ in range(count):
+        initial = {name: generator.choice((UNKNOWN, UNKNOWN, 1, 2, 3)) for name in STATE_VARIABLES}
+        changed = generator.sample(STATE_VARIABLES, generator.randint(1, 3))
+        yield initial, {name: generator.randrange(4) for name in changed}
+
+
+def _changed_inputs(previous, changes):
+    inputs = {name: UNKNOWN if name in previous.justifications else status
+              for name, status in previous.variables.items()}
+    for name, status in changes.items():
+        if status != UNKNOWN or name not in previous.justifications:
+            inputs[name] = status
+    return inputs
+
+
+def test_compiled_regimes_match_a_full_solve():
+    model = default_model()
+    for initial, changes in _edits(3000):
+        previous = solve_model(model, initial, trace=True)
+        result = resolve(previous, changes, model.regimes, model.dependency_index)
+        expected = solve_model(model, _changed_inputs(previous, changes), trace=True)
+        assert (result.variables, result.contradictions) == (expected.variables, expected.contradictions)
+
+
+def test_hand_regimes_match_a_full_solve():
+    for initial, changes in _edits(20000, seed=7):
+        previous = solve_pressure_regulator(initial, trace=True)
+        result = resolve(previous, changes)
+        expected = solve_pressure_regulator(_changed_inputs(previous, changes), trace=True)
+        assert (result.variables, result.contradictions) == (expected.variables, expected.contradictions)
+
+
+def test_contradiction_found_by_a_full_solve_is_kept():
+    initial = dict.fromkeys(STATE_VARIABLES, UNKNOWN)
+    initial.update(P_in=INCREASE, P_out=INCREASE, Q=CONSTANT, P=CONSTANT, Pi_A1=DECREASE, Pi_B1=DECREASE,
+                   Pi_C2=INCREASE)
+    result = resolve(solve_pressure_regulator(initial, trace=True), {'A_open': INCREASE})
+    assert result.variables['x'] == INCREASE
+    assert {contradiction.regime for contradiction in result.contradictions} == {'Pi_B1', 'Pi_C2'}
@@ -0,0 +1,111 @@
+# What-if re-solving: "same as before, but Q is now Decreased".
+#
+# A traced solve (solve_pressure_regulator(..., trace=True) or pi_model.solve_model(..., trace=True))
+# records a Justification for every derived variable: the regime that set it and the known variables
+# it was computed from. Together they form a justification graph. resolve(previous, changes) walks
+# that graph from the changed inputs, undoes only the conclusions that depend on them and puts back
+# on the agenda only the regimes that read or write an undone variable. Everything else of the previous
+# fixpoint is kept, so the cost follows the size of the change instead of the size of the model.
+#
+# The variables without a justification are the inputs of the previous solve. A change sets an input
+# to a new status; UNKNOWN removes an input.
+#
+# A regime that hits a contradiction may have written part of its result first, so what the rest of
+# the agenda derives then depends on the evaluation order. Once a contradiction is involved (in the
+# previous result or in the update) the inputs are therefore solved again from scratch; the incremental
+# path only serves the contradiction-free case. With the compiled kernels of pi_model, which reach the
+# same fixpoint in any order, the result is then always that of a full solve. The hand-written regimes of
+# Code.py (REGIMES) depend on the order on their own: re-propagating from a previous fixpoint can miss a
+# contradiction a full solve reports (about 0.1% of random edits), so for them resolve always solves the
+# changed inputs again. Use the regimes of a compiled model to get the incremental update.
+
+from Code import (
+    UNKNOWN,
+    REGIMES,
+    DEPENDENCY_INDEX,
+    SolverContext,
+    build_dependency_index,
+    run_agenda,
+    solve_with_regimes,
+)
+
+
+def consequences(justifications):
+    """
+    Reverse justification graph: variable -> the derived variables that were computed from it.
+    """
+    graph = {}
+    for variable, justification in justifications.items():
+        for antecedent in justification.antecedents:
+            graph.setdefault(antecedent, []).append(variable)
+    return graph
+
+
+def resolve(previous, changes, regimes=REGIMES, dependency_index=None):
+    """
+    Re-solve a traced SolveResult with changed inputs ({variable: status}) and return a new traced SolveResult.
+    It is always equal to a full traced solve of the changed inputs: for the hand-written REGIMES and when a
+    contradiction is involved it is one (see the header). Its iterations count only the regime evaluations of
+    this update.
+    """
+    if previous.justifications is None:
+        raise ValueError("resolve needs a result solved with trace=True.")
+    if dependency_index is None:
+        dependency_index = DEPENDENCY_INDEX if regimes is REGIMES else build_dependency_index(regimes)
+    for variable in changes:
+        if variable not in previous.variables:
+            raise KeyError(f"Unknown variable '{variable}'.")
+
+    if previous.contradictions or regimes is REGIMES:
+        return _solve_again(previous, changes, regimes, dependency_index)
+
+    variables = dict(previous.variables)
+    justifications = dict(previous.justifications)
+    graph = consequences(justifications)
+
+    affected = set()
+    pending = []
+    for variable, status in changes.items():
+        if variable in justifications:
+            if status == UNKNOWN:
+                # Derived, not an input: there is nothing to remove
+                continue
+            # From now on an input
+            del justifications[variable]
+        if variables[variable] == status:
+            continue
+        variables[variable] = status
+        affected.add(variable)
+        pending.append(variable)
+
+    # Undo everything derived (directly or indirectly) from a changed variable
+    while pending:
+        variable = pending.pop()
+        for derived in graph.get(variable, ()):
+            if derived in justifications:
+                del justifications[derived]
+                variables[derived] = UNKNOWN
+                affected.add(derived)
+                pending.append(derived)
+
+    start = [regime for regime in regimes
+             if not affected.isdisjoint(regime.reads) or not affected.isdisjoint(regime.writes)]
+
+    context = SolverContext(variables, justifications)
+    run_agenda(context, regimes, dependency_index, start=start)
+    if context.contradictions:
+        return _solve_again(previous, changes, regimes, dependency_index, context.iterations)
+    return context.result()
+
+
+def _solve_again(previous, changes, regimes, dependency_index, iterations=0):
+    """
+    Full traced solve of the inputs of previous with the changes applied (iterations: work already spent).
+    """
+    inputs = {variable: UNKNOWN if variable in previous.justifications else status
+              for variable, status in previous.variables.items()}
+    for variable, status in changes.items():
+        if status != UNKNOWN or variable not in previous.justifications:
+            inputs[variable] = status
+    result = solve_with_regimes(inputs, regimes, dependency_index, trace=True)
+    return result._replace(iterations=result.iterations + iterations)